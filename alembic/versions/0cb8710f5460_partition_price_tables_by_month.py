@@ -0,0 +1,206 @@
+"""partition price tables by month
+
+Revision ID: 0cb8710f5460
+Revises: 9cca8df0ae5c
+Create Date: 2026-10-17 11:03:27.518204
+
+"""
+import datetime
+from typing import Sequence, Union
+
+import pytz
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "0cb8710f5460"
+down_revision: Union[str, None] = "9cca8df0ae5c"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MARKET_TZ = pytz.timezone("Asia/Kolkata")
+PRICE_COLUMN_NAMES = [
+    "a1_price_in_rs_per_mwh",
+    "a2_price_in_rs_per_mwh",
+    "e1_price_in_rs_per_mwh",
+    "e2_price_in_rs_per_mwh",
+    "n1_price_in_rs_per_mwh",
+    "n2_price_in_rs_per_mwh",
+    "n3_price_in_rs_per_mwh",
+    "s1_price_in_rs_per_mwh",
+    "s2_price_in_rs_per_mwh",
+    "s3_price_in_rs_per_mwh",
+    "w1_price_in_rs_per_mwh",
+    "w2_price_in_rs_per_mwh",
+    "w3_price_in_rs_per_mwh",
+    "mcp_price_in_rs_per_mwh",
+]
+UNIQUE_CONSTRAINTS = {
+    "dam_prices": (
+        "uq_dam_prices_settlement_period_start_timestamp",
+        ["settlement_period_start_timestamp"],
+    ),
+    "rtm_prices": (
+        "uq_rtm_prices_settlement_period_start_timestamp_session_id",
+        ["settlement_period_start_timestamp", "session_id"],
+    ),
+}
+
+
+def _price_columns(table_name: str, partitioned: bool) -> list[sa.Column]:
+    columns = [
+        sa.Column(
+            "id",
+            sa.Integer(),
+            server_default=sa.text(f"nextval('{table_name}_id_seq'::regclass)"),
+            nullable=False,
+        ),
+        sa.Column(
+            "settlement_period_start_timestamp",
+            sa.BigInteger(),
+            nullable=not partitioned,
+        ),
+    ]
+    columns += [
+        sa.Column(name, sa.Float(), nullable=True) for name in PRICE_COLUMN_NAMES
+    ]
+    if table_name == "rtm_prices":
+        columns.append(sa.Column("session_id", sa.String(), nullable=True))
+    return columns
+
+
+def _month_bounds(start_timestamp: int, end_timestamp: int) -> list[tuple]:
+    """
+    Returns (year, month, lower_bound, upper_bound) for every trading month
+    between the two timestamps. Months follow the market timezone
+    """
+    start_datetime = datetime.datetime.fromtimestamp(start_timestamp, MARKET_TZ)
+    year, month = start_datetime.year, start_datetime.month
+    bounds = []
+    while True:
+        lower_bound = MARKET_TZ.localize(datetime.datetime(year, month, 1))
+        if lower_bound.timestamp() > end_timestamp:
+            return bounds
+        next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+        upper_bound = MARKET_TZ.localize(datetime.datetime(next_year, next_month, 1))
+        bounds.append(
+            (year, month, int(lower_bound.timestamp()), int(upper_bound.timestamp()))
+        )
+        year, month = next_year, next_month
+
+
+def _copy_rows(source_table: str, target_table: str, table_name: str) -> None:
+    column_names = ", ".join(column.name for column in _price_columns(table_name, True))
+    op.execute(
+        f"INSERT INTO {target_table} ({column_names}) "
+        f"SELECT {column_names} FROM {source_table}"
+    )
+
+
+def _check_rows_have_timestamps(table_name: str) -> None:
+    """
+    Rows without a settlement period start timestamp belong to no partition,
+    so the upgrade stops instead of leaving them behind
+    """
+    num_rows_without_timestamp = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                f"SELECT count(*) FROM {table_name} "
+                f"WHERE settlement_period_start_timestamp IS NULL"
+            )
+        )
+        .scalar_one()
+    )
+    if num_rows_without_timestamp:
+        raise RuntimeError(
+            f"{table_name} has {num_rows_without_timestamp} rows without a "
+            f"settlement period start timestamp, delete or fix them before "
+            f"partitioning it"
+        )
+
+
+def _partition_table(table_name: str) -> None:
+    old_table_name = f"{table_name}_unpartitioned"
+    constraint_name, constraint_columns = UNIQUE_CONSTRAINTS[table_name]
+    _check_rows_have_timestamps(table_name)
+    op.rename_table(table_name, old_table_name)
+    op.execute(
+        f"ALTER TABLE {old_table_name} "
+        f"RENAME CONSTRAINT {table_name}_pkey TO {old_table_name}_pkey"
+    )
+    op.drop_constraint(constraint_name, old_table_name, type_="unique")
+    op.execute(f"ALTER SEQUENCE {table_name}_id_seq OWNED BY NONE")
+
+    op.create_table(
+        table_name,
+        *_price_columns(table_name, partitioned=True),
+        sa.PrimaryKeyConstraint("id", "settlement_period_start_timestamp"),
+        sa.UniqueConstraint(
+            *constraint_columns,
+            name=constraint_name,
+            postgresql_nulls_not_distinct=table_name == "rtm_prices",
+        ),
+        postgresql_partition_by="RANGE (settlement_period_start_timestamp)",
+    )
+    min_timestamp, max_timestamp = (
+        op.get_bind()
+        .execute(
+            sa.text(
+                f"SELECT min(settlement_period_start_timestamp), "
+                f"max(settlement_period_start_timestamp) FROM {old_table_name}"
+            )
+        )
+        .one()
+    )
+    if min_timestamp is not None:
+        for year, month, lower_bound, upper_bound in _month_bounds(
+            min_timestamp, max_timestamp
+        ):
+            op.execute(
+                f"CREATE TABLE {table_name}_y{year}m{month:02d} "
+                f"PARTITION OF {table_name} "
+                f"FOR VALUES FROM ({lower_bound}) TO ({upper_bound})"
+            )
+
+    _copy_rows(old_table_name, table_name, table_name)
+    op.drop_table(old_table_name)
+    op.execute(f"ALTER SEQUENCE {table_name}_id_seq OWNED BY {table_name}.id")
+
+
+def _unpartition_table(table_name: str) -> None:
+    old_table_name = f"{table_name}_partitioned"
+    constraint_name, constraint_columns = UNIQUE_CONSTRAINTS[table_name]
+    op.rename_table(table_name, old_table_name)
+    op.execute(
+        f"ALTER TABLE {old_table_name} "
+        f"RENAME CONSTRAINT {table_name}_pkey TO {old_table_name}_pkey"
+    )
+    op.drop_constraint(constraint_name, old_table_name, type_="unique")
+    op.execute(f"ALTER SEQUENCE {table_name}_id_seq OWNED BY NONE")
+
+    op.create_table(
+        table_name,
+        *_price_columns(table_name, partitioned=False),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            *constraint_columns,
+            name=constraint_name,
+            postgresql_nulls_not_distinct=table_name == "rtm_prices",
+        ),
+    )
+    _copy_rows(old_table_name, table_name, table_name)
+    # dropping the parent table drops all of its partitions
+    op.drop_table(old_table_name)
+    op.execute(f"ALTER SEQUENCE {table_name}_id_seq OWNED BY {table_name}.id")
+
+
+def upgrade() -> None:
+    _partition_table("dam_prices")
+    _partition_table("rtm_prices")
+
+
+def downgrade() -> None:
+    _unpartition_table("rtm_prices")
+    _unpartition_table("dam_prices")
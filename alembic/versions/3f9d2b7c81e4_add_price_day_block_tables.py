@@ -0,0 +1,96 @@
+"""add price day block tables
+
+Revision ID: 3f9d2b7c81e4
+Revises: 6508ea2e2a63
+Create Date: 2026-10-17 22:05:48.671203
+
+"""
+import itertools
+import zlib
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+from src.common.constants import PRICE_COLUMN_TO_FIELD_NAME_MAP
+from src.marketdata.day_blocks import (
+    DAY_BLOCKS_PER_INSERT,
+    STREAMING_BATCH_SIZE,
+    get_trading_day_start_timestamp,
+)
+from src.marketdata.schema_utils import convert_price_rows_to_json_objects
+
+# revision identifiers, used by Alembic.
+revision: str = "3f9d2b7c81e4"
+down_revision: Union[str, None] = "6508ea2e2a63"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+PRICE_TABLE_TO_DAY_BLOCK_TABLE = {
+    "dam_prices": "dam_price_day_blocks",
+    "rtm_prices": "rtm_price_day_blocks",
+}
+
+
+def _backfill_day_blocks(price_table_name: str, day_block_table_name: str) -> None:
+    """
+    Builds the blocks of the trading days stored before this revision the
+    way src.marketdata.day_blocks.refresh_price_day_blocks does, streaming
+    the price rows and inserting DAY_BLOCKS_PER_INSERT days at a time
+    """
+    field_names = [
+        "settlement_period_start_timestamp",
+        *PRICE_COLUMN_TO_FIELD_NAME_MAP.values(),
+    ]
+    if price_table_name == "rtm_prices":
+        field_names.append("session_id")
+    day_block_table = sa.table(
+        day_block_table_name,
+        sa.column("trading_day_start_timestamp"),
+        sa.column("num_records"),
+        sa.column("compressed_json"),
+    )
+    connection = op.get_bind()
+    price_rows = connection.execute(
+        sa.text(
+            f"SELECT {', '.join(field_names)} FROM {price_table_name} "
+            f"ORDER BY settlement_period_start_timestamp"
+        ),
+        execution_options={"yield_per": STREAMING_BATCH_SIZE},
+    )
+    day_blocks = []
+    for day_start_timestamp, day_price_rows in itertools.groupby(
+        price_rows, key=lambda price_row: get_trading_day_start_timestamp(price_row[0])
+    ):
+        day_price_rows = list(day_price_rows)
+        day_blocks.append(
+            {
+                "trading_day_start_timestamp": day_start_timestamp,
+                "num_records": len(day_price_rows),
+                "compressed_json": zlib.compress(
+                    convert_price_rows_to_json_objects(day_price_rows, field_names)
+                ),
+            }
+        )
+        if len(day_blocks) == DAY_BLOCKS_PER_INSERT:
+            connection.execute(sa.insert(day_block_table), day_blocks)
+            day_blocks = []
+    if day_blocks:
+        connection.execute(sa.insert(day_block_table), day_blocks)
+
+
+def upgrade() -> None:
+    for price_table_name, table_name in PRICE_TABLE_TO_DAY_BLOCK_TABLE.items():
+        op.create_table(
+            table_name,
+            sa.Column("trading_day_start_timestamp", sa.BigInteger(), nullable=False),
+            sa.Column("num_records", sa.Integer(), nullable=False),
+            sa.Column("compressed_json", sa.LargeBinary(), nullable=False),
+            sa.PrimaryKeyConstraint("trading_day_start_timestamp"),
+        )
+        _backfill_day_blocks(price_table_name, table_name)
+
+
+def downgrade() -> None:
+    for table_name in PRICE_TABLE_TO_DAY_BLOCK_TABLE.values():
+        op.drop_table(table_name)
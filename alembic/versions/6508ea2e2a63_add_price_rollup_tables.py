@@ -0,0 +1,85 @@
+"""add price rollup tables
+
+Revision ID: 6508ea2e2a63
+Revises: 0cb8710f5460
+Create Date: 2026-10-17 12:41:09.204517
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "6508ea2e2a63"
+down_revision: Union[str, None] = "0cb8710f5460"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ZONES = [
+    "A1",
+    "A2",
+    "E1",
+    "E2",
+    "N1",
+    "N2",
+    "N3",
+    "S1",
+    "S2",
+    "S3",
+    "W1",
+    "W2",
+    "W3",
+    "MCP",
+]
+PRICE_TABLE_TO_ROLLUP_TABLE = {
+    "dam_prices": "dam_price_rollups",
+    "rtm_prices": "rtm_price_rollups",
+}
+
+
+def _backfill_rollups(price_table_name: str, rollup_table_name: str) -> None:
+    zone_values = ", ".join(
+        f"('{zone}', prices.{zone.lower()}_price_in_rs_per_mwh)" for zone in ZONES
+    )
+    for granularity in ["hour", "day", "month"]:
+        op.execute(
+            f"""
+            INSERT INTO {rollup_table_name}
+            SELECT
+                '{granularity}',
+                extract(epoch FROM date_trunc('{granularity}',
+                    to_timestamp(prices.settlement_period_start_timestamp)
+                    AT TIME ZONE 'Asia/Kolkata') AT TIME ZONE 'Asia/Kolkata')::bigint,
+                zone_prices.zone,
+                count(zone_prices.price),
+                min(zone_prices.price),
+                max(zone_prices.price),
+                avg(zone_prices.price)
+            FROM {price_table_name} AS prices
+            CROSS JOIN LATERAL (VALUES {zone_values}) AS zone_prices (zone, price)
+            GROUP BY 2, zone_prices.zone
+            """
+        )
+
+
+def upgrade() -> None:
+    for price_table_name, rollup_table_name in PRICE_TABLE_TO_ROLLUP_TABLE.items():
+        op.create_table(
+            rollup_table_name,
+            sa.Column("granularity", sa.String(), nullable=False),
+            sa.Column("bucket_start_timestamp", sa.BigInteger(), nullable=False),
+            sa.Column("zone", sa.String(), nullable=False),
+            sa.Column("num_intervals", sa.Integer(), nullable=True),
+            sa.Column("min_price_in_rs_per_mwh", sa.Float(), nullable=True),
+            sa.Column("max_price_in_rs_per_mwh", sa.Float(), nullable=True),
+            sa.Column("mean_price_in_rs_per_mwh", sa.Float(), nullable=True),
+            sa.PrimaryKeyConstraint("granularity", "bucket_start_timestamp", "zone"),
+        )
+        _backfill_rollups(price_table_name, rollup_table_name)
+
+
+def downgrade() -> None:
+    for rollup_table_name in PRICE_TABLE_TO_ROLLUP_TABLE.values():
+        op.drop_table(rollup_table_name)
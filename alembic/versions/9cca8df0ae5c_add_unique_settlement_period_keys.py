@@ -0,0 +1,63 @@
+"""add unique settlement period keys
+
+Revision ID: 9cca8df0ae5c
+Revises: b1262c34047b
+Create Date: 2026-10-17 10:12:41.381920
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "9cca8df0ae5c"
+down_revision: Union[str, None] = "b1262c34047b"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # drop duplicated settlement periods, keeping the first inserted row
+    op.execute(
+        """
+        DELETE FROM dam_prices AS duplicate
+        USING dam_prices AS original
+        WHERE duplicate.settlement_period_start_timestamp
+              = original.settlement_period_start_timestamp
+          AND duplicate.id > original.id
+        """
+    )
+    op.execute(
+        """
+        DELETE FROM rtm_prices AS duplicate
+        USING rtm_prices AS original
+        WHERE duplicate.settlement_period_start_timestamp
+              = original.settlement_period_start_timestamp
+          AND duplicate.session_id IS NOT DISTINCT FROM original.session_id
+          AND duplicate.id > original.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_dam_prices_settlement_period_start_timestamp",
+        "dam_prices",
+        ["settlement_period_start_timestamp"],
+    )
+    op.create_unique_constraint(
+        "uq_rtm_prices_settlement_period_start_timestamp_session_id",
+        "rtm_prices",
+        ["settlement_period_start_timestamp", "session_id"],
+        postgresql_nulls_not_distinct=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint(
+        "uq_rtm_prices_settlement_period_start_timestamp_session_id",
+        "rtm_prices",
+        type_="unique",
+    )
+    op.drop_constraint(
+        "uq_dam_prices_settlement_period_start_timestamp",
+        "dam_prices",
+        type_="unique",
+    )
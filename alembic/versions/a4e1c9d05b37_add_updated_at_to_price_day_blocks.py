@@ -0,0 +1,38 @@
+"""add updated_at to price day blocks
+
+Revision ID: a4e1c9d05b37
+Revises: 3f9d2b7c81e4
+Create Date: 2026-10-17 23:12:30.118452
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "a4e1c9d05b37"
+down_revision: Union[str, None] = "3f9d2b7c81e4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DAY_BLOCK_TABLE_NAMES = ["dam_price_day_blocks", "rtm_price_day_blocks"]
+
+
+def upgrade() -> None:
+    for table_name in DAY_BLOCK_TABLE_NAMES:
+        op.add_column(
+            table_name,
+            sa.Column(
+                "updated_at",
+                sa.DateTime(timezone=True),
+                server_default=sa.text("now()"),
+                nullable=False,
+            ),
+        )
+
+
+def downgrade() -> None:
+    for table_name in DAY_BLOCK_TABLE_NAMES:
+        op.drop_column(table_name, "updated_at")
@@ -0,0 +1,234 @@
+"""
+Measures how fast the DAM and RTM parsing engines parse the captured price
+pages in tests/data, and synthetic pages holding several days of them: the
+throughput, the peak memory and the time spent building the soup, finding
+the price table and parsing its rows. The results can be saved as a json
+baseline and later runs compared against it, failing when a page got slower
+or needs more memory by more than the allowed regression
+
+    python -m benchmarks.parsing_engines --days 1 --days 7 --save-baseline b.json
+    python -m benchmarks.parsing_engines --days 1 --days 7 --compare-baseline b.json
+
+Timings depend on the machine, so baselines are only comparable with runs on
+the machine that saved them
+"""
+import copy
+import json
+import platform
+import time
+import tracemalloc
+import typing
+
+import bs4
+import click
+
+from src.common.metrics import SCRAPER_PHASE_DURATION_SECONDS
+from src.migrations.automated.scraping.parsing_engines import (
+    BaseHtmlParsingEngine,
+    DAMHtmlParsingEngine,
+    RTMHtmlParsingEngine,
+)
+
+PARSING_ENGINE_TO_PAGE_PATH_MAP: dict[type[BaseHtmlParsingEngine], str] = {
+    DAMHtmlParsingEngine: "tests/data/dam_prices_page.html",
+    RTMHtmlParsingEngine: "tests/data/rtm_prices_page.html",
+}
+PARSING_PHASES = ("soup", "price_table", "rows")
+NUM_SETTLEMENT_PERIODS_IN_DAY = 96
+
+
+def build_multi_day_page(
+    parsing_engine: type[BaseHtmlParsingEngine], html_content: str, num_days: int
+) -> str:
+    """
+    Appends num_days - 1 copies of the day in the price table of the page.
+    The first row of every copy drops the date cell, which spans the rows of
+    the first day only, so every row keeps the cells the parser expects at
+    its position. The parser takes the date from the first row, so the
+    copies parse to the settlement periods of the first day
+    """
+    page_soup = bs4.BeautifulSoup(html_content, "html.parser")
+    price_table = parsing_engine._get_price_table_from_page(page_soup)
+    data_row_offset = parsing_engine.DATA_ROW_OFFSET
+    day_rows = price_table.find_all("tr")[data_row_offset:]
+    rows_parent = day_rows[-1].parent
+    for _ in range(num_days - 1):
+        for row_id, day_row in enumerate(day_rows):
+            copied_row = copy.copy(day_row)
+            if row_id == 0:
+                copied_row.find_all("td")[1].decompose()
+            rows_parent.append(copied_row)
+    return str(page_soup)
+
+
+def _measure_parse(
+    parsing_engine: type[BaseHtmlParsingEngine], html_content: str
+) -> tuple[float, dict[str, float], int]:
+    SCRAPER_PHASE_DURATION_SECONDS.clear()
+    start_time = time.perf_counter()
+    price_data = parsing_engine.parse_doc_to_price_data(html_content)
+    elapsed_seconds = time.perf_counter() - start_time
+    phase_seconds = {
+        phase: SCRAPER_PHASE_DURATION_SECONDS.get_sum(parsing_engine.__name__, phase)
+        for phase in PARSING_PHASES
+    }
+    return elapsed_seconds, phase_seconds, len(price_data)
+
+
+def _measure_peak_memory(
+    parsing_engine: type[BaseHtmlParsingEngine], html_content: str
+) -> int:
+    # tracing slows the parse down, so it gets a run of its own
+    tracemalloc.start()
+    try:
+        parsing_engine.parse_doc_to_price_data(html_content)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_page(
+    parsing_engine: type[BaseHtmlParsingEngine], html_content: str, repeat: int
+) -> dict[str, typing.Any]:
+    """
+    Parses the page repeat times and reports the fastest run, and the
+    fastest run of every phase
+    """
+    runs = [_measure_parse(parsing_engine, html_content) for _ in range(repeat)]
+    best_seconds = min(elapsed_seconds for elapsed_seconds, _, _ in runs)
+    num_rows = runs[0][2]
+    return {
+        "num_rows": num_rows,
+        "page_bytes": len(html_content.encode()),
+        "seconds": best_seconds,
+        "rows_per_second": num_rows / best_seconds,
+        "megabytes_per_second": len(html_content.encode()) / best_seconds / 1e6,
+        "peak_memory_bytes": _measure_peak_memory(parsing_engine, html_content),
+        "phase_seconds": {
+            phase: min(phase_seconds[phase] for _, phase_seconds, _ in runs)
+            for phase in PARSING_PHASES
+        },
+    }
+
+
+def find_regressions(
+    results: dict[str, dict], baseline_results: dict[str, dict], max_regression: float
+) -> list[str]:
+    """
+    Describes every page whose parse time, phase times or peak memory grew by
+    more than max_regression (Ex: 0.2 is 20%) over the baseline. Pages
+    missing from the baseline are not compared
+    """
+    regressions = []
+    for case_name, result in results.items():
+        baseline_result = baseline_results.get(case_name)
+        if baseline_result is None:
+            continue
+        compared_values = {
+            "seconds": (result["seconds"], baseline_result["seconds"]),
+            "peak_memory_bytes": (
+                result["peak_memory_bytes"],
+                baseline_result["peak_memory_bytes"],
+            ),
+            **{
+                f"{phase} seconds": (
+                    result["phase_seconds"][phase],
+                    baseline_result["phase_seconds"][phase],
+                )
+                for phase in PARSING_PHASES
+            },
+        }
+        for value_name, (value, baseline_value) in compared_values.items():
+            if baseline_value > 0 and value > baseline_value * (1 + max_regression):
+                regressions.append(
+                    f"{case_name}: {value_name} {value:.6g} is "
+                    f"{value / baseline_value - 1:.0%} over the baseline "
+                    f"{baseline_value:.6g}"
+                )
+    return regressions
+
+
+@click.command()
+@click.option(
+    "--days",
+    "num_days_per_page",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=(1, 7),
+    help="Days per parsed page, 1 being the captured page itself",
+)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=5,
+    help="Number of timed parses per page, the best one is reported",
+)
+@click.option("--save-baseline", type=click.Path(dir_okay=False), default=None)
+@click.option(
+    "--compare-baseline", type=click.Path(exists=True, dir_okay=False), default=None
+)
+@click.option(
+    "--max-regression",
+    type=click.FloatRange(min=0),
+    default=0.2,
+    help="Allowed growth over the baseline, as a fraction",
+)
+def benchmark_parsing_engines(
+    num_days_per_page: tuple[int, ...],
+    repeat: int,
+    save_baseline: str | None,
+    compare_baseline: str | None,
+    max_regression: float,
+) -> None:
+    results = {}
+    for parsing_engine, page_path in PARSING_ENGINE_TO_PAGE_PATH_MAP.items():
+        with open(page_path, "r") as page_file:
+            html_content = page_file.read()
+        for num_days in num_days_per_page:
+            case_name = f"{parsing_engine.__name__}[{num_days}d]"
+            page = (
+                html_content
+                if num_days == 1
+                else build_multi_day_page(parsing_engine, html_content, num_days)
+            )
+            result = benchmark_page(parsing_engine, page, repeat)
+            if result["num_rows"] != num_days * NUM_SETTLEMENT_PERIODS_IN_DAY:
+                raise click.ClickException(
+                    f"{case_name}: parsed {result['num_rows']} rows instead of "
+                    f"{num_days * NUM_SETTLEMENT_PERIODS_IN_DAY}"
+                )
+            results[case_name] = result
+            phase_timings = ", ".join(
+                f"{phase} {seconds * 1000:.1f}ms"
+                for phase, seconds in result["phase_seconds"].items()
+            )
+            click.echo(
+                f"{case_name}: {result['num_rows']} rows in "
+                f"{result['seconds'] * 1000:.1f}ms "
+                f"({result['rows_per_second']:.0f} rows/s, "
+                f"{result['megabytes_per_second']:.2f}MB/s), "
+                f"peak memory {result['peak_memory_bytes'] / 1e6:.1f}MB "
+                f"[{phase_timings}]"
+            )
+
+    if save_baseline is not None:
+        with open(save_baseline, "w") as baseline_file:
+            json.dump(
+                {"python_version": platform.python_version(), "results": results},
+                baseline_file,
+                indent=2,
+            )
+        click.echo(f"Saved the baseline to {save_baseline}")
+    if compare_baseline is not None:
+        with open(compare_baseline, "r") as baseline_file:
+            baseline_results = json.load(baseline_file)["results"]
+        regressions = find_regressions(results, baseline_results, max_regression)
+        if regressions:
+            raise click.ClickException(
+                "Parsing regressed over the baseline:\n" + "\n".join(regressions)
+            )
+        click.echo(f"No regressions over {compare_baseline}")
+
+
+if __name__ == "__main__":
+    benchmark_parsing_engines()
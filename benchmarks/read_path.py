@@ -0,0 +1,154 @@
+"""
+Compares the rows/sec of the ORM + pydantic read path with the Core tuple +
+orjson read path and its columnar json shape on a year of RTM data. The data
+is loaded inside a transaction that is rolled back, so the configured
+database is left untouched
+
+    python -m benchmarks.read_path --days 365 --repeat 3
+"""
+import datetime
+import time
+import typing
+
+import click
+from sqlalchemy.orm import sessionmaker
+
+from src.common.constants import MARKET_TZ
+from src.common.enums import ConflictResolution
+from src.common.models import TimeFrame
+from src.common.utils import convert_timestamp_to_indian_datetime
+from src.database import engine
+from src.marketdata.crud import (
+    copy_multiple_rtm_price_records,
+    iter_rtm_price_records,
+    iter_rtm_price_rows,
+)
+from src.marketdata.models import RTMPointInTimePriceDataDb, get_price_row_columns
+from src.marketdata.schema_utils import (
+    convert_price_rows_to_columnar_json,
+    iter_price_data_as_json_array,
+    iter_price_rows_as_json_array,
+)
+from src.marketdata.schemas import RTMPointInTimePriceData
+
+SETTLEMENT_PERIOD = datetime.timedelta(minutes=15)
+BENCHMARK_START_DATETIME = MARKET_TZ.localize(datetime.datetime(2021, 1, 1))
+
+
+def _iter_synthetic_rtm_chunks(
+    num_rows: int, chunk_rows: int = 10000
+) -> typing.Iterator[list[RTMPointInTimePriceData]]:
+    chunk = []
+    for step in range(num_rows):
+        price = 1000.0 + step % 96
+        chunk.append(
+            RTMPointInTimePriceData(
+                settlement_period_start_datetime=(
+                    BENCHMARK_START_DATETIME + step * SETTLEMENT_PERIOD
+                ),
+                **{
+                    field_name: price
+                    for field_name in RTMPointInTimePriceData.model_fields
+                    if field_name.endswith("_price_in_rs_per_mwh")
+                },
+            )
+        )
+        if len(chunk) == chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _serialize_with_orm(db_session, time_frame: TimeFrame) -> int:
+    """
+    The read path before the Core rewrite: ORM instances splatted into
+    pydantic models which are then dumped to json
+    """
+    price_data = (
+        RTMPointInTimePriceData(
+            settlement_period_start_datetime=convert_timestamp_to_indian_datetime(
+                price_record.settlement_period_start_timestamp
+            ),
+            **price_record.__dict__,
+        )
+        for price_record in iter_rtm_price_records(db_session, time_frame)
+    )
+    return sum(map(len, iter_price_data_as_json_array(price_data)))
+
+
+def _serialize_with_core(db_session, time_frame: TimeFrame) -> int:
+    field_names = [
+        column.name for column in get_price_row_columns(RTMPointInTimePriceDataDb)
+    ]
+    price_rows = iter_rtm_price_rows(db_session, time_frame)
+    return sum(map(len, iter_price_rows_as_json_array(price_rows, field_names)))
+
+
+def _serialize_with_core_columnar(db_session, time_frame: TimeFrame) -> int:
+    field_names = [
+        column.name for column in get_price_row_columns(RTMPointInTimePriceDataDb)
+    ]
+    price_rows = list(iter_rtm_price_rows(db_session, time_frame))
+    return len(convert_price_rows_to_columnar_json(price_rows, field_names))
+
+
+READ_PATH_TO_SERIALIZING_FN_MAP: dict[
+    str, typing.Callable[[typing.Any, TimeFrame], int]
+] = {
+    "orm": _serialize_with_orm,
+    "core": _serialize_with_core,
+    "core_columnar": _serialize_with_core_columnar,
+}
+
+
+@click.command()
+@click.option("--days", type=click.IntRange(min=1), default=365)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=3,
+    help="Number of timed runs per read path, the best one is reported",
+)
+def benchmark_read_path(days: int, repeat: int) -> None:
+    num_rows = int(datetime.timedelta(days=days) / SETTLEMENT_PERIOD)
+    time_frame = TimeFrame(
+        start_datetime=BENCHMARK_START_DATETIME,
+        end_datetime=BENCHMARK_START_DATETIME + datetime.timedelta(days=days),
+    )
+    connection = engine.connect()
+    transaction = connection.begin()
+    db_session = sessionmaker(bind=connection)()
+    try:
+        copy_multiple_rtm_price_records(
+            db_session,
+            _iter_synthetic_rtm_chunks(num_rows),
+            ConflictResolution.UPDATE,
+        )
+        rows_per_second_by_read_path = {}
+        for read_path, serializing_fn in READ_PATH_TO_SERIALIZING_FN_MAP.items():
+            elapsed_seconds = []
+            for _ in range(repeat):
+                # start every run with an empty identity map
+                db_session.expunge_all()
+                start_time = time.perf_counter()
+                num_bytes = serializing_fn(db_session, time_frame)
+                elapsed_seconds.append(time.perf_counter() - start_time)
+            rows_per_second = num_rows / min(elapsed_seconds)
+            rows_per_second_by_read_path[read_path] = rows_per_second
+            click.echo(
+                f"{read_path}: {num_rows} rows ({num_bytes} bytes) in "
+                f"{min(elapsed_seconds):.2f}s ({rows_per_second:.0f} rows/sec)"
+            )
+        for read_path, rows_per_second in rows_per_second_by_read_path.items():
+            if read_path != "orm":
+                speedup = rows_per_second / rows_per_second_by_read_path["orm"]
+                click.echo(f"{read_path} is {speedup:.1f}x the rows/sec of orm")
+    finally:
+        db_session.close()
+        transaction.rollback()
+        connection.close()
+
+
+if __name__ == "__main__":
+    benchmark_read_path()
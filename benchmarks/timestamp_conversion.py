@@ -0,0 +1,115 @@
+"""
+Compares the per row pytz conversion of the settlement period timestamps to
+market time, which the read path used before, with the batch fixed offset
+conversion, alone and as part of serializing a request worth of price rows
+to json. No database is needed
+
+    python -m benchmarks.timestamp_conversion --days 365 --repeat 5
+"""
+import datetime
+import time
+import typing
+
+import click
+import orjson
+import pytz
+
+from src.common.constants import MARKET_TZ
+from src.common.utils import convert_timestamps_to_indian_datetimes
+from src.marketdata.models import RTMPointInTimePriceDataDb, get_price_row_columns
+from src.marketdata.schema_utils import convert_price_rows_to_json_objects
+
+SETTLEMENT_PERIOD_SECONDS = 15 * 60
+BENCHMARK_START_TIMESTAMP = int(
+    MARKET_TZ.localize(datetime.datetime(2021, 1, 1)).timestamp()
+)
+
+
+def _convert_timestamp_with_pytz(unix_timestamp: int) -> datetime.datetime:
+    utc_time = datetime.datetime.utcfromtimestamp(unix_timestamp)
+    return utc_time.replace(tzinfo=pytz.utc).astimezone(MARKET_TZ)
+
+
+def _convert_per_row(unix_timestamps: list[int], price_rows, field_names) -> int:
+    return len(
+        [_convert_timestamp_with_pytz(timestamp) for timestamp in unix_timestamps]
+    )
+
+
+def _convert_batch(unix_timestamps: list[int], price_rows, field_names) -> int:
+    return len(convert_timestamps_to_indian_datetimes(unix_timestamps))
+
+
+def _serialize_per_row(unix_timestamps: list[int], price_rows, field_names) -> int:
+    value_field_names = field_names[1:]
+    return len(
+        orjson.dumps(
+            [
+                {
+                    "settlement_period_start_datetime": _convert_timestamp_with_pytz(
+                        price_row[0]
+                    ),
+                    **dict(zip(value_field_names, price_row[1:])),
+                }
+                for price_row in price_rows
+            ]
+        )
+    )
+
+
+def _serialize_batch(unix_timestamps: list[int], price_rows, field_names) -> int:
+    return len(convert_price_rows_to_json_objects(price_rows, field_names))
+
+
+CONVERSION_TO_TIMED_FN_MAP: dict[str, typing.Callable[..., int]] = {
+    "convert per row (pytz)": _convert_per_row,
+    "convert batch (fixed offset)": _convert_batch,
+    "json per row (pytz)": _serialize_per_row,
+    "json batch (fixed offset)": _serialize_batch,
+}
+
+
+@click.command()
+@click.option("--days", type=click.IntRange(min=1), default=365)
+@click.option(
+    "--repeat",
+    type=click.IntRange(min=1),
+    default=5,
+    help="Number of timed runs per conversion, the best one is reported",
+)
+def benchmark_timestamp_conversion(days: int, repeat: int) -> None:
+    num_rows = days * 24 * 60 * 60 // SETTLEMENT_PERIOD_SECONDS
+    field_names = [
+        column.name for column in get_price_row_columns(RTMPointInTimePriceDataDb)
+    ]
+    unix_timestamps = [
+        BENCHMARK_START_TIMESTAMP + step * SETTLEMENT_PERIOD_SECONDS
+        for step in range(num_rows)
+    ]
+    price_rows = [
+        (timestamp, *[1000.0] * (len(field_names) - 2), None)
+        for timestamp in unix_timestamps
+    ]
+    best_seconds_by_conversion = {}
+    for conversion, timed_fn in CONVERSION_TO_TIMED_FN_MAP.items():
+        elapsed_seconds = []
+        for _ in range(repeat):
+            start_time = time.perf_counter()
+            timed_fn(unix_timestamps, price_rows, field_names)
+            elapsed_seconds.append(time.perf_counter() - start_time)
+        best_seconds_by_conversion[conversion] = min(elapsed_seconds)
+        click.echo(
+            f"{conversion}: {num_rows} rows in {min(elapsed_seconds) * 1000:.1f}ms "
+            f"({min(elapsed_seconds) / num_rows * 1e9:.0f}ns/row)"
+        )
+    for step in ("convert", "json"):
+        per_row_seconds = best_seconds_by_conversion[f"{step} per row (pytz)"]
+        batch_seconds = best_seconds_by_conversion[f"{step} batch (fixed offset)"]
+        click.echo(
+            f"{step}: batch saves {(per_row_seconds - batch_seconds) * 1000:.1f}ms "
+            f"per request ({per_row_seconds / batch_seconds:.1f}x faster)"
+        )
+
+
+if __name__ == "__main__":
+    benchmark_timestamp_conversion()
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import threading
+import time
+import typing
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.common.config import (
+    BROTLI_COMPRESSION_LEVEL,
+    COMPRESSION_MIN_SIZE_BYTES,
+    GZIP_COMPRESSION_LEVEL,
+    ZSTD_COMPRESSION_LEVEL,
+)
+from src.common.enums import ContentEncoding, ResponseFormat
+from src.common.utils import parse_quality_values
+
+# brotli and zstandard are installed with the compression extra, without them
+# only gzip is negotiated
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# media types whose bodies are compressed already
+INCOMPRESSIBLE_MEDIA_TYPES = {"application/gzip", ResponseFormat.PARQUET.value}
+
+
+class StreamCompressor(typing.Protocol):
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        ...
+
+    def finish(self) -> bytes:
+        ...
+
+
+class GzipCompressor:
+    def __init__(self, level: int = GZIP_COMPRESSION_LEVEL):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        compressed = self._compressor.compress(data)
+        if flush:
+            compressed += self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        return compressed
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, level: int = BROTLI_COMPRESSION_LEVEL):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        compressed = self._compressor.process(data)
+        if flush:
+            compressed += self._compressor.flush()
+        return compressed
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int = ZSTD_COMPRESSION_LEVEL):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes, flush: bool = True) -> bytes:
+        compressed = self._compressor.compress(data)
+        if flush:
+            compressed += self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return compressed
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+CONTENT_ENCODING_TO_COMPRESSOR_MAP: dict[
+    ContentEncoding, typing.Callable[[], StreamCompressor]
+] = {ContentEncoding.GZIP: GzipCompressor}
+if brotli is not None:
+    CONTENT_ENCODING_TO_COMPRESSOR_MAP[ContentEncoding.BROTLI] = BrotliCompressor
+if zstandard is not None:
+    CONTENT_ENCODING_TO_COMPRESSOR_MAP[ContentEncoding.ZSTD] = ZstdCompressor
+
+
+def negotiate_content_encoding(
+    accept_encoding: str | None,
+) -> ContentEncoding | None:
+    """
+    Picks the available content encoding with the highest quality in the
+    Accept-Encoding header, ties going to the order of ContentEncoding.
+    Returns None when the response should not be compressed
+    """
+    if not accept_encoding:
+        return None
+    quality_by_token = dict(parse_quality_values(accept_encoding))
+    wildcard_quality = quality_by_token.get("*", 0.0)
+    candidates = [
+        (-quality_by_token.get(content_encoding.value, wildcard_quality), position)
+        for position, content_encoding in enumerate(ContentEncoding)
+        if content_encoding in CONTENT_ENCODING_TO_COMPRESSOR_MAP
+    ]
+    negative_quality, position = min(candidates)
+    if negative_quality >= 0:
+        return None
+    return list(ContentEncoding)[position]
+
+
+def is_compressible_media_type(media_type: str | None) -> bool:
+    if media_type is None:
+        return True
+    return media_type.split(";")[0].strip().lower() not in INCOMPRESSIBLE_MEDIA_TYPES
+
+
+class CompressionStats:
+    """
+    Per content encoding counters of the compressed responses, the bytes
+    before and after compression and the cpu time spent compressing
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def record(
+        self,
+        content_encoding: ContentEncoding,
+        uncompressed_bytes: int,
+        compressed_bytes: int,
+        cpu_seconds: float,
+        is_new_response: bool = False,
+    ) -> None:
+        with self._lock:
+            stats = self._stats_by_encoding[content_encoding]
+            stats["responses"] += int(is_new_response)
+            stats["uncompressed_bytes"] += uncompressed_bytes
+            stats["compressed_bytes"] += compressed_bytes
+            stats["cpu_seconds"] += cpu_seconds
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats_by_encoding: dict[ContentEncoding, dict[str, float]] = {
+                content_encoding: {
+                    "responses": 0,
+                    "uncompressed_bytes": 0,
+                    "compressed_bytes": 0,
+                    "cpu_seconds": 0.0,
+                }
+                for content_encoding in ContentEncoding
+            }
+
+    def get_stats(self) -> dict[str, dict[str, float]]:
+        with self._lock:
+            return {
+                content_encoding.value: {
+                    **stats,
+                    "bytes_saved": (
+                        stats["uncompressed_bytes"] - stats["compressed_bytes"]
+                    ),
+                }
+                for content_encoding, stats in self._stats_by_encoding.items()
+            }
+
+
+compression_stats = CompressionStats()
+
+
+def compress_chunk(
+    compressor: StreamCompressor,
+    content_encoding: ContentEncoding,
+    data: bytes,
+    is_first_chunk: bool = False,
+    is_last_chunk: bool = False,
+) -> bytes:
+    """
+    Compresses a chunk of a response, flushing it so it can be sent right
+    away, and records the cpu time and sizes in compression_stats
+    """
+    start_cpu_time = time.thread_time()
+    compressed = compressor.compress(data, flush=not is_last_chunk)
+    if is_last_chunk:
+        compressed += compressor.finish()
+    compression_stats.record(
+        content_encoding,
+        len(data),
+        len(compressed),
+        time.thread_time() - start_cpu_time,
+        is_new_response=is_first_chunk,
+    )
+    return compressed
+
+
+def compress_body(body: bytes, content_encoding: ContentEncoding) -> bytes:
+    return compress_chunk(
+        CONTENT_ENCODING_TO_COMPRESSOR_MAP[content_encoding](),
+        content_encoding,
+        body,
+        is_first_chunk=True,
+        is_last_chunk=True,
+    )
+
+
+class CompressionMiddleware:
+    """
+    Compresses the http responses with the content encoding negotiated from
+    the Accept-Encoding header, like starlette's GZipMiddleware but with
+    brotli and zstd. Streamed bodies are compressed chunk by chunk. Complete
+    bodies smaller than minimum_size and responses that set their own
+    Content-Encoding (Ex: cached compressed bodies) are sent as they are
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = COMPRESSION_MIN_SIZE_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            content_encoding = negotiate_content_encoding(
+                Headers(scope=scope).get("Accept-Encoding")
+            )
+            if content_encoding is not None:
+                responder = _CompressionResponder(
+                    self.app, self.minimum_size, content_encoding
+                )
+                await responder(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _CompressionResponder:
+    def __init__(
+        self, app: ASGIApp, minimum_size: int, content_encoding: ContentEncoding
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.content_encoding = content_encoding
+        self.compressor: StreamCompressor | None = None
+        self.send: Send | None = None
+        self.initial_message: Message = {}
+        self.started = False
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # the headers depend on the first body message
+            self.initial_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.initial_message["headers"])
+            if (
+                "content-encoding" not in headers
+                and is_compressible_media_type(headers.get("content-type"))
+                and (more_body or len(body) >= self.minimum_size)
+            ):
+                self.compressor = CONTENT_ENCODING_TO_COMPRESSOR_MAP[
+                    self.content_encoding
+                ]()
+                headers["Content-Encoding"] = self.content_encoding.value
+                if "accept-encoding" not in headers.get("vary", "").lower():
+                    headers.add_vary_header("Accept-Encoding")
+                del headers["Content-Length"]
+                message["body"] = compress_chunk(
+                    self.compressor,
+                    self.content_encoding,
+                    body,
+                    is_first_chunk=True,
+                    is_last_chunk=not more_body,
+                )
+                if not more_body:
+                    headers["Content-Length"] = str(len(message["body"]))
+            await self.send(self.initial_message)
+        elif self.compressor is not None:
+            message["body"] = compress_chunk(
+                self.compressor,
+                self.content_encoding,
+                body,
+                is_last_chunk=not more_body,
+            )
+        await self.send(message)
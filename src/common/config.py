@@ -1,3 +1,43 @@
 import os
 
 LOGGING_LEVEL = os.getenv("LOGGING_LEVEL", "INFO")
+PRICE_CACHE_MAX_ENTRIES = int(os.getenv("PRICE_CACHE_MAX_ENTRIES", "256"))
+PRICE_CACHE_TTL_SECONDS = float(os.getenv("PRICE_CACHE_TTL_SECONDS", "60"))
+PRICE_CACHE_MAX_ENTRY_BYTES = int(
+    os.getenv("PRICE_CACHE_MAX_ENTRY_BYTES", str(8 * 1024 * 1024))
+)
+# bound on the bodies and compressed bodies held by the cache as a whole
+PRICE_CACHE_MAX_BYTES = int(os.getenv("PRICE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+HISTORICAL_PRICE_MAX_AGE_SECONDS = int(
+    os.getenv("HISTORICAL_PRICE_MAX_AGE_SECONDS", str(24 * 60 * 60))
+)
+COMPRESSION_MIN_SIZE_BYTES = int(os.getenv("COMPRESSION_MIN_SIZE_BYTES", "1024"))
+GZIP_COMPRESSION_LEVEL = int(os.getenv("GZIP_COMPRESSION_LEVEL", "6"))
+BROTLI_COMPRESSION_LEVEL = int(os.getenv("BROTLI_COMPRESSION_LEVEL", "4"))
+ZSTD_COMPRESSION_LEVEL = int(os.getenv("ZSTD_COMPRESSION_LEVEL", "3"))
+LATEST_PRICE_BUFFER_SIZE = int(os.getenv("LATEST_PRICE_BUFFER_SIZE", "96"))
+LATEST_PRICE_REFRESH_SECONDS = float(os.getenv("LATEST_PRICE_REFRESH_SECONDS", "60"))
+PRICE_STREAM_MAX_QUEUED_BATCHES = int(
+    os.getenv("PRICE_STREAM_MAX_QUEUED_BATCHES", "100")
+)
+PRICE_STREAM_KEEPALIVE_SECONDS = float(
+    os.getenv("PRICE_STREAM_KEEPALIVE_SECONDS", "15")
+)
+PRICE_STREAM_RECONNECT_MAX_SECONDS = float(
+    os.getenv("PRICE_STREAM_RECONNECT_MAX_SECONDS", "60")
+)
+# a request is profiled when profiling is enabled and its X-Profile-Token
+# header matches PROFILING_TOKEN, see src.common.profiling
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL_SECONDS = float(
+    os.getenv("PROFILE_SAMPLE_INTERVAL_SECONDS", "0.005")
+)
+# the scrapers do not serve /metrics, their timings are written to this file
+# for the node exporter textfile collector when it is set
+SCRAPER_METRICS_TEXTFILE_PATH = os.getenv("SCRAPER_METRICS_TEXTFILE_PATH", "")
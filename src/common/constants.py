@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from datetime import timedelta
+from datetime import timedelta, timezone
 
 import pytz
 
@@ -22,6 +22,14 @@ STATE_ZONES = [
     "W3",
 ]
 ALL_PRICE_COLUMNS = STATE_ZONES + ["MCP"]
+PRICE_COLUMN_TO_FIELD_NAME_MAP = {
+    price_column: f"{price_column.lower()}_price_in_rs_per_mwh"
+    for price_column in ALL_PRICE_COLUMNS
+}
+PRICE_FIELD_NAME_TO_SPREAD_FIELD_NAME_MAP = {
+    field_name: field_name.replace("_price_", "_spread_")
+    for field_name in PRICE_COLUMN_TO_FIELD_NAME_MAP.values()
+}
 PRICE_PER_UNIT_ENERGY_UNIT = "Rs/MWh"
 MARKET_TIME_STEP_IN_MINUTES = 15
 MARKET_TIME_DELTA = timedelta(minutes=MARKET_TIME_STEP_IN_MINUTES)
@@ -29,3 +37,6 @@ NUM_TIME_STEPS_IN_HOUR = 4
 NUM_HOURS_IN_DAY = 24
 NUM_TIME_STEPS_IN_DAY = NUM_TIME_STEPS_IN_HOUR * NUM_HOURS_IN_DAY
 MARKET_TZ = pytz.timezone("Asia/Kolkata")
+# Indian Standard Time has had no daylight saving or offset change since 1945
+MARKET_UTC_OFFSET = timedelta(hours=5, minutes=30)
+MARKET_FIXED_OFFSET_TZ = timezone(MARKET_UTC_OFFSET, "IST")
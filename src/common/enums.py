@@ -4,3 +4,79 @@ from enum import Enum
 class Markets(Enum):
     RTM = "rtm"
     DAM = "dam"
+
+
+class ConflictResolution(Enum):
+    """
+    What to do when a price record for an already stored
+    settlement period is written again
+    """
+
+    UPDATE = "update"
+    IGNORE = "ignore"
+
+
+class Granularity(Enum):
+    """
+    Bucket sizes of the precomputed price rollups. The values are
+    valid postgres date_trunc fields
+    """
+
+    HOUR = "hour"
+    DAY = "day"
+    MONTH = "month"
+
+
+class ResponseFormat(Enum):
+    """
+    Formats the price records can be returned in, the values
+    are the media types they are negotiated with
+    """
+
+    JSON = "application/json"
+    ARROW = "application/vnd.apache.arrow.stream"
+    PARQUET = "application/x-parquet"
+
+
+class ResponseShape(Enum):
+    """
+    Layouts of the json price records. ROWS is an array of one object per
+    settlement period, COLUMNAR a single object with one array per zone
+    """
+
+    ROWS = "rows"
+    COLUMNAR = "columnar"
+
+
+class ExportFormat(Enum):
+    """
+    Flat file formats of the price record exports, the values are
+    the extensions of the export paths
+    """
+
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+
+class ContentEncoding(Enum):
+    """
+    Compressions the responses can be negotiated with, in order of
+    preference. The values are the Accept-Encoding tokens
+    """
+
+    ZSTD = "zstd"
+    BROTLI = "br"
+    GZIP = "gzip"
+
+
+class ResampleAggregation(Enum):
+    """
+    How the prices of the settlement periods in a resampled bucket are
+    combined. FIRST and LAST take the earliest and latest settlement period
+    """
+
+    MEAN = "mean"
+    MIN = "min"
+    MAX = "max"
+    FIRST = "first"
+    LAST = "last"
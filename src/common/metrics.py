@@ -0,0 +1,416 @@
+from __future__ import annotations
+
+import bisect
+import collections
+import contextlib
+import math
+import os
+import threading
+import time
+import typing
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.common.enums import Markets
+
+LATENCY_BUCKETS_SECONDS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+ROW_COUNT_BUCKETS = (1, 10, 100, 1000, 10000, 100000, 1000000)
+PROMETHEUS_TEXT_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _format_labels(label_names: typing.Sequence[str], label_values: tuple) -> str:
+    if not label_names:
+        return ""
+    formatted_labels = ",".join(
+        '{}="{}"'.format(
+            label_name,
+            str(label_value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for label_name, label_value in zip(label_names, label_values)
+    )
+    return "{" + formatted_labels + "}"
+
+
+class Counter:
+    """
+    Monotonic counter per combination of label values, given positionally in
+    the order of label_names
+    """
+
+    def __init__(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        self._values: collections.defaultdict[tuple, float] = collections.defaultdict(
+            float
+        )
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] += amount
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} counter",
+            *(
+                f"{self.name}{_format_labels(self.label_names, label_values)} "
+                f"{_format_value(value)}"
+                for label_values, value in sorted(values.items())
+            ),
+        ]
+
+
+class Histogram:
+    """
+    Histogram with fixed bucket upper bounds per combination of label
+    values. An observation costs a bisect and a few additions under a lock,
+    the cumulative bucket counts are only computed when collected
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: typing.Sequence[float] = LATENCY_BUCKETS_SECONDS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        # per label values: the count of every bucket plus +Inf, and the sum
+        self._bucket_counts: dict[tuple, list[int]] = {}
+        self._sums: collections.defaultdict[tuple, float] = collections.defaultdict(
+            float
+        )
+
+    def observe(self, value: float, *label_values) -> None:
+        bucket_index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            bucket_counts = self._bucket_counts.get(label_values)
+            if bucket_counts is None:
+                bucket_counts = self._bucket_counts[label_values] = [0] * (
+                    len(self.buckets) + 1
+                )
+            bucket_counts[bucket_index] += 1
+            self._sums[label_values] += value
+
+    @contextlib.contextmanager
+    def time(self, *label_values) -> typing.Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_time, *label_values)
+
+    def get_sum(self, *label_values) -> float:
+        with self._lock:
+            return self._sums.get(label_values, 0.0)
+
+    def get_counts_and_sums(self) -> dict[tuple, tuple[int, float]]:
+        """
+        Number of observations and their sum per combination of label values
+        """
+        with self._lock:
+            return {
+                label_values: (sum(bucket_counts), self._sums[label_values])
+                for label_values, bucket_counts in self._bucket_counts.items()
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._bucket_counts.clear()
+            self._sums.clear()
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            bucket_counts_by_labels = {
+                label_values: list(bucket_counts)
+                for label_values, bucket_counts in self._bucket_counts.items()
+            }
+            sums = dict(self._sums)
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} histogram",
+        ]
+        label_names = (*self.label_names, "le")
+        for label_values, bucket_counts in sorted(bucket_counts_by_labels.items()):
+            cumulative_count = 0
+            for upper_bound, bucket_count in zip(
+                (*self.buckets, math.inf), bucket_counts
+            ):
+                cumulative_count += bucket_count
+                bucket_labels = _format_labels(
+                    label_names, (*label_values, _format_value(upper_bound))
+                )
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative_count}")
+            labels = _format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(sums[label_values])}")
+            lines.append(f"{self.name}_count{labels} {cumulative_count}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    The metrics of the process, rendered in the Prometheus text exposition
+    format. Collectors are called on every render for values that are kept
+    elsewhere (Ex: the price response cache counters)
+    """
+
+    def __init__(self):
+        self._metrics: list[Counter | Histogram] = []
+        self._collectors: list[typing.Callable[[], list[str]]] = []
+
+    def counter(
+        self, name: str, documentation: str, label_names: tuple[str, ...] = ()
+    ) -> Counter:
+        counter = Counter(name, documentation, label_names)
+        self._metrics.append(counter)
+        return counter
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        label_names: tuple[str, ...] = (),
+        buckets: typing.Sequence[float] = LATENCY_BUCKETS_SECONDS,
+    ) -> Histogram:
+        histogram = Histogram(name, documentation, label_names, buckets)
+        self._metrics.append(histogram)
+        return histogram
+
+    def register_collector(self, collector: typing.Callable[[], list[str]]) -> None:
+        self._collectors.append(collector)
+
+    def clear(self) -> None:
+        for metric in self._metrics:
+            metric.clear()
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.collect())
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def format_gauges(
+    name: str,
+    documentation: str,
+    label_names: tuple[str, ...],
+    values: dict[tuple, float],
+    metric_type: str = "gauge",
+) -> list[str]:
+    """
+    Exposition lines of a metric whose values are read at collection time
+    """
+    return [
+        f"# HELP {name} {documentation}",
+        f"# TYPE {name} {metric_type}",
+        *(
+            f"{name}{_format_labels(label_names, label_values)} {_format_value(value)}"
+            for label_values, value in values.items()
+        ),
+    ]
+
+
+def write_textfile(
+    file_path: str, metrics: typing.Iterable[Counter | Histogram]
+) -> None:
+    """
+    Writes the metrics in the Prometheus text exposition format for the
+    node exporter textfile collector, for processes that are not scraped
+    (Ex: the price scrapers). The file is replaced atomically so the
+    collector never reads a partial file
+    """
+    lines = [line for metric in metrics for line in metric.collect()]
+    temporary_file_path = f"{file_path}.{os.getpid()}.tmp"
+    with open(temporary_file_path, "w") as textfile:
+        textfile.write("\n".join(lines) + "\n")
+    os.replace(temporary_file_path, file_path)
+
+
+metrics_registry = MetricsRegistry()
+
+HTTP_REQUEST_DURATION_SECONDS = metrics_registry.histogram(
+    "http_request_duration_seconds",
+    "Time from receiving the request to sending the last byte of the response",
+    ("method", "route", "market", "status_code"),
+)
+PRICE_READ_PHASE_DURATION_SECONDS = metrics_registry.histogram(
+    "price_read_phase_duration_seconds",
+    "Time a price read spends in the query and serialization phases, and "
+    "in the orm_to_pydantic phase on /aggregate only",
+    ("market", "phase"),
+)
+PRICE_ROWS_PER_REQUEST = metrics_registry.histogram(
+    "price_rows_per_request",
+    "Number of price rows fetched from the database by a request",
+    ("market",),
+    buckets=ROW_COUNT_BUCKETS,
+)
+DB_POOL_CHECKOUT_WAIT_SECONDS = metrics_registry.histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a connection from the database pool",
+    ("pool",),
+)
+SCRAPER_PHASE_DURATION_SECONDS = metrics_registry.histogram(
+    "scraper_phase_duration_seconds",
+    "Time the price scrapers spend rendering the pages, parsing them to a "
+    "soup, finding the price table and parsing its rows",
+    ("engine", "phase"),
+)
+
+
+class PriceReadTimer:
+    """
+    Splits the time spent producing a streamed price response between
+    fetching the rows from the database and serializing them. The rows and
+    the response body are wrapped in it, the body time not spent waiting
+    for rows is the serialization
+    """
+
+    def __init__(self, market: Markets):
+        self.market = market.value
+        self.query_seconds = 0.0
+        self.num_rows = 0
+
+    @contextlib.contextmanager
+    def time_query(self) -> typing.Iterator[None]:
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.query_seconds += time.perf_counter() - start_time
+
+    async def aiter_rows(
+        self,
+        price_rows: typing.AsyncIterable[typing.Sequence],
+        rows_per_chunk: int = 1000,
+    ) -> typing.AsyncIterator[typing.Sequence]:
+        """
+        Fetches the rows rows_per_chunk at a time, timing every chunk instead
+        of every row to keep the cost per row down to that of passing it on
+        """
+        price_row_iterator = price_rows.__aiter__()
+        while True:
+            start_time = time.perf_counter()
+            chunk = []
+            async for price_row in price_row_iterator:
+                chunk.append(price_row)
+                if len(chunk) == rows_per_chunk:
+                    break
+            self.query_seconds += time.perf_counter() - start_time
+            self.num_rows += len(chunk)
+            for price_row in chunk:
+                yield price_row
+            if len(chunk) < rows_per_chunk:
+                return
+
+    async def aiter_body(
+        self, body: typing.AsyncIterable[bytes]
+    ) -> typing.AsyncIterator[bytes]:
+        # pages are fetched before the body is streamed, only the rows
+        # fetched while streaming are taken out of the body time
+        query_seconds_before_body = self.query_seconds
+        start_time = time.perf_counter()
+        try:
+            async for chunk in body:
+                yield chunk
+        finally:
+            body_seconds = time.perf_counter() - start_time
+            self.observe(
+                body_seconds - (self.query_seconds - query_seconds_before_body)
+            )
+
+    def observe(self, serialization_seconds: float) -> None:
+        PRICE_READ_PHASE_DURATION_SECONDS.observe(
+            self.query_seconds, self.market, "query"
+        )
+        PRICE_READ_PHASE_DURATION_SECONDS.observe(
+            max(serialization_seconds, 0.0), self.market, "serialization"
+        )
+        PRICE_ROWS_PER_REQUEST.observe(self.num_rows, self.market)
+
+
+def _get_market_label(scope: Scope) -> str:
+    market_value = scope.get("path_params", {}).get("market")
+    if market_value is not None:
+        return getattr(market_value, "value", str(market_value))
+    route = scope.get("route")
+    last_path_segment = getattr(route, "path", "").rsplit("/", 1)[-1]
+    if last_path_segment in {market.value for market in Markets}:
+        return last_path_segment
+    return ""
+
+
+class MetricsMiddleware:
+    """
+    Records the latency of every http request in
+    HTTP_REQUEST_DURATION_SECONDS, labelled with the route template (not the
+    path, to keep the number of series bounded) and the market it reads
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start_time = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_DURATION_SECONDS.observe(
+                time.perf_counter() - start_time,
+                scope["method"],
+                getattr(route, "path", "unmatched"),
+                _get_market_label(scope),
+                str(status_code),
+            )
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import collections
+import contextvars
+import hmac
+import os
+import sys
+import threading
+import time
+import typing
+import uuid
+
+import orjson
+import sqlalchemy
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.common import logging_utils
+from src.common.config import (
+    PROFILE_OUTPUT_DIR,
+    PROFILE_SAMPLE_INTERVAL_SECONDS,
+    PROFILING_TOKEN,
+)
+
+PROFILE_TOKEN_HEADER = "X-Profile-Token"
+PROFILE_ID_HEADER = "X-Profile-Id"
+
+logger = logging_utils.create_logger(__name__)
+
+
+class SqlStatementTiming(typing.NamedTuple):
+    statement: str
+    duration_seconds: float
+
+
+class StackSampler:
+    """
+    Samples the stack of a thread every interval_seconds from a background
+    thread and counts the samples per stack, which is the collapsed stack
+    format that flamegraph.pl and speedscope read. The event loop thread is
+    shared by all the requests, so requests served while the profiled one
+    runs show up in its samples too
+    """
+
+    def __init__(self, thread_id: int, interval_seconds: float):
+        self.thread_id = thread_id
+        self.interval_seconds = interval_seconds
+        self.sample_counts: collections.Counter[str] = collections.Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        self._thread.join()
+
+    def _sample(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(
+                    f"{code.co_name} "
+                    f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if stack:
+                self.sample_counts[";".join(reversed(stack))] += 1
+
+    def to_collapsed_stacks(self) -> str:
+        return "".join(
+            f"{stack} {count}\n" for stack, count in self.sample_counts.most_common()
+        )
+
+
+class RequestProfile:
+    """
+    Stack samples and SQL statements of a profiled request
+    """
+
+    def __init__(self, scope: Scope, interval_seconds: float):
+        self.profile_id = uuid.uuid4().hex
+        self.method = scope["method"]
+        self.path = scope["path"]
+        self.query_string = scope.get("query_string", b"").decode()
+        self.status_code: int | None = None
+        self.duration_seconds = 0.0
+        self.sql_statement_timings: list[SqlStatementTiming] = []
+        self.stack_sampler = StackSampler(threading.get_ident(), interval_seconds)
+
+    def to_dict(self) -> dict:
+        return {
+            "profile_id": self.profile_id,
+            "method": self.method,
+            "path": self.path,
+            "query_string": self.query_string,
+            "status_code": self.status_code,
+            "duration_seconds": self.duration_seconds,
+            "sample_interval_seconds": self.stack_sampler.interval_seconds,
+            "num_samples": sum(self.stack_sampler.sample_counts.values()),
+            "sql_seconds": sum(
+                timing.duration_seconds for timing in self.sql_statement_timings
+            ),
+            "sql_statements": [
+                timing._asdict() for timing in self.sql_statement_timings
+            ],
+        }
+
+    def write(self, output_dir: str) -> None:
+        """
+        Writes the collapsed stacks to <profile_id>.folded and the request
+        and its SQL statements to <profile_id>.json
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        file_path = os.path.join(output_dir, self.profile_id)
+        with open(f"{file_path}.folded", "w") as folded_file:
+            folded_file.write(self.stack_sampler.to_collapsed_stacks())
+        with open(f"{file_path}.json", "wb") as json_file:
+            json_file.write(orjson.dumps(self.to_dict(), option=orjson.OPT_INDENT_2))
+
+
+# the profile of the request being served, the async sessions run their
+# statements in greenlets that share the context of the calling task
+current_request_profile: contextvars.ContextVar[
+    RequestProfile | None
+] = contextvars.ContextVar("current_request_profile", default=None)
+
+
+def _before_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    if current_request_profile.get() is not None:
+        conn.info.setdefault("profile_query_start_times", []).append(
+            time.perf_counter()
+        )
+
+
+def _after_cursor_execute(
+    conn, cursor, statement, parameters, context, executemany
+) -> None:
+    request_profile = current_request_profile.get()
+    query_start_times = conn.info.get("profile_query_start_times")
+    if request_profile is not None and query_start_times:
+        request_profile.sql_statement_timings.append(
+            SqlStatementTiming(statement, time.perf_counter() - query_start_times.pop())
+        )
+
+
+def record_sql_statement_timings(engine: sqlalchemy.Engine) -> None:
+    """
+    Records the statements executed on the engine, and the time until their
+    first rows are available, in the profile of the request executing them.
+    Rows fetched later from a server side cursor are not timed
+    """
+    if not sqlalchemy.event.contains(
+        engine, "before_cursor_execute", _before_cursor_execute
+    ):
+        sqlalchemy.event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        sqlalchemy.event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class ProfilingMiddleware:
+    """
+    Profiles the requests whose X-Profile-Token header matches the token and
+    writes their profiles to output_dir, returning the profile id in the
+    X-Profile-Id header. One request is profiled at a time, requests sent
+    while another one is profiled are served without profiling. The
+    middleware is only added when profiling is enabled, so it costs nothing
+    otherwise
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        token: str = PROFILING_TOKEN,
+        output_dir: str = PROFILE_OUTPUT_DIR,
+        sample_interval_seconds: float = PROFILE_SAMPLE_INTERVAL_SECONDS,
+    ):
+        self.app = app
+        self.token = token.encode()
+        self.output_dir = output_dir
+        self.sample_interval_seconds = sample_interval_seconds
+        self._lock = threading.Lock()
+
+    def _is_profiling_requested(self, scope: Scope) -> bool:
+        if scope["type"] != "http" or not self.token:
+            return False
+        profile_token = Headers(scope=scope).get(PROFILE_TOKEN_HEADER)
+        return profile_token is not None and hmac.compare_digest(
+            profile_token.encode(), self.token
+        )
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self._is_profiling_requested(scope):
+            await self.app(scope, receive, send)
+            return
+        if not self._lock.acquire(blocking=False):
+            logger.warning(
+                f"Not profiling {scope['path']}, another request is being profiled"
+            )
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self._profile(scope, receive, send)
+        finally:
+            self._lock.release()
+
+    async def _profile(self, scope: Scope, receive: Receive, send: Send) -> None:
+        request_profile = RequestProfile(scope, self.sample_interval_seconds)
+
+        async def send_with_profile_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                request_profile.status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                headers[PROFILE_ID_HEADER] = request_profile.profile_id
+            await send(message)
+
+        profile_token = current_request_profile.set(request_profile)
+        request_profile.stack_sampler.start()
+        start_time = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            request_profile.duration_seconds = time.perf_counter() - start_time
+            request_profile.stack_sampler.stop()
+            current_request_profile.reset(profile_token)
+            try:
+                request_profile.write(self.output_dir)
+            except OSError as e:
+                logger.error(
+                    f"Error while writing profile {request_profile.profile_id}: {e}"
+                )
@@ -1,15 +1,53 @@
 import datetime
+import itertools
+import typing
 
-import pytz
-
-from src.common.constants import MARKET_TZ
+from src.common.constants import MARKET_FIXED_OFFSET_TZ
 
 
 def convert_timestamp_to_indian_datetime(
     unix_timestamp: int,
 ) -> datetime.datetime:
     """
-    Converts the given naive datetime object in UTC to Indian Standard Time
+    Converts the unix timestamp to a datetime in Indian Standard Time
+    """
+    return datetime.datetime.fromtimestamp(unix_timestamp, MARKET_FIXED_OFFSET_TZ)
+
+
+def convert_timestamps_to_indian_datetimes(
+    unix_timestamps: typing.Iterable[int],
+) -> list[datetime.datetime]:
+    """
+    Converts a whole column of unix timestamps to datetimes in Indian
+    Standard Time at once. The offset is fixed, so every value is converted
+    in C without a time zone lookup
+    """
+    return list(
+        map(
+            datetime.datetime.fromtimestamp,
+            unix_timestamps,
+            itertools.repeat(MARKET_FIXED_OFFSET_TZ),
+        )
+    )
+
+
+def parse_quality_values(header_value: str) -> list[tuple[str, float]]:
+    """
+    Splits an Accept style header (Ex: "br;q=0.8, gzip") into its lowercased
+    values and their quality, in header order. Invalid qualities count as 0
     """
-    utc_time = datetime.datetime.utcfromtimestamp(unix_timestamp)
-    return utc_time.replace(tzinfo=pytz.utc).astimezone(MARKET_TZ)
+    quality_values = []
+    for header_item in header_value.split(","):
+        value, *params = [part.strip() for part in header_item.split(";")]
+        if not value:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, quality_str = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    quality = float(quality_str)
+                except ValueError:
+                    quality = 0.0
+        quality_values.append((value.lower(), quality))
+    return quality_values
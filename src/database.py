@@ -1,22 +1,152 @@
+import itertools
 import os
+import time
+import typing
 
+import sqlalchemy
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session as OrmSession
 from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from src.common.config import PROFILING_ENABLED
+from src.common.metrics import DB_POOL_CHECKOUT_WAIT_SECONDS
+from src.common.profiling import record_sql_statement_timings
 
 DB_USER = os.getenv("DB_USER")
 DB_PASSWORD = os.getenv("DB_PASSWORD")
 DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
+# comma separated replicas (Ex: replica-1:5432,replica-2:5432), the port
+# defaults to DB_PORT. Without replicas the reads go to the primary
+DB_READ_HOSTS = os.getenv("DB_READ_HOSTS", os.getenv("DB_READ_HOST", ""))
+DB_READ_NAME = os.getenv("DB_READ_NAME", DB_NAME)
 SQLALCHEMY_DATABASE_URI = (
     f"postgresql+psycopg2://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
+ASYNC_SQLALCHEMY_DATABASE_URI = (
+    f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
 ALEMBIC_REVISION_PATH = os.getenv("ALEMBIC_REVISION_PATH")
 ALEMBIC_INI_PATH = os.getenv("ALEMBIC_INI_PATH")
 
+
+def get_engine_pool_kwargs() -> dict:
+    """
+    Pool settings shared by every engine, read from DB_POOL_SIZE,
+    DB_MAX_OVERFLOW, DB_POOL_RECYCLE (seconds, -1 never recycles) and
+    DB_POOL_PRE_PING
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "-1")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "false").lower()
+        in ("1", "true", "yes"),
+    }
+
+
+class _TimedCheckoutMixin:
+    """
+    Records the time every checkout takes in DB_POOL_CHECKOUT_WAIT_SECONDS,
+    which includes waiting for a connection to be returned when the pool is
+    exhausted and opening a new connection
+    """
+
+    pool_label: str
+
+    def connect(self):
+        start_time = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            DB_POOL_CHECKOUT_WAIT_SECONDS.observe(
+                time.perf_counter() - start_time, self.pool_label
+            )
+
+
+class TimedQueuePool(_TimedCheckoutMixin, QueuePool):
+    pool_label = "sync"
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckoutMixin, AsyncAdaptedQueuePool):
+    pool_label = "async"
+
+
+def get_read_database_uris(driver: str) -> list[str]:
+    """
+    Database URIs of the read replicas listed in DB_READ_HOSTS
+    """
+    read_uris = []
+    for read_host in filter(None, map(str.strip, DB_READ_HOSTS.split(","))):
+        host, _, port = read_host.partition(":")
+        read_uris.append(
+            f"postgresql+{driver}://{DB_USER}:{DB_PASSWORD}"
+            f"@{host}:{port or DB_PORT}/{DB_READ_NAME}"
+        )
+    return read_uris
+
+
+class ReadReplicaRoutingSession(OrmSession):
+    """
+    Sends plain selects to a read replica and everything else (flushes,
+    inserts, updates, deletes and raw sql) to the primary. The replica is
+    picked round robin from replica_binds when the session is created, so a
+    request keeps reading from the same replica
+    """
+
+    def __init__(
+        self,
+        *args,
+        primary_bind: sqlalchemy.Engine,
+        replica_binds: typing.Iterator[sqlalchemy.Engine],
+        **kwargs,
+    ):
+        super().__init__(*args, **kwargs)
+        self.primary_bind = primary_bind
+        self.replica_bind = next(replica_binds)
+
+    def get_bind(self, mapper=None, clause=None, **kwargs) -> sqlalchemy.Engine:
+        if not self._flushing and isinstance(clause, sqlalchemy.Select):
+            return self.replica_bind
+        return self.primary_bind
+
+
 engine = create_engine(
     SQLALCHEMY_DATABASE_URI,
+    poolclass=TimedQueuePool,
+    **get_engine_pool_kwargs(),
+)
+
+# the API reads through the async engines, the scrapers and
+# migrations write through the sync one
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URI,
+    poolclass=TimedAsyncAdaptedQueuePool,
+    **get_engine_pool_kwargs(),
 )
+async_read_engines = [
+    create_async_engine(
+        read_uri, poolclass=TimedAsyncAdaptedQueuePool, **get_engine_pool_kwargs()
+    )
+    for read_uri in get_read_database_uris("asyncpg")
+] or [async_engine]
+
+if PROFILING_ENABLED:
+    for profiled_engine in [engine, async_engine, *async_read_engines]:
+        record_sql_statement_timings(
+            getattr(profiled_engine, "sync_engine", profiled_engine)
+        )
 
 Session = sessionmaker(bind=engine)
+AsyncSession = async_sessionmaker(bind=async_engine)
+AsyncReadSession = async_sessionmaker(
+    sync_session_class=ReadReplicaRoutingSession,
+    primary_bind=async_engine.sync_engine,
+    replica_binds=itertools.cycle(
+        [read_engine.sync_engine for read_engine in async_read_engines]
+    ),
+)
 Base = declarative_base()
@@ -1,13 +1,39 @@
+import asyncio
+
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 
 import src.marketdata.router
 from src.common import logging_utils
+from src.common.compression import CompressionMiddleware, compression_stats
+from src.common.config import (
+    LATEST_PRICE_REFRESH_SECONDS,
+    PROFILING_ENABLED,
+    PROFILING_TOKEN,
+)
+from src.common.metrics import (
+    PROMETHEUS_TEXT_MEDIA_TYPE,
+    MetricsMiddleware,
+    format_gauges,
+    metrics_registry,
+)
+from src.common.profiling import ProfilingMiddleware
 from src.manage import wait_for_postgres
+from src.marketdata.cache import price_response_cache
+from src.marketdata.stream import price_stream_broker
 
 app = FastAPI()
 app.include_router(src.marketdata.router.router)
+app.add_middleware(CompressionMiddleware)
+# added after the compression middleware so it wraps and times it too
+app.add_middleware(MetricsMiddleware)
 logger = logging_utils.create_logger(__name__)
+if PROFILING_ENABLED:
+    if PROFILING_TOKEN:
+        app.add_middleware(ProfilingMiddleware)
+    else:
+        logger.error("Profiling is enabled but PROFILING_TOKEN is not set")
 
 
 @app.on_event("startup")
@@ -15,10 +41,127 @@ async def create_database_and_apply_migrations():
     wait_for_postgres()
 
 
+async def refresh_latest_prices_periodically():
+    while True:
+        await asyncio.sleep(LATEST_PRICE_REFRESH_SECONDS)
+        try:
+            await src.marketdata.router.refresh_latest_prices()
+        except Exception as e:
+            logger.error(f"Error while refreshing the latest prices: {e}")
+
+
+@app.on_event("startup")
+async def start_latest_price_refresher():
+    # the first refresh seeds the buffer before requests are served
+    try:
+        await src.marketdata.router.refresh_latest_prices()
+    except Exception as e:
+        logger.error(f"Error while seeding the latest prices: {e}")
+    app.state.latest_price_refresher = asyncio.create_task(
+        refresh_latest_prices_periodically()
+    )
+
+
+@app.on_event("shutdown")
+async def stop_latest_price_refresher():
+    app.state.latest_price_refresher.cancel()
+
+
+@app.on_event("startup")
+async def start_price_stream_broker():
+    # a failed connection is logged and retried by the broker
+    await price_stream_broker.start()
+
+
+@app.on_event("shutdown")
+async def stop_price_stream_broker():
+    await price_stream_broker.stop()
+
+
 @app.get("/")
 def read_root() -> dict[str, str]:
     return {"message": "Hello, World!"}
 
 
+@app.get("/compression/stats")
+def read_compression_stats() -> dict[str, dict[str, float]]:
+    """
+    Returns the number of compressed responses, the bytes before and after
+    compression, the bytes saved and the cpu time spent per content encoding
+    """
+    return compression_stats.get_stats()
+
+
+def collect_price_cache_metrics() -> list[str]:
+    cache_stats = price_response_cache.get_stats()
+    lines = format_gauges(
+        "price_response_cache_entries",
+        "Number of responses held by the price response cache",
+        (),
+        {(): cache_stats["entries"]},
+    )
+    lines.extend(
+        format_gauges(
+            "price_response_cache_bytes",
+            "Bytes of the responses held by the price response cache",
+            (),
+            {(): cache_stats["bytes"]},
+        )
+    )
+    for stat_name in ("hits", "misses", "evictions", "expirations", "invalidations"):
+        lines.extend(
+            format_gauges(
+                f"price_response_cache_{stat_name}_total",
+                f"Number of price response cache {stat_name}",
+                (),
+                {(): cache_stats[stat_name]},
+                metric_type="counter",
+            )
+        )
+    return lines
+
+
+COMPRESSION_STAT_TO_DOCUMENTATION_MAP = {
+    "responses": "Number of compressed responses",
+    "uncompressed_bytes": "Bytes of the responses before compression",
+    "compressed_bytes": "Bytes of the responses after compression",
+    "cpu_seconds": "Cpu time spent compressing the responses",
+}
+
+
+def collect_compression_metrics() -> list[str]:
+    stats_by_encoding = compression_stats.get_stats()
+    return [
+        line
+        for stat_name, documentation in COMPRESSION_STAT_TO_DOCUMENTATION_MAP.items()
+        for line in format_gauges(
+            f"compression_{stat_name}_total",
+            documentation,
+            ("content_encoding",),
+            {
+                (content_encoding,): stats[stat_name]
+                for content_encoding, stats in stats_by_encoding.items()
+            },
+            metric_type="counter",
+        )
+    ]
+
+
+metrics_registry.register_collector(collect_price_cache_metrics)
+metrics_registry.register_collector(collect_compression_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def read_metrics() -> PlainTextResponse:
+    """
+    Returns the request latencies, the price read phase timings, the rows
+    per request, the database pool checkout waits and the cache and
+    compression counters in the Prometheus text exposition format
+    """
+    return PlainTextResponse(
+        metrics_registry.render(), media_type=PROMETHEUS_TEXT_MEDIA_TYPE
+    )
+
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
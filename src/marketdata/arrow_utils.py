@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import typing
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.common.constants import MARKET_TZ
+from src.common.enums import ResponseFormat
+
+ARROW_TIMESTAMP_TYPE = pa.timestamp("s", tz=MARKET_TZ.zone)
+
+
+class _ChunkSink:
+    """
+    Write only file object that collects the written bytes until they are
+    taken, while tell() keeps counting from the start of the file as the
+    parquet writer expects
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def take(self) -> bytes:
+        taken, self._chunks = b"".join(self._chunks), []
+        return taken
+
+
+def build_price_arrow_schema(field_names: list[str]) -> pa.Schema:
+    """
+    Arrow schema of the price rows. The settlement period start timestamp
+    becomes a settlement_period_start_datetime timestamp column in market
+    time, the prices are float64 and the other columns (Ex: session_id)
+    strings
+    """
+    fields = [pa.field("settlement_period_start_datetime", ARROW_TIMESTAMP_TYPE)]
+    for field_name in field_names[1:]:
+        if field_name.endswith("_price_in_rs_per_mwh"):
+            fields.append(pa.field(field_name, pa.float64()))
+        else:
+            fields.append(pa.field(field_name, pa.string()))
+    return pa.schema(fields)
+
+
+def convert_price_rows_to_record_batch(
+    price_rows: typing.Sequence[typing.Sequence], schema: pa.Schema
+) -> pa.RecordBatch:
+    columns = list(zip(*price_rows)) or [[] for _ in schema]
+    return pa.RecordBatch.from_arrays(
+        [pa.array(column, type=field.type) for column, field in zip(columns, schema)],
+        schema=schema,
+    )
+
+
+async def aiter_price_rows_as_arrow(
+    price_rows: typing.AsyncIterable[typing.Sequence],
+    field_names: list[str],
+    response_format: ResponseFormat,
+    rows_per_batch: int = 10000,
+) -> typing.AsyncIterator[bytes]:
+    """
+    Serializes the rows to an Arrow IPC stream or a parquet file, one record
+    batch (parquet row group) per rows_per_batch rows, yielding the bytes of
+    every batch as soon as it is written. Parquet stores the second
+    timestamps as milliseconds
+    """
+    schema = build_price_arrow_schema(field_names)
+    sink = _ChunkSink()
+    if response_format == ResponseFormat.PARQUET:
+        writer = pq.ParquetWriter(sink, schema)
+    else:
+        writer = pa.ipc.new_stream(sink, schema)
+    chunk = []
+    async for price_row in price_rows:
+        chunk.append(price_row)
+        if len(chunk) == rows_per_batch:
+            writer.write_batch(convert_price_rows_to_record_batch(chunk, schema))
+            chunk = []
+            yield sink.take()
+    if chunk:
+        writer.write_batch(convert_price_rows_to_record_batch(chunk, schema))
+    writer.close()
+    yield sink.take()
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import bisect
+import typing
+
+from src.common.constants import MARKET_TIME_DELTA
+from src.common.enums import Markets
+from src.common.models import TimeFrame
+from src.common.utils import convert_timestamp_to_indian_datetime
+from src.marketdata.models import MARKETTYPE_TO_ORM_MAP, get_price_row_columns
+
+SETTLEMENT_PERIOD_SECONDS = int(MARKET_TIME_DELTA.total_seconds())
+
+
+class PriceBatchWindow(typing.NamedTuple):
+    """
+    The settlement periods between the two timestamps (both inclusive) and
+    the price fields (None for all) asked for by one query of a batch
+    """
+
+    query_id: str
+    market: Markets
+    start_timestamp: int
+    end_timestamp: int
+    price_field_names: tuple[str, ...] | None
+
+
+class MergedPriceQuery(typing.NamedTuple):
+    """
+    A single range query on the price table of a market that covers the
+    windows it was merged from, with every price field they ask for
+    """
+
+    market: Markets
+    start_timestamp: int
+    end_timestamp: int
+    price_field_names: list[str] | None
+    windows: list[PriceBatchWindow]
+
+
+def _merge_price_field_names(
+    windows: list[PriceBatchWindow],
+) -> list[str] | None:
+    if any(window.price_field_names is None for window in windows):
+        return None
+    return sorted(
+        {
+            field_name
+            for window in windows
+            for field_name in window.price_field_names or ()
+        }
+    )
+
+
+def merge_price_batch_windows(
+    windows: list[PriceBatchWindow],
+) -> list[MergedPriceQuery]:
+    """
+    Groups the windows by market and merges the ones that overlap or follow
+    each other without a missing settlement period into one query each
+    """
+    merged_queries = []
+    for market in Markets:
+        market_windows = sorted(
+            (window for window in windows if window.market == market),
+            key=lambda window: (window.start_timestamp, window.end_timestamp),
+        )
+        runs: list[list[PriceBatchWindow]] = []
+        run_end_timestamp = None
+        for window in market_windows:
+            if (
+                run_end_timestamp is not None
+                and window.start_timestamp
+                <= run_end_timestamp + SETTLEMENT_PERIOD_SECONDS
+            ):
+                runs[-1].append(window)
+                run_end_timestamp = max(run_end_timestamp, window.end_timestamp)
+            else:
+                runs.append([window])
+                run_end_timestamp = window.end_timestamp
+        merged_queries.extend(
+            MergedPriceQuery(
+                market=market,
+                start_timestamp=run[0].start_timestamp,
+                end_timestamp=max(window.end_timestamp for window in run),
+                price_field_names=_merge_price_field_names(run),
+                windows=run,
+            )
+            for run in runs
+        )
+    return merged_queries
+
+
+def get_merged_query_time_frame(merged_query: MergedPriceQuery) -> TimeFrame:
+    return TimeFrame(
+        start_datetime=convert_timestamp_to_indian_datetime(
+            merged_query.start_timestamp
+        ),
+        end_datetime=convert_timestamp_to_indian_datetime(merged_query.end_timestamp),
+    )
+
+
+def split_merged_price_rows(
+    merged_query: MergedPriceQuery,
+    price_rows: list[typing.Sequence],
+    field_names: list[str],
+) -> typing.Iterator[tuple[PriceBatchWindow, list[tuple], list[str]]]:
+    """
+    Picks the rows of every window out of the ordered rows of their merged
+    query, keeping only the columns the window asked for. Yields the window
+    with its rows and their field names
+    """
+    timestamps = [price_row[0] for price_row in price_rows]
+    for window in merged_query.windows:
+        window_field_names = [
+            column.name
+            for column in get_price_row_columns(
+                MARKETTYPE_TO_ORM_MAP[window.market],
+                None
+                if window.price_field_names is None
+                else list(window.price_field_names),
+            )
+        ]
+        column_indexes = [
+            field_names.index(field_name) for field_name in window_field_names
+        ]
+        first_index = bisect.bisect_left(timestamps, window.start_timestamp)
+        last_index = bisect.bisect_right(timestamps, window.end_timestamp)
+        window_price_rows = [
+            tuple(price_row[column_index] for column_index in column_indexes)
+            for price_row in price_rows[first_index:last_index]
+        ]
+        yield window, window_price_rows, window_field_names
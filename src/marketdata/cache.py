@@ -0,0 +1,287 @@
+from __future__ import annotations
+
+import collections
+import math
+import threading
+import time
+import typing
+
+from src.common import logging_utils
+from src.common.compression import compress_body
+from src.common.config import (
+    PRICE_CACHE_MAX_BYTES,
+    PRICE_CACHE_MAX_ENTRIES,
+    PRICE_CACHE_MAX_ENTRY_BYTES,
+    PRICE_CACHE_TTL_SECONDS,
+)
+from src.common.constants import MARKET_TIME_DELTA
+from src.common.enums import (
+    ContentEncoding,
+    Markets,
+    ResampleAggregation,
+    ResponseFormat,
+    ResponseShape,
+)
+from src.common.models import TimeFrame
+
+logger = logging_utils.create_logger(__name__)
+
+SETTLEMENT_PERIOD_SECONDS = int(MARKET_TIME_DELTA.total_seconds())
+
+
+class PriceCacheKey(typing.NamedTuple):
+    """
+    Identifies a price response. The time frame is aligned to the settlement
+    periods it contains, so requests that only differ in seconds within a
+    settlement period share an entry
+    """
+
+    market: Markets
+    start_timestamp: int
+    end_timestamp: int
+    price_field_names: tuple[str, ...] | None
+    cursor: int | None = None
+    limit: int | None = None
+    response_format: ResponseFormat = ResponseFormat.JSON
+    response_shape: ResponseShape = ResponseShape.ROWS
+    resample_seconds: int | None = None
+    aggregation: ResampleAggregation | None = None
+
+
+class CachedPriceResponse(typing.NamedTuple):
+    body: bytes
+    headers: dict[str, str]
+    expires_at: float
+    compressed_bodies: dict[ContentEncoding, bytes]
+
+    @property
+    def size_bytes(self) -> int:
+        return len(self.body) + sum(map(len, self.compressed_bodies.values()))
+
+
+class PriceResponseCache:
+    """
+    Bounded LRU cache of serialized price responses. Entries expire after
+    ttl_seconds and the least recently used entries are evicted once
+    max_entries is reached or the bodies and compressed bodies of the entries
+    add up to more than max_total_bytes. Writes invalidate the entries whose
+    time frame covers a written settlement period. Every invalidation starts
+    a new generation of the market, so a response that was being built while
+    the market was written to is not stored
+    """
+
+    def __init__(
+        self,
+        max_entries: int,
+        ttl_seconds: float,
+        max_entry_bytes: int,
+        max_total_bytes: float = math.inf,
+        clock: typing.Callable[[], float] = time.monotonic,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_entry_bytes = max_entry_bytes
+        self.max_total_bytes = max_total_bytes
+        self.total_bytes = 0
+        self._clock = clock
+        self._entries: collections.OrderedDict[
+            PriceCacheKey, CachedPriceResponse
+        ] = collections.OrderedDict()
+        self._generations: collections.Counter[Markets] = collections.Counter()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(
+        market: Markets,
+        time_frame: TimeFrame,
+        price_field_names: list[str] | None = None,
+        cursor: int | None = None,
+        limit: int | None = None,
+        response_format: ResponseFormat = ResponseFormat.JSON,
+        response_shape: ResponseShape = ResponseShape.ROWS,
+        resample_seconds: int | None = None,
+        aggregation: ResampleAggregation = ResampleAggregation.MEAN,
+    ) -> PriceCacheKey:
+        start_timestamp = time_frame.start_datetime.timestamp()
+        end_timestamp = time_frame.end_datetime.timestamp()
+        return PriceCacheKey(
+            market=market,
+            start_timestamp=math.ceil(start_timestamp / SETTLEMENT_PERIOD_SECONDS)
+            * SETTLEMENT_PERIOD_SECONDS,
+            end_timestamp=math.floor(end_timestamp / SETTLEMENT_PERIOD_SECONDS)
+            * SETTLEMENT_PERIOD_SECONDS,
+            price_field_names=(
+                None if price_field_names is None else tuple(price_field_names)
+            ),
+            cursor=cursor,
+            limit=limit,
+            response_format=response_format,
+            response_shape=response_shape,
+            resample_seconds=resample_seconds,
+            # the aggregation does not change responses that are not resampled
+            aggregation=None if resample_seconds is None else aggregation,
+        )
+
+    def get_generation(self, market: Markets) -> int:
+        return self._generations[market]
+
+    def get(self, key: PriceCacheKey) -> CachedPriceResponse | None:
+        with self._lock:
+            cached_response = self._entries.get(key)
+            if cached_response is None:
+                self.misses += 1
+                return None
+            if cached_response.expires_at <= self._clock():
+                self._pop_entry(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return cached_response
+
+    def put(
+        self,
+        key: PriceCacheKey,
+        body: bytes,
+        headers: dict[str, str],
+        generation: int,
+    ) -> bool:
+        """
+        Stores the response unless it is too large or the market was written
+        to since generation was read. Returns whether it was stored
+        """
+        if len(body) > self.max_entry_bytes or self.max_entries <= 0:
+            return False
+        with self._lock:
+            if self._generations[key.market] != generation:
+                return False
+            self._pop_entry(key)
+            self._entries[key] = CachedPriceResponse(
+                body=body,
+                headers=headers,
+                expires_at=self._clock() + self.ttl_seconds,
+                compressed_bodies={},
+            )
+            self.total_bytes += len(body)
+            self._evict()
+        return True
+
+    def get_compressed_body(
+        self,
+        key: PriceCacheKey,
+        cached_response: CachedPriceResponse,
+        content_encoding: ContentEncoding,
+    ) -> bytes:
+        """
+        Compresses the body the first time a content encoding is asked for and
+        stores the compressed bytes with the entry, so later hits are served
+        them. They count towards the size of the entry, and are not stored
+        when the entry would grow past max_entry_bytes
+        """
+        compressed_body = cached_response.compressed_bodies.get(content_encoding)
+        if compressed_body is not None:
+            return compressed_body
+        compressed_body = compress_body(cached_response.body, content_encoding)
+        with self._lock:
+            if (
+                self._entries.get(key) is cached_response
+                and content_encoding not in cached_response.compressed_bodies
+                and cached_response.size_bytes + len(compressed_body)
+                <= self.max_entry_bytes
+            ):
+                cached_response.compressed_bodies[content_encoding] = compressed_body
+                self.total_bytes += len(compressed_body)
+                self._entries.move_to_end(key)
+                self._evict()
+        return compressed_body
+
+    def _pop_entry(self, key: PriceCacheKey) -> None:
+        cached_response = self._entries.pop(key, None)
+        if cached_response is not None:
+            self.total_bytes -= cached_response.size_bytes
+
+    def _evict(self) -> None:
+        """
+        Evicts the least recently used entries until the cache is back
+        within max_entries and max_total_bytes
+        """
+        while self._entries and (
+            len(self._entries) > self.max_entries
+            or self.total_bytes > self.max_total_bytes
+        ):
+            self._pop_entry(next(iter(self._entries)))
+            self.evictions += 1
+
+    def invalidate(
+        self, market: Markets, start_timestamp: int, end_timestamp: int
+    ) -> int:
+        """
+        Drops the entries of the market whose time frame overlaps the written
+        settlement periods between the two timestamps (both inclusive).
+        Returns the number of dropped entries
+        """
+        with self._lock:
+            self._generations[market] += 1
+            stale_keys = [
+                key
+                for key in self._entries
+                if key.market == market
+                and key.start_timestamp <= end_timestamp
+                and key.end_timestamp >= start_timestamp
+            ]
+            for key in stale_keys:
+                self._pop_entry(key)
+            self.invalidations += len(stale_keys)
+        if stale_keys:
+            logger.debug(f"Invalidated {len(stale_keys)} cached {market.name} prices")
+        return len(stale_keys)
+
+    def invalidate_market(self, market: Markets) -> int:
+        """
+        Drops every entry of the market, for writes whose settlement periods
+        are not known. Returns the number of dropped entries
+        """
+        with self._lock:
+            self._generations[market] += 1
+            stale_keys = [key for key in self._entries if key.market == market]
+            for key in stale_keys:
+                self._pop_entry(key)
+            self.invalidations += len(stale_keys)
+        return len(stale_keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+            self._generations.clear()
+            self.hits = self.misses = self.evictions = 0
+            self.expirations = self.invalidations = 0
+
+    def get_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+
+# writes made by other processes (Ex: the scrapers) invalidate this cache
+# through the price stream broker, see src.marketdata.stream
+price_response_cache = PriceResponseCache(
+    max_entries=PRICE_CACHE_MAX_ENTRIES,
+    ttl_seconds=PRICE_CACHE_TTL_SECONDS,
+    max_entry_bytes=PRICE_CACHE_MAX_ENTRY_BYTES,
+    max_total_bytes=PRICE_CACHE_MAX_BYTES,
+)
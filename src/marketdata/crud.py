@@ -1,54 +1,259 @@
+import csv
+import io
 import typing
 
 import sqlalchemy
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import load_only
 
 from src.common import logging_utils
-from src.common.enums import Markets
+from src.common.constants import (
+    MARKET_UTC_OFFSET,
+    PRICE_COLUMN_TO_FIELD_NAME_MAP,
+    PRICE_FIELD_NAME_TO_SPREAD_FIELD_NAME_MAP,
+)
+from src.common.enums import (
+    ConflictResolution,
+    Granularity,
+    Markets,
+    ResampleAggregation,
+)
 from src.common.models import TimeFrame
-from src.database import Session
+from src.database import AsyncSession, Session
+from src.marketdata.cache import price_response_cache
+from src.marketdata.day_blocks import PriceWatermark, refresh_price_day_blocks
+from src.marketdata.latest import latest_price_buffer
 from src.marketdata.models import (
+    ORM_TO_MARKETTYPE_MAP,
     BasePointInTimePriceDataDb,
+    BasePriceRollupDb,
     DAMPointInTimePriceDataDb,
+    DAMPriceDayBlockDb,
+    DAMPriceRollupDb,
     RTMPointInTimePriceDataDb,
+    RTMPriceDayBlockDb,
+    RTMPriceRollupDb,
+    get_price_columns,
+    get_price_row_columns,
 )
+from src.marketdata.partitions import (
+    ensure_monthly_partitions,
+    ensure_monthly_partitions_between,
+)
+from src.marketdata.rollups import refresh_price_rollups
 from src.marketdata.schemas import (
     BasePointInTimePriceData,
     DAMPointInTimePriceData,
     RTMPointInTimePriceData,
+    ZonePriceSpreadSummary,
 )
 
 logger = logging_utils.create_logger(__name__)
 
 
+UPSERT_BATCH_SIZE = 1000
+STREAMING_BATCH_SIZE = 1000
+PRICE_WRITE_CHANNEL = "price_writes"
+
+
+def _convert_pit_data_to_db_row(pit_data: BasePointInTimePriceData) -> dict:
+    db_row = pit_data.model_dump()
+    db_row["settlement_period_start_timestamp"] = int(
+        pit_data.settlement_period_start_datetime.timestamp()
+    )
+    db_row.pop("settlement_period_start_datetime")
+    return db_row
+
+
+def _get_conflict_columns(
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+) -> list[str]:
+    """
+    Returns the columns of the unique key that identifies a settlement period
+    """
+    unique_constraint = next(
+        constraint
+        for constraint in db_price_model.__table__.constraints
+        if isinstance(constraint, sqlalchemy.UniqueConstraint)
+    )
+    return [column.name for column in unique_constraint.columns]
+
+
+def _build_upsert_statement(
+    db_rows: list[dict],
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    conflict_resolution: ConflictResolution,
+) -> sqlalchemy.dialects.postgresql.Insert:
+    conflict_columns = _get_conflict_columns(db_price_model)
+    insert_stmt = postgresql.insert(db_price_model).values(db_rows)
+    if conflict_resolution == ConflictResolution.UPDATE:
+        updated_columns = {
+            column_name: insert_stmt.excluded[column_name]
+            for column_name in db_rows[0]
+            if column_name not in conflict_columns
+        }
+        insert_stmt = insert_stmt.on_conflict_do_update(
+            index_elements=conflict_columns, set_=updated_columns
+        )
+    else:
+        insert_stmt = insert_stmt.on_conflict_do_nothing(
+            index_elements=conflict_columns
+        )
+    return insert_stmt.returning(db_price_model)
+
+
+def _notify_price_write(
+    db_session: Session,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    min_timestamp: int,
+    max_timestamp: int,
+) -> None:
+    """
+    Announces the written settlement periods on PRICE_WRITE_CHANNEL to the
+    listening API processes. Postgres delivers the notification when the
+    transaction commits and drops it when it is rolled back
+    """
+    market = ORM_TO_MARKETTYPE_MAP[db_price_model]
+    db_session.execute(
+        sqlalchemy.select(
+            sqlalchemy.func.pg_notify(
+                PRICE_WRITE_CHANNEL, f"{market.value}:{min_timestamp}:{max_timestamp}"
+            )
+        )
+    )
+
+
+def _build_latest_price_rows_query(
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+) -> sqlalchemy.Select:
+    return (
+        sqlalchemy.select(*get_price_row_columns(db_price_model))
+        .order_by(db_price_model.settlement_period_start_timestamp.desc())
+        .limit(latest_price_buffer.capacity)
+    )
+
+
+def _refresh_latest_prices_after_write(
+    db_session: Session,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    max_timestamp: int,
+) -> None:
+    """
+    Reloads the latest price buffer of the market when the committed write
+    reached the buffered settlement periods
+    """
+    market = ORM_TO_MARKETTYPE_MAP[db_price_model]
+    if not latest_price_buffer.is_stale_after_write(market, max_timestamp):
+        return
+    price_rows = db_session.execute(
+        _build_latest_price_rows_query(db_price_model)
+    ).all()
+    latest_price_buffer.replace(
+        market,
+        price_rows,
+        [column.name for column in get_price_row_columns(db_price_model)],
+    )
+
+
+def _upsert_multiple_price_records(
+    db_session: Session,
+    pit_data_list: list[BasePointInTimePriceData],
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    conflict_resolution: ConflictResolution,
+) -> list[BasePointInTimePriceDataDb]:
+    """
+    Writes the price records with batched INSERT ... ON CONFLICT ... RETURNING
+    statements and commits them in a single transaction. Only the rows that
+    were inserted or updated are returned, so settlement periods skipped with
+    ConflictResolution.IGNORE are not part of the result
+    """
+    conflict_columns = _get_conflict_columns(db_price_model)
+    # a statement can not touch the same row twice, the last write wins
+    db_rows_by_key = {}
+    for pit_data in pit_data_list:
+        db_row = _convert_pit_data_to_db_row(pit_data)
+        db_rows_by_key[tuple(db_row.get(col) for col in conflict_columns)] = db_row
+    db_rows = list(db_rows_by_key.values())
+    ensure_monthly_partitions(
+        db_session,
+        db_price_model.__tablename__,
+        (db_row["settlement_period_start_timestamp"] for db_row in db_rows),
+    )
+
+    pit_records = []
+    for batch_start in range(0, len(db_rows), UPSERT_BATCH_SIZE):
+        batch_end = batch_start + UPSERT_BATCH_SIZE
+        upsert_stmt = _build_upsert_statement(
+            db_rows[batch_start:batch_end],
+            db_price_model,
+            conflict_resolution,
+        )
+        pit_records.extend(
+            db_session.scalars(
+                upsert_stmt, execution_options={"populate_existing": True}
+            ).all()
+        )
+    if pit_records:
+        written_timestamps = [
+            record.settlement_period_start_timestamp for record in pit_records
+        ]
+        refresh_price_rollups(
+            db_session,
+            db_price_model,
+            min(written_timestamps),
+            max(written_timestamps),
+        )
+        refresh_price_day_blocks(
+            db_session,
+            db_price_model,
+            min(written_timestamps),
+            max(written_timestamps),
+        )
+        _notify_price_write(
+            db_session,
+            db_price_model,
+            min(written_timestamps),
+            max(written_timestamps),
+        )
+    db_session.commit()
+    if pit_records:
+        price_response_cache.invalidate(
+            ORM_TO_MARKETTYPE_MAP[db_price_model],
+            min(written_timestamps),
+            max(written_timestamps),
+        )
+        _refresh_latest_prices_after_write(
+            db_session, db_price_model, max(written_timestamps)
+        )
+    return pit_records
+
+
 def _create_price_record(
     db_session: Session,
     pit_data: BasePointInTimePriceData,
     db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
 ) -> BasePointInTimePriceDataDb:
+    inserted_records = _upsert_multiple_price_records(
+        db_session, [pit_data], db_price_model, ConflictResolution.IGNORE
+    )
+    if inserted_records:
+        return inserted_records[0]
+
+    logger.info(
+        f"Record already exists for {pit_data.settlement_period_start_datetime}"
+    )
+    db_row = _convert_pit_data_to_db_row(pit_data)
     existing_record = (
         db_session.query(db_price_model)
-        .filter(
-            db_price_model.settlement_period_start_timestamp
-            == pit_data.settlement_period_start_datetime.timestamp()
+        .filter_by(
+            **{
+                column_name: db_row.get(column_name)
+                for column_name in _get_conflict_columns(db_price_model)
+            }
         )
-        .first()
+        .one()
     )
-
-    if existing_record is not None:
-        logger.info(
-            f"Record already exists for {pit_data.settlement_period_start_datetime}"
-        )
-        return existing_record
-    pyd_model_dump = pit_data.model_dump()
-    pyd_model_dump[
-        "settlement_period_start_timestamp"
-    ] = pit_data.settlement_period_start_datetime.timestamp()
-    pyd_model_dump.pop("settlement_period_start_datetime")
-    pit_record = db_price_model(**pyd_model_dump)
-    db_session.add(pit_record)
-    db_session.commit()
-    db_session.refresh(pit_record)
-    return pit_record
+    return existing_record
 
 
 def _create_multiple_price_records(
@@ -56,26 +261,127 @@ def _create_multiple_price_records(
     pit_data_list: list[BasePointInTimePriceData],
     db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
 ) -> list[BasePointInTimePriceDataDb]:
-    pyd_model_dumps = []
+    """
+    Inserts the price records, leaving the already stored settlement
+    periods untouched. Returns the newly inserted records
+    """
+    return _upsert_multiple_price_records(
+        db_session, pit_data_list, db_price_model, ConflictResolution.IGNORE
+    )
 
-    for pit_data in pit_data_list:
-        settlement_period_start_timestamp = (
-            pit_data.settlement_period_start_datetime.timestamp()
-        )
-        pyd_dump = pit_data.model_dump()
-        pyd_dump[
-            "settlement_period_start_timestamp"
-        ] = settlement_period_start_timestamp
-        pyd_dump.pop("settlement_period_start_datetime")
-        pyd_model_dumps.append(pyd_dump)
-    pit_records = [
-        db_price_model(**pyd_model_dump) for pyd_model_dump in pyd_model_dumps
+
+def _get_copy_columns(
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+) -> list[str]:
+    return [
+        column.name
+        for column in db_price_model.__table__.columns
+        if column.name != db_price_model.id.name
     ]
-    db_session.add_all(pit_records)
+
+
+def _write_pit_data_to_csv_buffer(
+    pit_data_list: list[BasePointInTimePriceData],
+    copy_columns: list[str],
+    first_staged_row_id: int,
+) -> io.StringIO:
+    csv_buffer = io.StringIO()
+    csv_writer = csv.writer(csv_buffer)
+    for staged_row_id, pit_data in enumerate(pit_data_list, first_staged_row_id):
+        db_row = _convert_pit_data_to_db_row(pit_data)
+        csv_writer.writerow(
+            [staged_row_id] + [db_row.get(column) for column in copy_columns]
+        )
+    csv_buffer.seek(0)
+    return csv_buffer
+
+
+def _copy_multiple_price_records(
+    db_session: Session,
+    pit_data_chunks: typing.Iterable[list[BasePointInTimePriceData]],
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    conflict_resolution: ConflictResolution,
+) -> int:
+    """
+    Streams the chunks of price records into a temporary staging table with
+    COPY FROM STDIN and merges the staging table into the price table with a
+    single INSERT ... SELECT ... ON CONFLICT statement. Only one chunk has to
+    be held in memory at a time. Returns the number of inserted or updated rows
+    """
+    table_name = db_price_model.__tablename__
+    staging_table_name = f"staging_{table_name}"
+    copy_columns = _get_copy_columns(db_price_model)
+    conflict_columns = _get_conflict_columns(db_price_model)
+    column_list = ", ".join(copy_columns)
+
+    db_session.execute(
+        sqlalchemy.text(
+            f"CREATE TEMPORARY TABLE {staging_table_name} ON COMMIT DROP AS "
+            f"SELECT 0::bigint AS staged_row_id, {column_list} "
+            f"FROM {table_name} WITH NO DATA"
+        )
+    )
+    dbapi_connection = db_session.connection().connection
+    num_staged_rows = 0
+    with dbapi_connection.cursor() as cursor:
+        for pit_data_chunk in pit_data_chunks:
+            csv_buffer = _write_pit_data_to_csv_buffer(
+                pit_data_chunk, copy_columns, num_staged_rows
+            )
+            cursor.copy_expert(
+                f"COPY {staging_table_name} (staged_row_id, {column_list}) "
+                f"FROM STDIN WITH (FORMAT csv)",
+                csv_buffer,
+            )
+            num_staged_rows += len(pit_data_chunk)
+
+    min_timestamp, max_timestamp = db_session.execute(
+        sqlalchemy.text(
+            f"SELECT min(settlement_period_start_timestamp), "
+            f"max(settlement_period_start_timestamp) FROM {staging_table_name}"
+        )
+    ).one()
+    if min_timestamp is not None:
+        ensure_monthly_partitions_between(
+            db_session, table_name, min_timestamp, max_timestamp
+        )
+    if conflict_resolution == ConflictResolution.UPDATE:
+        updated_columns = ", ".join(
+            f"{column} = EXCLUDED.{column}"
+            for column in copy_columns
+            if column not in conflict_columns
+        )
+        conflict_action = f"DO UPDATE SET {updated_columns}"
+    else:
+        conflict_action = "DO NOTHING"
+    # a statement can not touch the same row twice, the last staged row wins
+    merge_result = db_session.execute(
+        sqlalchemy.text(
+            f"INSERT INTO {table_name} ({column_list}) "
+            f"SELECT DISTINCT ON ({', '.join(conflict_columns)}) {column_list} "
+            f"FROM {staging_table_name} "
+            f"ORDER BY {', '.join(conflict_columns)}, staged_row_id DESC "
+            f"ON CONFLICT ({', '.join(conflict_columns)}) {conflict_action}"
+        )
+    )
+    db_session.execute(sqlalchemy.text(f"DROP TABLE {staging_table_name}"))
+    if merge_result.rowcount:
+        refresh_price_rollups(db_session, db_price_model, min_timestamp, max_timestamp)
+        refresh_price_day_blocks(
+            db_session, db_price_model, min_timestamp, max_timestamp
+        )
+        _notify_price_write(db_session, db_price_model, min_timestamp, max_timestamp)
     db_session.commit()
-    for record in pit_records:
-        db_session.refresh(record)
-    return pit_records
+    if merge_result.rowcount:
+        price_response_cache.invalidate(
+            ORM_TO_MARKETTYPE_MAP[db_price_model], min_timestamp, max_timestamp
+        )
+        _refresh_latest_prices_after_write(db_session, db_price_model, max_timestamp)
+    logger.info(
+        f"Merged {merge_result.rowcount} of {num_staged_rows} staged rows "
+        f"into {table_name}"
+    )
+    return merge_result.rowcount
 
 
 def create_dam_price_record(
@@ -106,34 +412,821 @@ def create_multiple_rtm_price_records(
     )
 
 
-def _get_price_records(
+def upsert_multiple_dam_price_records(
+    db_session: Session,
+    dam_pit_data_list: list[DAMPointInTimePriceData],
+    conflict_resolution: ConflictResolution = ConflictResolution.UPDATE,
+) -> list[DAMPointInTimePriceDataDb]:
+    return _upsert_multiple_price_records(
+        db_session, dam_pit_data_list, DAMPointInTimePriceDataDb, conflict_resolution
+    )
+
+
+def upsert_multiple_rtm_price_records(
+    db_session: Session,
+    rtm_pit_data_list: list[RTMPointInTimePriceData],
+    conflict_resolution: ConflictResolution = ConflictResolution.UPDATE,
+) -> list[RTMPointInTimePriceDataDb]:
+    return _upsert_multiple_price_records(
+        db_session, rtm_pit_data_list, RTMPointInTimePriceDataDb, conflict_resolution
+    )
+
+
+def copy_multiple_dam_price_records(
     db_session: Session,
+    dam_pit_data_chunks: typing.Iterable[list[DAMPointInTimePriceData]],
+    conflict_resolution: ConflictResolution = ConflictResolution.IGNORE,
+) -> int:
+    return _copy_multiple_price_records(
+        db_session, dam_pit_data_chunks, DAMPointInTimePriceDataDb, conflict_resolution
+    )
+
+
+def copy_multiple_rtm_price_records(
+    db_session: Session,
+    rtm_pit_data_chunks: typing.Iterable[list[RTMPointInTimePriceData]],
+    conflict_resolution: ConflictResolution = ConflictResolution.IGNORE,
+) -> int:
+    return _copy_multiple_price_records(
+        db_session, rtm_pit_data_chunks, RTMPointInTimePriceDataDb, conflict_resolution
+    )
+
+
+def _filter_price_query(
+    query: sqlalchemy.Select,
     time_frame: TimeFrame,
     db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
-) -> list[BasePointInTimePriceDataDb]:
-    records = (
-        db_session.query(db_price_model)
-        .filter(
-            db_price_model.settlement_period_start_timestamp.between(
-                time_frame.start_datetime.timestamp(),
-                time_frame.end_datetime.timestamp(),
+    after_timestamp: int | None = None,
+) -> sqlalchemy.Select:
+    """
+    Restricts the query to the settlement periods in the time frame that come
+    after after_timestamp, ordered by settlement period
+    """
+    query = query.where(
+        db_price_model.settlement_period_start_timestamp.between(
+            int(time_frame.start_datetime.timestamp()),
+            int(time_frame.end_datetime.timestamp()),
+        )
+    )
+    if after_timestamp is not None:
+        query = query.where(
+            db_price_model.settlement_period_start_timestamp > after_timestamp
+        )
+    return query.order_by(db_price_model.settlement_period_start_timestamp)
+
+
+def _build_price_records_query(
+    time_frame: TimeFrame,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+) -> sqlalchemy.Select:
+    """
+    Builds the select statement for the price records in the time frame, ordered by
+    settlement period. When price_field_names is given only those price
+    columns are selected, the other price attributes of the records are left
+    unloaded. after_timestamp skips the settlement periods up to and including
+    it, which is how the keyset pagination moves to the next page
+    """
+    query = sqlalchemy.select(db_price_model)
+    if price_field_names is not None:
+        loaded_columns = [
+            column
+            for column in db_price_model.__table__.columns
+            if column.name not in PRICE_COLUMN_TO_FIELD_NAME_MAP.values()
+            or column.name in price_field_names
+        ]
+        query = query.options(
+            load_only(
+                *[getattr(db_price_model, column.name) for column in loaded_columns]
             )
         )
-        .all()
+    return _filter_price_query(query, time_frame, db_price_model, after_timestamp)
+
+
+def _build_price_rows_query(
+    time_frame: TimeFrame,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+) -> sqlalchemy.Select:
+    """
+    Core counterpart of _build_price_records_query, selecting only the
+    needed columns so the rows come back as plain tuples without building
+    ORM instances
+    """
+    query = sqlalchemy.select(*get_price_row_columns(db_price_model, price_field_names))
+    return _filter_price_query(query, time_frame, db_price_model, after_timestamp)
+
+
+def _aggregate_price_column(
+    price_column: sqlalchemy.Column,
+    timestamp_column: sqlalchemy.Column,
+    aggregation: ResampleAggregation,
+) -> sqlalchemy.ColumnElement:
+    if aggregation == ResampleAggregation.MEAN:
+        return sqlalchemy.func.avg(price_column)
+    if aggregation == ResampleAggregation.MIN:
+        return sqlalchemy.func.min(price_column)
+    if aggregation == ResampleAggregation.MAX:
+        return sqlalchemy.func.max(price_column)
+    ordering = (
+        timestamp_column
+        if aggregation == ResampleAggregation.FIRST
+        else timestamp_column.desc()
+    )
+    return sqlalchemy.func.array_agg(
+        postgresql.aggregate_order_by(price_column, ordering),
+        type_=postgresql.ARRAY(price_column.type),
+    )[1]
+
+
+def _get_bucket_start_timestamp(
+    timestamp_column: sqlalchemy.ColumnElement, resample_seconds: int
+) -> sqlalchemy.Label:
+    """
+    Start of the bucket of resample_seconds, aligned to the trading days in
+    market time, that contains the settlement period
+    """
+    market_utc_offset_seconds = int(MARKET_UTC_OFFSET.total_seconds())
+    return (
+        timestamp_column
+        - (timestamp_column + market_utc_offset_seconds) % resample_seconds
+    ).label("bucket_start_timestamp")
+
+
+def _build_resampled_price_rows_query(
+    time_frame: TimeFrame,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    resample_seconds: int,
+    aggregation: ResampleAggregation = ResampleAggregation.MEAN,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+) -> sqlalchemy.Select:
+    """
+    Builds the select statement that groups the settlement periods in the
+    time frame into buckets of resample_seconds and aggregates the prices of
+    every bucket, ordered by bucket. The buckets are aligned to the trading
+    days in market time, so resample_seconds must divide a day or be a whole
+    number of days. The rows are tuples of the bucket start timestamp and the
+    price columns of get_price_columns. after_timestamp is the start of the
+    last bucket already returned
+    """
+    timestamp_column = db_price_model.settlement_period_start_timestamp
+    bucket_start_timestamp = _get_bucket_start_timestamp(
+        timestamp_column, resample_seconds
+    )
+    query = sqlalchemy.select(
+        bucket_start_timestamp,
+        *[
+            _aggregate_price_column(price_column, timestamp_column, aggregation).label(
+                price_column.name
+            )
+            for price_column in get_price_columns(db_price_model, price_field_names)
+        ],
+    )
+    if after_timestamp is not None:
+        # the periods of the returned buckets are skipped, not just the
+        # periods up to the start of the last one
+        after_timestamp += resample_seconds - 1
+    query = _filter_price_query(query, time_frame, db_price_model, after_timestamp)
+    return (
+        query.group_by(bucket_start_timestamp)
+        .order_by(None)
+        .order_by(bucket_start_timestamp)
+    )
+
+
+def _get_price_records(
+    db_session: Session,
+    time_frame: TimeFrame,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    price_field_names: list[str] | None = None,
+) -> list[BasePointInTimePriceDataDb]:
+    query = _build_price_records_query(time_frame, db_price_model, price_field_names)
+    records = db_session.scalars(query).all()
+    return list(records)
+
+
+def _iter_price_records(
+    db_session: Session,
+    time_frame: TimeFrame,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+    limit: int | None = None,
+) -> typing.Iterator[BasePointInTimePriceDataDb]:
+    """
+    Streams the price records in the time frame from a server side cursor,
+    STREAMING_BATCH_SIZE rows at a time, so the number of records held in
+    memory does not grow with the size of the time frame
+    """
+    query = _build_price_records_query(
+        time_frame, db_price_model, price_field_names, after_timestamp
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    yield from db_session.scalars(
+        query, execution_options={"yield_per": STREAMING_BATCH_SIZE}
+    )
+
+
+def _iter_price_rows(
+    db_session: Session,
+    time_frame: TimeFrame,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+    limit: int | None = None,
+) -> typing.Iterator[sqlalchemy.Row]:
+    """
+    Streams the price rows in the time frame as plain tuples with the
+    columns of get_price_row_columns
+    """
+    query = _build_price_rows_query(
+        time_frame, db_price_model, price_field_names, after_timestamp
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    yield from db_session.execute(
+        query, execution_options={"yield_per": STREAMING_BATCH_SIZE}
     )
-    return records
 
 
 def get_dam_price_records(
-    db_session: Session, time_frame: TimeFrame
+    db_session: Session,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
 ) -> list[DAMPointInTimePriceDataDb]:
-    return _get_price_records(db_session, time_frame, DAMPointInTimePriceDataDb)
+    return _get_price_records(
+        db_session, time_frame, DAMPointInTimePriceDataDb, price_field_names
+    )
 
 
 def get_rtm_price_records(
-    db_session: Session, time_frame: TimeFrame
+    db_session: Session,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+) -> list[RTMPointInTimePriceDataDb]:
+    return _get_price_records(
+        db_session, time_frame, RTMPointInTimePriceDataDb, price_field_names
+    )
+
+
+def iter_dam_price_records(
+    db_session: Session,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+    limit: int | None = None,
+) -> typing.Iterator[DAMPointInTimePriceDataDb]:
+    return _iter_price_records(
+        db_session,
+        time_frame,
+        DAMPointInTimePriceDataDb,
+        price_field_names,
+        after_timestamp,
+        limit,
+    )
+
+
+def iter_rtm_price_records(
+    db_session: Session,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+    limit: int | None = None,
+) -> typing.Iterator[RTMPointInTimePriceDataDb]:
+    return _iter_price_records(
+        db_session,
+        time_frame,
+        RTMPointInTimePriceDataDb,
+        price_field_names,
+        after_timestamp,
+        limit,
+    )
+
+
+def iter_dam_price_rows(
+    db_session: Session,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+    limit: int | None = None,
+) -> typing.Iterator[sqlalchemy.Row]:
+    return _iter_price_rows(
+        db_session,
+        time_frame,
+        DAMPointInTimePriceDataDb,
+        price_field_names,
+        after_timestamp,
+        limit,
+    )
+
+
+def iter_rtm_price_rows(
+    db_session: Session,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+    limit: int | None = None,
+) -> typing.Iterator[sqlalchemy.Row]:
+    return _iter_price_rows(
+        db_session,
+        time_frame,
+        RTMPointInTimePriceDataDb,
+        price_field_names,
+        after_timestamp,
+        limit,
+    )
+
+
+def _build_price_rollups_query(
+    time_frame: TimeFrame,
+    granularity: Granularity,
+    rollup_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    zones: list[str] | None = None,
+) -> sqlalchemy.Select:
+    """
+    Builds the select statement for the precomputed rollups of the buckets
+    starting in the time frame, ordered by bucket and zone
+    """
+    query = sqlalchemy.select(rollup_model).where(
+        rollup_model.granularity == granularity.value,
+        rollup_model.bucket_start_timestamp.between(
+            int(time_frame.start_datetime.timestamp()),
+            int(time_frame.end_datetime.timestamp()),
+        ),
+    )
+    if zones is not None:
+        query = query.where(rollup_model.zone.in_(zones))
+    return query.order_by(rollup_model.bucket_start_timestamp, rollup_model.zone)
+
+
+def _get_price_rollups(
+    db_session: Session,
+    time_frame: TimeFrame,
+    granularity: Granularity,
+    rollup_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    zones: list[str] | None = None,
+) -> list[BasePriceRollupDb]:
+    query = _build_price_rollups_query(time_frame, granularity, rollup_model, zones)
+    return list(db_session.scalars(query).all())
+
+
+def get_dam_price_rollups(
+    db_session: Session,
+    time_frame: TimeFrame,
+    granularity: Granularity,
+    zones: list[str] | None = None,
+) -> list[DAMPriceRollupDb]:
+    return _get_price_rollups(
+        db_session, time_frame, granularity, DAMPriceRollupDb, zones
+    )
+
+
+def get_rtm_price_rollups(
+    db_session: Session,
+    time_frame: TimeFrame,
+    granularity: Granularity,
+    zones: list[str] | None = None,
+) -> list[RTMPriceRollupDb]:
+    return _get_price_rollups(
+        db_session, time_frame, granularity, RTMPriceRollupDb, zones
+    )
+
+
+async def _async_refresh_latest_prices(
+    db_session: AsyncSession,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+) -> None:
+    """
+    Loads the most recent price rows of the market into the latest price
+    buffer, seeding it on the first call
+    """
+    price_rows = await db_session.execute(
+        _build_latest_price_rows_query(db_price_model)
+    )
+    latest_price_buffer.replace(
+        ORM_TO_MARKETTYPE_MAP[db_price_model],
+        price_rows.all(),
+        [column.name for column in get_price_row_columns(db_price_model)],
+    )
+
+
+async def _async_get_price_records(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    price_field_names: list[str] | None = None,
+) -> list[BasePointInTimePriceDataDb]:
+    query = _build_price_records_query(time_frame, db_price_model, price_field_names)
+    records = await db_session.scalars(query)
+    return list(records.all())
+
+
+async def _async_iter_price_rows(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+    limit: int | None = None,
+    resample_seconds: int | None = None,
+    aggregation: ResampleAggregation = ResampleAggregation.MEAN,
+) -> typing.AsyncIterator[sqlalchemy.Row]:
+    """
+    Streams the price rows in the time frame from a server side cursor,
+    STREAMING_BATCH_SIZE rows at a time. The rows are tuples with the
+    columns of get_price_row_columns, or the resampled rows of
+    _build_resampled_price_rows_query when resample_seconds is given
+    """
+    if resample_seconds is None:
+        query = _build_price_rows_query(
+            time_frame, db_price_model, price_field_names, after_timestamp
+        )
+    else:
+        query = _build_resampled_price_rows_query(
+            time_frame,
+            db_price_model,
+            resample_seconds,
+            aggregation,
+            price_field_names,
+            after_timestamp,
+        )
+    if limit is not None:
+        query = query.limit(limit)
+    rows = await db_session.stream(
+        query, execution_options={"yield_per": STREAMING_BATCH_SIZE}
+    )
+    async for row in rows:
+        yield row
+
+
+def _get_price_spreads(
+    price_field_names: list[str] | None = None,
+) -> list[tuple[str, sqlalchemy.ColumnElement]]:
+    """
+    The spread field names of the requested zones with the RTM minus DAM
+    price of the joined settlement periods
+    """
+    return [
+        (
+            PRICE_FIELD_NAME_TO_SPREAD_FIELD_NAME_MAP[price_column.name],
+            getattr(RTMPointInTimePriceDataDb, price_column.name)
+            - getattr(DAMPointInTimePriceDataDb, price_column.name),
+        )
+        for price_column in get_price_columns(
+            DAMPointInTimePriceDataDb, price_field_names
+        )
+    ]
+
+
+def _join_price_spread_query(
+    query: sqlalchemy.Select, time_frame: TimeFrame
+) -> sqlalchemy.Select:
+    """
+    Joins the DAM and RTM settlement periods in the time frame. Both sides
+    are filtered by timestamp so the partitions of each table are pruned
+    """
+    start_timestamp = int(time_frame.start_datetime.timestamp())
+    end_timestamp = int(time_frame.end_datetime.timestamp())
+    return (
+        query.select_from(DAMPointInTimePriceDataDb)
+        .join(
+            RTMPointInTimePriceDataDb,
+            RTMPointInTimePriceDataDb.settlement_period_start_timestamp
+            == DAMPointInTimePriceDataDb.settlement_period_start_timestamp,
+        )
+        .where(
+            DAMPointInTimePriceDataDb.settlement_period_start_timestamp.between(
+                start_timestamp, end_timestamp
+            ),
+            RTMPointInTimePriceDataDb.settlement_period_start_timestamp.between(
+                start_timestamp, end_timestamp
+            ),
+        )
+    )
+
+
+def _build_price_spreads_query(
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+    resample_seconds: int | None = None,
+    aggregation: ResampleAggregation = ResampleAggregation.MEAN,
+) -> sqlalchemy.Select:
+    """
+    Builds the select statement for the RTM minus DAM spreads of the
+    requested zones in every settlement period of the time frame that has
+    prices in both markets, ordered by settlement period. With
+    resample_seconds the spreads are aggregated into buckets like in
+    _build_resampled_price_rows_query
+    """
+    timestamp_column = DAMPointInTimePriceDataDb.settlement_period_start_timestamp
+    price_spreads = _get_price_spreads(price_field_names)
+    if resample_seconds is None:
+        query = sqlalchemy.select(
+            timestamp_column,
+            *[
+                price_spread.label(spread_field_name)
+                for spread_field_name, price_spread in price_spreads
+            ],
+        )
+        return _join_price_spread_query(query, time_frame).order_by(timestamp_column)
+    bucket_start_timestamp = _get_bucket_start_timestamp(
+        timestamp_column, resample_seconds
+    )
+    query = sqlalchemy.select(
+        bucket_start_timestamp,
+        *[
+            _aggregate_price_column(price_spread, timestamp_column, aggregation).label(
+                spread_field_name
+            )
+            for spread_field_name, price_spread in price_spreads
+        ],
+    )
+    return (
+        _join_price_spread_query(query, time_frame)
+        .group_by(bucket_start_timestamp)
+        .order_by(bucket_start_timestamp)
+    )
+
+
+def _build_price_spread_summary_query(
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+) -> sqlalchemy.Select:
+    """
+    Builds the select statement for a single row with, for every requested
+    zone, the number of joined settlement periods with a spread, how many of
+    them are positive, the mean spread and the largest absolute spread
+    """
+    summary_columns = []
+    for _, price_spread in _get_price_spreads(price_field_names):
+        summary_columns.extend(
+            [
+                sqlalchemy.func.count(price_spread),
+                sqlalchemy.func.count(price_spread).filter(price_spread > 0),
+                sqlalchemy.func.avg(price_spread),
+                sqlalchemy.func.max(sqlalchemy.func.abs(price_spread)),
+            ]
+        )
+    return _join_price_spread_query(sqlalchemy.select(*summary_columns), time_frame)
+
+
+async def _async_get_price_rollups(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    granularity: Granularity,
+    rollup_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    zones: list[str] | None = None,
+) -> list[BasePriceRollupDb]:
+    query = _build_price_rollups_query(time_frame, granularity, rollup_model, zones)
+    rollups = await db_session.scalars(query)
+    return list(rollups.all())
+
+
+async def _async_get_price_day_blocks(
+    db_session: AsyncSession,
+    first_day_start_timestamp: int,
+    last_day_start_timestamp: int,
+    day_block_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+) -> dict[int, bytes]:
+    """
+    Returns the compressed json of the stored day blocks between the two
+    trading days (both inclusive), keyed by the start of the trading day
+    """
+    day_blocks = await db_session.execute(
+        sqlalchemy.select(
+            day_block_model.trading_day_start_timestamp,
+            day_block_model.compressed_json,
+        ).where(
+            day_block_model.trading_day_start_timestamp.between(
+                first_day_start_timestamp, last_day_start_timestamp
+            )
+        )
+    )
+    return dict(day_blocks.tuples().all())
+
+
+async def _async_get_price_watermark(
+    db_session: AsyncSession,
+    first_day_start_timestamp: int,
+    last_day_start_timestamp: int,
+    day_block_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+) -> PriceWatermark:
+    """
+    Returns the watermark of the day blocks between the two trading days (both
+    inclusive) without reading the blocks themselves
+    """
+    watermark = await db_session.execute(
+        sqlalchemy.select(
+            sqlalchemy.func.count(),
+            sqlalchemy.func.coalesce(
+                sqlalchemy.func.sum(day_block_model.num_records), 0
+            ),
+            sqlalchemy.func.max(day_block_model.updated_at),
+        ).where(
+            day_block_model.trading_day_start_timestamp.between(
+                first_day_start_timestamp, last_day_start_timestamp
+            )
+        )
+    )
+    return PriceWatermark(*watermark.one())
+
+
+async def async_get_dam_price_records(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+) -> list[DAMPointInTimePriceDataDb]:
+    return await _async_get_price_records(
+        db_session, time_frame, DAMPointInTimePriceDataDb, price_field_names
+    )
+
+
+async def async_get_rtm_price_records(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
 ) -> list[RTMPointInTimePriceDataDb]:
-    return _get_price_records(db_session, time_frame, RTMPointInTimePriceDataDb)
+    return await _async_get_price_records(
+        db_session, time_frame, RTMPointInTimePriceDataDb, price_field_names
+    )
+
+
+def async_iter_dam_price_rows(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+    limit: int | None = None,
+    resample_seconds: int | None = None,
+    aggregation: ResampleAggregation = ResampleAggregation.MEAN,
+) -> typing.AsyncIterator[sqlalchemy.Row]:
+    return _async_iter_price_rows(
+        db_session,
+        time_frame,
+        DAMPointInTimePriceDataDb,
+        price_field_names,
+        after_timestamp,
+        limit,
+        resample_seconds,
+        aggregation,
+    )
+
+
+def async_iter_rtm_price_rows(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+    after_timestamp: int | None = None,
+    limit: int | None = None,
+    resample_seconds: int | None = None,
+    aggregation: ResampleAggregation = ResampleAggregation.MEAN,
+) -> typing.AsyncIterator[sqlalchemy.Row]:
+    return _async_iter_price_rows(
+        db_session,
+        time_frame,
+        RTMPointInTimePriceDataDb,
+        price_field_names,
+        after_timestamp,
+        limit,
+        resample_seconds,
+        aggregation,
+    )
+
+
+async def async_get_dam_price_rollups(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    granularity: Granularity,
+    zones: list[str] | None = None,
+) -> list[DAMPriceRollupDb]:
+    return await _async_get_price_rollups(
+        db_session, time_frame, granularity, DAMPriceRollupDb, zones
+    )
+
+
+async def async_get_rtm_price_rollups(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    granularity: Granularity,
+    zones: list[str] | None = None,
+) -> list[RTMPriceRollupDb]:
+    return await _async_get_price_rollups(
+        db_session, time_frame, granularity, RTMPriceRollupDb, zones
+    )
+
+
+async def async_get_dam_price_day_blocks(
+    db_session: AsyncSession,
+    first_day_start_timestamp: int,
+    last_day_start_timestamp: int,
+) -> dict[int, bytes]:
+    return await _async_get_price_day_blocks(
+        db_session,
+        first_day_start_timestamp,
+        last_day_start_timestamp,
+        DAMPriceDayBlockDb,
+    )
+
+
+async def async_get_rtm_price_day_blocks(
+    db_session: AsyncSession,
+    first_day_start_timestamp: int,
+    last_day_start_timestamp: int,
+) -> dict[int, bytes]:
+    return await _async_get_price_day_blocks(
+        db_session,
+        first_day_start_timestamp,
+        last_day_start_timestamp,
+        RTMPriceDayBlockDb,
+    )
+
+
+async def async_get_dam_price_watermark(
+    db_session: AsyncSession,
+    first_day_start_timestamp: int,
+    last_day_start_timestamp: int,
+) -> PriceWatermark:
+    return await _async_get_price_watermark(
+        db_session,
+        first_day_start_timestamp,
+        last_day_start_timestamp,
+        DAMPriceDayBlockDb,
+    )
+
+
+async def async_get_rtm_price_watermark(
+    db_session: AsyncSession,
+    first_day_start_timestamp: int,
+    last_day_start_timestamp: int,
+) -> PriceWatermark:
+    return await _async_get_price_watermark(
+        db_session,
+        first_day_start_timestamp,
+        last_day_start_timestamp,
+        RTMPriceDayBlockDb,
+    )
+
+
+async def async_iter_price_spread_rows(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+    resample_seconds: int | None = None,
+    aggregation: ResampleAggregation = ResampleAggregation.MEAN,
+) -> typing.AsyncIterator[sqlalchemy.Row]:
+    """
+    Streams the rows of _build_price_spreads_query from a server side cursor,
+    STREAMING_BATCH_SIZE rows at a time
+    """
+    query = _build_price_spreads_query(
+        time_frame, price_field_names, resample_seconds, aggregation
+    )
+    rows = await db_session.stream(
+        query, execution_options={"yield_per": STREAMING_BATCH_SIZE}
+    )
+    async for row in rows:
+        yield row
+
+
+async def async_get_price_spread_summary(
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None = None,
+) -> dict[str, ZonePriceSpreadSummary]:
+    """
+    Returns the spread statistics of the requested zones keyed by zone
+    """
+    summary_row = (
+        await db_session.execute(
+            _build_price_spread_summary_query(time_frame, price_field_names)
+        )
+    ).one()
+    zones = [
+        zone
+        for zone, field_name in PRICE_COLUMN_TO_FIELD_NAME_MAP.items()
+        if price_field_names is None or field_name in price_field_names
+    ]
+    return {
+        zone: ZonePriceSpreadSummary(
+            num_intervals=summary_row[4 * position],
+            num_positive_intervals=summary_row[4 * position + 1],
+            mean_spread_in_rs_per_mwh=summary_row[4 * position + 2],
+            max_abs_spread_in_rs_per_mwh=summary_row[4 * position + 3],
+        )
+        for position, zone in enumerate(zones)
+    }
+
+
+async def async_refresh_dam_latest_prices(db_session: AsyncSession) -> None:
+    await _async_refresh_latest_prices(db_session, DAMPointInTimePriceDataDb)
+
+
+async def async_refresh_rtm_latest_prices(db_session: AsyncSession) -> None:
+    await _async_refresh_latest_prices(db_session, RTMPointInTimePriceDataDb)
 
 
 MARKET_TO_DB_INSERTING_FN_MAP: dict[
@@ -154,10 +1247,96 @@ MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP: dict[
     Markets.RTM: create_multiple_rtm_price_records,
 }
 
+MARKET_TO_DB_UPSERTING_FN_MAP: dict[
+    Markets,
+    typing.Callable[
+        [Session, list[BasePointInTimePriceData], ConflictResolution],
+        list[BasePointInTimePriceDataDb],
+    ],
+] = {
+    Markets.DAM: upsert_multiple_dam_price_records,
+    Markets.RTM: upsert_multiple_rtm_price_records,
+}
+
+MARKET_TO_DB_COPYING_FN_MAP: dict[
+    Markets,
+    typing.Callable[
+        [Session, typing.Iterable[list[BasePointInTimePriceData]], ConflictResolution],
+        int,
+    ],
+] = {
+    Markets.DAM: copy_multiple_dam_price_records,
+    Markets.RTM: copy_multiple_rtm_price_records,
+}
+
 
 MARKET_TO_DB_GETTING_FN_MAP: dict[
-    Markets, typing.Callable[[Session, TimeFrame], list[BasePointInTimePriceDataDb]]
+    Markets, typing.Callable[..., list[BasePointInTimePriceDataDb]]
 ] = {
     Markets.DAM: get_dam_price_records,
     Markets.RTM: get_rtm_price_records,
 }
+
+MARKET_TO_DB_ITERATING_FN_MAP: dict[
+    Markets, typing.Callable[..., typing.Iterator[BasePointInTimePriceDataDb]]
+] = {
+    Markets.DAM: iter_dam_price_records,
+    Markets.RTM: iter_rtm_price_records,
+}
+
+MARKET_TO_DB_ROW_ITERATING_FN_MAP: dict[
+    Markets, typing.Callable[..., typing.Iterator[sqlalchemy.Row]]
+] = {
+    Markets.DAM: iter_dam_price_rows,
+    Markets.RTM: iter_rtm_price_rows,
+}
+
+MARKET_TO_DB_ROLLUP_GETTING_FN_MAP: dict[
+    Markets, typing.Callable[..., list[BasePriceRollupDb]]
+] = {
+    Markets.DAM: get_dam_price_rollups,
+    Markets.RTM: get_rtm_price_rollups,
+}
+
+MARKET_TO_ASYNC_DB_GETTING_FN_MAP: dict[
+    Markets,
+    typing.Callable[..., typing.Awaitable[list[BasePointInTimePriceDataDb]]],
+] = {
+    Markets.DAM: async_get_dam_price_records,
+    Markets.RTM: async_get_rtm_price_records,
+}
+
+MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP: dict[
+    Markets, typing.Callable[..., typing.AsyncIterator[sqlalchemy.Row]]
+] = {
+    Markets.DAM: async_iter_dam_price_rows,
+    Markets.RTM: async_iter_rtm_price_rows,
+}
+
+MARKET_TO_ASYNC_DB_ROLLUP_GETTING_FN_MAP: dict[
+    Markets, typing.Callable[..., typing.Awaitable[list[BasePriceRollupDb]]]
+] = {
+    Markets.DAM: async_get_dam_price_rollups,
+    Markets.RTM: async_get_rtm_price_rollups,
+}
+
+MARKET_TO_ASYNC_DB_DAY_BLOCK_GETTING_FN_MAP: dict[
+    Markets, typing.Callable[..., typing.Awaitable[dict[int, bytes]]]
+] = {
+    Markets.DAM: async_get_dam_price_day_blocks,
+    Markets.RTM: async_get_rtm_price_day_blocks,
+}
+
+MARKET_TO_ASYNC_DB_WATERMARK_GETTING_FN_MAP: dict[
+    Markets, typing.Callable[..., typing.Awaitable[PriceWatermark]]
+] = {
+    Markets.DAM: async_get_dam_price_watermark,
+    Markets.RTM: async_get_rtm_price_watermark,
+}
+
+MARKET_TO_ASYNC_DB_LATEST_REFRESHING_FN_MAP: dict[
+    Markets, typing.Callable[..., typing.Awaitable[None]]
+] = {
+    Markets.DAM: async_refresh_dam_latest_prices,
+    Markets.RTM: async_refresh_rtm_latest_prices,
+}
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import datetime
+import itertools
+import typing
+import zlib
+
+import sqlalchemy
+
+from src.common import logging_utils
+from src.common.constants import MARKET_TZ
+from src.database import Session
+from src.marketdata.models import PRICE_ORM_TO_DAY_BLOCK_ORM_MAP, get_price_row_columns
+from src.marketdata.schema_utils import convert_price_rows_to_json_objects
+
+logger = logging_utils.create_logger(__name__)
+
+SECONDS_IN_DAY = 24 * 60 * 60
+STREAMING_BATCH_SIZE = 1000
+DAY_BLOCKS_PER_INSERT = 31
+
+
+class DayBlockSegment(typing.NamedTuple):
+    """
+    A run of settlement periods between the two timestamps (both inclusive)
+    of a response. Segments with a compressed_json are served from the day
+    block, the others are queried from the price table
+    """
+
+    start_timestamp: int
+    end_timestamp: int
+    compressed_json: bytes | None = None
+
+
+class PriceWatermark(typing.NamedTuple):
+    """
+    Summary of the day blocks of a range of trading days. It changes whenever
+    price records of one of the days are written or dropped
+    """
+
+    num_day_blocks: int
+    num_records: int
+    last_modified: datetime.datetime | None
+
+
+def get_trading_day_start_timestamp(unix_timestamp: int) -> int:
+    """
+    Unix timestamp of the midnight in market time that starts the trading
+    day of the given unix timestamp
+    """
+    market_datetime = datetime.datetime.fromtimestamp(unix_timestamp, MARKET_TZ)
+    return int(
+        MARKET_TZ.localize(
+            datetime.datetime.combine(market_datetime.date(), datetime.time())
+        ).timestamp()
+    )
+
+
+def get_full_trading_day_starts(
+    start_unix_timestamp: int, end_unix_timestamp: int
+) -> list[int]:
+    """
+    Start timestamps of the trading days that lie entirely between the two
+    timestamps (both inclusive)
+    """
+    day_start_timestamp = get_trading_day_start_timestamp(start_unix_timestamp)
+    if day_start_timestamp < start_unix_timestamp:
+        day_start_timestamp += SECONDS_IN_DAY
+    full_day_starts = []
+    while day_start_timestamp + SECONDS_IN_DAY - 1 <= end_unix_timestamp:
+        full_day_starts.append(day_start_timestamp)
+        day_start_timestamp += SECONDS_IN_DAY
+    return full_day_starts
+
+
+def plan_day_block_segments(
+    start_unix_timestamp: int,
+    end_unix_timestamp: int,
+    compressed_json_by_day: dict[int, bytes],
+) -> list[DayBlockSegment]:
+    """
+    Splits the time frame into the stored day blocks and the runs of
+    settlement periods around them (partial edge days and days without a
+    block), which are merged so each run is queried once
+    """
+    segments: list[DayBlockSegment] = []
+    live_start_timestamp = start_unix_timestamp
+    for day_start_timestamp in get_full_trading_day_starts(
+        start_unix_timestamp, end_unix_timestamp
+    ):
+        compressed_json = compressed_json_by_day.get(day_start_timestamp)
+        if compressed_json is None:
+            continue
+        if live_start_timestamp < day_start_timestamp:
+            segments.append(
+                DayBlockSegment(live_start_timestamp, day_start_timestamp - 1)
+            )
+        segments.append(
+            DayBlockSegment(
+                day_start_timestamp,
+                day_start_timestamp + SECONDS_IN_DAY - 1,
+                compressed_json,
+            )
+        )
+        live_start_timestamp = day_start_timestamp + SECONDS_IN_DAY
+    if live_start_timestamp <= end_unix_timestamp:
+        segments.append(DayBlockSegment(live_start_timestamp, end_unix_timestamp))
+    return segments
+
+
+def refresh_price_day_blocks(
+    db_session: Session,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    start_unix_timestamp: int,
+    end_unix_timestamp: int,
+    days_per_insert: int = DAY_BLOCKS_PER_INSERT,
+) -> None:
+    """
+    Rewrites the day blocks of the trading days that contain settlement
+    periods between the two timestamps from the price table, in the caller's
+    transaction. Days left without price records lose their block. The price
+    rows are streamed from a server side cursor and the blocks are inserted
+    days_per_insert days at a time, so refreshing years of records (Ex: after
+    a bulk load) holds about one batch of days in memory
+    """
+    day_block_model = PRICE_ORM_TO_DAY_BLOCK_ORM_MAP[db_price_model]
+    first_day_start_timestamp = get_trading_day_start_timestamp(start_unix_timestamp)
+    last_day_start_timestamp = get_trading_day_start_timestamp(end_unix_timestamp)
+    price_row_columns = get_price_row_columns(db_price_model)
+    field_names = [column.name for column in price_row_columns]
+    db_session.execute(
+        sqlalchemy.delete(day_block_model).where(
+            day_block_model.trading_day_start_timestamp.between(
+                first_day_start_timestamp, last_day_start_timestamp
+            )
+        )
+    )
+    price_rows = db_session.execute(
+        sqlalchemy.select(*price_row_columns)
+        .where(
+            db_price_model.settlement_period_start_timestamp.between(
+                first_day_start_timestamp,
+                last_day_start_timestamp + SECONDS_IN_DAY - 1,
+            )
+        )
+        .order_by(db_price_model.settlement_period_start_timestamp),
+        execution_options={"yield_per": STREAMING_BATCH_SIZE},
+    )
+
+    day_blocks = []
+    num_day_blocks = 0
+    for day_start_timestamp, day_price_rows in itertools.groupby(
+        price_rows, key=lambda price_row: get_trading_day_start_timestamp(price_row[0])
+    ):
+        day_price_rows = list(day_price_rows)
+        day_blocks.append(
+            {
+                "trading_day_start_timestamp": day_start_timestamp,
+                "num_records": len(day_price_rows),
+                "compressed_json": zlib.compress(
+                    convert_price_rows_to_json_objects(day_price_rows, field_names)
+                ),
+            }
+        )
+        if len(day_blocks) == days_per_insert:
+            db_session.execute(sqlalchemy.insert(day_block_model), day_blocks)
+            num_day_blocks += len(day_blocks)
+            day_blocks = []
+    if day_blocks:
+        db_session.execute(sqlalchemy.insert(day_block_model), day_blocks)
+        num_day_blocks += len(day_blocks)
+    logger.debug(
+        f"Refreshed {num_day_blocks} {day_block_model.__tablename__} between "
+        f"{start_unix_timestamp} and {end_unix_timestamp}"
+    )
@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import collections
+import itertools
+import threading
+import typing
+
+from src.common import logging_utils
+from src.common.config import LATEST_PRICE_BUFFER_SIZE
+from src.common.enums import Markets
+from src.marketdata.schema_utils import convert_price_rows_to_json_objects
+
+logger = logging_utils.create_logger(__name__)
+
+
+class LatestPriceBuffer:
+    """
+    Ring buffer of the most recent settlement periods of every market, kept
+    as serialized json objects so they are answered without touching the
+    database. A market is only kept up to date once it has been seeded, so
+    processes that only write (Ex: the scrapers) do not pay for it
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._json_objects_by_market: dict[
+            Markets, collections.deque[tuple[int, bytes]]
+        ] = {}
+        self._lock = threading.Lock()
+
+    def is_seeded(self, market: Markets) -> bool:
+        return market in self._json_objects_by_market
+
+    def is_stale_after_write(self, market: Markets, max_timestamp: int) -> bool:
+        """
+        Whether a write of settlement periods up to max_timestamp changes the
+        buffered periods of a seeded market
+        """
+        with self._lock:
+            json_objects = self._json_objects_by_market.get(market)
+            if json_objects is None:
+                return False
+            return len(json_objects) < self.capacity or max_timestamp >= (
+                json_objects[0][0]
+            )
+
+    def replace(
+        self,
+        market: Markets,
+        price_rows: typing.Sequence[typing.Sequence],
+        field_names: list[str],
+    ) -> None:
+        """
+        Replaces the buffered periods of the market with the rows, which are
+        the most recent ones in any order
+        """
+        json_objects: collections.deque[tuple[int, bytes]] = collections.deque(
+            (
+                (
+                    price_row[0],
+                    convert_price_rows_to_json_objects([price_row], field_names),
+                )
+                for price_row in sorted(price_rows, key=lambda price_row: price_row[0])
+            ),
+            maxlen=self.capacity,
+        )
+        with self._lock:
+            self._json_objects_by_market[market] = json_objects
+        logger.debug(f"Buffered the latest {len(json_objects)} {market.name} prices")
+
+    def get_latest_json_array(self, market: Markets, n: int = 1) -> bytes | None:
+        """
+        Json array of the last n buffered periods in settlement period order,
+        None when the market has not been seeded
+        """
+        with self._lock:
+            json_objects = self._json_objects_by_market.get(market)
+            if json_objects is None:
+                return None
+            num_skipped = max(len(json_objects) - n, 0)
+            latest_json_objects = [
+                json_object
+                for _, json_object in itertools.islice(json_objects, num_skipped, None)
+            ]
+        return b"[" + b",".join(latest_json_objects) + b"]"
+
+    def drop_before(self, market: Markets, unix_timestamp: int) -> None:
+        """
+        Drops the buffered periods of the market that start before the
+        timestamp, Ex: the ones of dropped partitions
+        """
+        with self._lock:
+            json_objects = self._json_objects_by_market.get(market)
+            while json_objects and json_objects[0][0] < unix_timestamp:
+                json_objects.popleft()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._json_objects_by_market.clear()
+
+
+latest_price_buffer = LatestPriceBuffer(capacity=LATEST_PRICE_BUFFER_SIZE)
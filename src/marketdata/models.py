@@ -1,5 +1,16 @@
-from sqlalchemy import BigInteger, Column, Float, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    DateTime,
+    Float,
+    Integer,
+    LargeBinary,
+    String,
+    UniqueConstraint,
+    func,
+)
 
+from src.common.constants import PRICE_COLUMN_TO_FIELD_NAME_MAP
 from src.common.enums import Markets
 from src.database import Base
 
@@ -7,13 +18,15 @@ from src.database import Base
 class BasePointInTimePriceDataDb(Base):
     """
     Base ORM model for point in time price data
-    The settlement_period_start_datetime should be in UTC
+    The settlement_period_start_datetime should be in UTC.
+    The tables are range partitioned by month on
+    settlement_period_start_timestamp, see src.marketdata.partitions
     """
 
     __abstract__ = True
 
-    id = Column(Integer, primary_key=True)
-    settlement_period_start_timestamp = Column(BigInteger)
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    settlement_period_start_timestamp = Column(BigInteger, primary_key=True)
     a1_price_in_rs_per_mwh = Column(Float)
     a2_price_in_rs_per_mwh = Column(Float)
     e1_price_in_rs_per_mwh = Column(Float)
@@ -32,14 +45,163 @@ class BasePointInTimePriceDataDb(Base):
 
 class DAMPointInTimePriceDataDb(BasePointInTimePriceDataDb):
     __tablename__ = "dam_prices"
+    __table_args__ = (
+        UniqueConstraint(
+            "settlement_period_start_timestamp",
+            name="uq_dam_prices_settlement_period_start_timestamp",
+        ),
+        {"postgresql_partition_by": "RANGE (settlement_period_start_timestamp)"},
+    )
 
 
 class RTMPointInTimePriceDataDb(BasePointInTimePriceDataDb):
     __tablename__ = "rtm_prices"
+    __table_args__ = (
+        UniqueConstraint(
+            "settlement_period_start_timestamp",
+            "session_id",
+            name="uq_rtm_prices_settlement_period_start_timestamp_session_id",
+            postgresql_nulls_not_distinct=True,
+        ),
+        {"postgresql_partition_by": "RANGE (settlement_period_start_timestamp)"},
+    )
     session_id = Column(String)
 
 
+class BasePriceRollupDb(Base):
+    """
+    Base ORM model for the per zone price statistics of an hour, day or month.
+    bucket_start_timestamp is the unix timestamp of the start of the bucket
+    in market time. The rows are recomputed whenever price records of the
+    bucket are written, see src.marketdata.rollups
+    """
+
+    __abstract__ = True
+
+    granularity = Column(String, primary_key=True)
+    bucket_start_timestamp = Column(BigInteger, primary_key=True)
+    zone = Column(String, primary_key=True)
+    num_intervals = Column(Integer)
+    min_price_in_rs_per_mwh = Column(Float)
+    max_price_in_rs_per_mwh = Column(Float)
+    mean_price_in_rs_per_mwh = Column(Float)
+
+
+class DAMPriceRollupDb(BasePriceRollupDb):
+    __tablename__ = "dam_price_rollups"
+
+
+class RTMPriceRollupDb(BasePriceRollupDb):
+    __tablename__ = "rtm_price_rollups"
+
+
+class BasePriceDayBlockDb(Base):
+    """
+    Base ORM model for the price records of one trading day (midnight to
+    midnight in market time), stored as the zlib compressed, comma separated
+    json objects that the API returns for them. The blocks are rewritten
+    whenever price records of the day are written, see
+    src.marketdata.day_blocks. updated_at is the watermark the API derives
+    its ETag and Last-Modified headers from
+    """
+
+    __abstract__ = True
+
+    trading_day_start_timestamp = Column(BigInteger, primary_key=True)
+    num_records = Column(Integer, nullable=False)
+    compressed_json = Column(LargeBinary, nullable=False)
+    updated_at = Column(
+        DateTime(timezone=True), nullable=False, server_default=func.now()
+    )
+
+
+class DAMPriceDayBlockDb(BasePriceDayBlockDb):
+    __tablename__ = "dam_price_day_blocks"
+
+
+class RTMPriceDayBlockDb(BasePriceDayBlockDb):
+    __tablename__ = "rtm_price_day_blocks"
+
+
+def get_price_row_columns(
+    db_price_model: type[BasePointInTimePriceDataDb],
+    price_field_names: list[str] | None = None,
+) -> list[Column]:
+    """
+    Columns of the price rows: the settlement period timestamp first, then the
+    requested price columns and last the remaining market specific columns
+    (Ex: session_id), which is the field order of the pydantic models
+    """
+    table = db_price_model.__table__
+    price_columns = [
+        table.columns[field_name]
+        for field_name in PRICE_COLUMN_TO_FIELD_NAME_MAP.values()
+        if price_field_names is None or field_name in price_field_names
+    ]
+    other_columns = [
+        column
+        for column in table.columns
+        if column.name not in ("id", "settlement_period_start_timestamp")
+        and column.name not in PRICE_COLUMN_TO_FIELD_NAME_MAP.values()
+    ]
+    return [table.columns.settlement_period_start_timestamp] + (
+        price_columns + other_columns
+    )
+
+
+def get_price_row_key_columns(
+    db_price_model: type[BasePointInTimePriceDataDb],
+) -> list[Column]:
+    """
+    Columns of the unique key of the price rows, the settlement period
+    timestamp first (Ex: followed by session_id for RTM)
+    """
+    for constraint in db_price_model.__table__.constraints:
+        if isinstance(constraint, UniqueConstraint):
+            return list(constraint.columns)
+    return [db_price_model.__table__.columns.settlement_period_start_timestamp]
+
+
+def get_price_columns(
+    db_price_model: type[BasePointInTimePriceDataDb],
+    price_field_names: list[str] | None = None,
+) -> list[Column]:
+    """
+    The requested price columns of the price rows, without the settlement
+    period timestamp and the market specific columns
+    """
+    return [
+        column
+        for column in get_price_row_columns(db_price_model, price_field_names)
+        if column.name in PRICE_COLUMN_TO_FIELD_NAME_MAP.values()
+    ]
+
+
 MARKETTYPE_TO_ORM_MAP = {
     Markets.DAM: DAMPointInTimePriceDataDb,
     Markets.RTM: RTMPointInTimePriceDataDb,
 }
+
+ORM_TO_MARKETTYPE_MAP = {
+    db_price_model: market for market, db_price_model in MARKETTYPE_TO_ORM_MAP.items()
+}
+
+MARKETTYPE_TO_ROLLUP_ORM_MAP = {
+    Markets.DAM: DAMPriceRollupDb,
+    Markets.RTM: RTMPriceRollupDb,
+}
+
+PRICE_ORM_TO_ROLLUP_ORM_MAP = {
+    DAMPointInTimePriceDataDb: DAMPriceRollupDb,
+    RTMPointInTimePriceDataDb: RTMPriceRollupDb,
+}
+
+MARKETTYPE_TO_DAY_BLOCK_ORM_MAP = {
+    Markets.DAM: DAMPriceDayBlockDb,
+    Markets.RTM: RTMPriceDayBlockDb,
+}
+
+PRICE_ORM_TO_DAY_BLOCK_ORM_MAP = {
+    DAMPointInTimePriceDataDb: DAMPriceDayBlockDb,
+    RTMPointInTimePriceDataDb: RTMPriceDayBlockDb,
+}
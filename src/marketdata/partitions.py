@@ -0,0 +1,172 @@
+from __future__ import annotations
+
+import datetime
+import typing
+
+import sqlalchemy
+
+from src.common import logging_utils
+from src.common.constants import MARKET_TZ
+from src.database import Session
+from src.marketdata.cache import price_response_cache
+from src.marketdata.latest import latest_price_buffer
+from src.marketdata.models import (
+    MARKETTYPE_TO_DAY_BLOCK_ORM_MAP,
+    MARKETTYPE_TO_ORM_MAP,
+    MARKETTYPE_TO_ROLLUP_ORM_MAP,
+)
+
+logger = logging_utils.create_logger(__name__)
+
+PRICE_TABLE_TO_MARKETTYPE_MAP = {
+    db_price_model.__tablename__: market
+    for market, db_price_model in MARKETTYPE_TO_ORM_MAP.items()
+}
+
+
+class MonthlyPartition(typing.NamedTuple):
+    """
+    A monthly partition of a price table. The bounds are the unix timestamps
+    of the start of the month and of the start of the next month in the
+    market timezone
+    """
+
+    name: str
+    lower_bound: int
+    upper_bound: int
+
+
+def _get_monthly_partition(table_name: str, unix_timestamp: int) -> MonthlyPartition:
+    market_datetime = datetime.datetime.fromtimestamp(unix_timestamp, MARKET_TZ)
+    year, month = market_datetime.year, market_datetime.month
+    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+    lower_bound = MARKET_TZ.localize(datetime.datetime(year, month, 1))
+    upper_bound = MARKET_TZ.localize(datetime.datetime(next_year, next_month, 1))
+    return MonthlyPartition(
+        name=f"{table_name}_y{year}m{month:02d}",
+        lower_bound=int(lower_bound.timestamp()),
+        upper_bound=int(upper_bound.timestamp()),
+    )
+
+
+def get_existing_partitions(db_session: Session, table_name: str) -> set[str]:
+    existing_partitions = db_session.execute(
+        sqlalchemy.text(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class AS parent ON pg_inherits.inhparent = parent.oid "
+            "JOIN pg_class AS child ON pg_inherits.inhrelid = child.oid "
+            "WHERE parent.relname = :table_name"
+        ),
+        {"table_name": table_name},
+    ).scalars()
+    return set(existing_partitions)
+
+
+def ensure_monthly_partitions(
+    db_session: Session,
+    table_name: str,
+    unix_timestamps: typing.Iterable[int],
+) -> list[MonthlyPartition]:
+    """
+    Creates the monthly partitions that are needed to store rows with the
+    given settlement period timestamps. Must be called before inserting, since
+    the price tables have no default partition. Returns the created partitions
+    """
+    required_partitions = {
+        _get_monthly_partition(table_name, unix_timestamp)
+        for unix_timestamp in unix_timestamps
+    }
+    if not required_partitions:
+        return []
+
+    existing_partitions = get_existing_partitions(db_session, table_name)
+    created_partitions = []
+    for partition in sorted(required_partitions):
+        if partition.name in existing_partitions:
+            continue
+        db_session.execute(
+            sqlalchemy.text(
+                f"CREATE TABLE IF NOT EXISTS {partition.name} "
+                f"PARTITION OF {table_name} FOR VALUES "
+                f"FROM ({partition.lower_bound}) TO ({partition.upper_bound})"
+            )
+        )
+        logger.info(f"Created partition {partition.name}")
+        created_partitions.append(partition)
+    return created_partitions
+
+
+def ensure_monthly_partitions_between(
+    db_session: Session,
+    table_name: str,
+    start_unix_timestamp: int,
+    end_unix_timestamp: int,
+) -> list[MonthlyPartition]:
+    """
+    Creates the monthly partitions needed for every settlement period
+    between the two timestamps (both inclusive)
+    """
+    month_start_timestamps = []
+    unix_timestamp = start_unix_timestamp
+    while unix_timestamp <= end_unix_timestamp:
+        month_start_timestamps.append(unix_timestamp)
+        unix_timestamp = _get_monthly_partition(table_name, unix_timestamp).upper_bound
+    month_start_timestamps.append(end_unix_timestamp)
+    return ensure_monthly_partitions(db_session, table_name, month_start_timestamps)
+
+
+def drop_monthly_partitions_before(
+    db_session: Session,
+    table_name: str,
+    cutoff_datetime: datetime.datetime,
+) -> list[str]:
+    """
+    Drops the monthly partitions that only hold settlement periods before the
+    cutoff, along with the day blocks and rollups of their months, and drops
+    them from the response cache and the latest price buffer. Only the
+    expired partitions are touched, the rows of the remaining months are not
+    scanned. Returns the names of the dropped partitions
+    """
+    cutoff_timestamp = cutoff_datetime.timestamp()
+    dropped_partitions = []
+    for partition_name in sorted(get_existing_partitions(db_session, table_name)):
+        partition_start_timestamp = int(
+            MARKET_TZ.localize(
+                datetime.datetime.strptime(
+                    partition_name.removeprefix(f"{table_name}_"), "y%Ym%m"
+                )
+            ).timestamp()
+        )
+        partition = _get_monthly_partition(table_name, partition_start_timestamp)
+        if partition.upper_bound > cutoff_timestamp:
+            continue
+        db_session.execute(
+            sqlalchemy.text(
+                f"ALTER TABLE {table_name} DETACH PARTITION {partition_name}"
+            )
+        )
+        db_session.execute(sqlalchemy.text(f"DROP TABLE {partition_name}"))
+        logger.info(f"Dropped partition {partition_name}")
+        dropped_partitions.append(partition_name)
+        dropped_upper_bound = partition.upper_bound
+    market = PRICE_TABLE_TO_MARKETTYPE_MAP.get(table_name)
+    if dropped_partitions and market is not None:
+        # the day blocks and rollups of the dropped months must not outlive
+        # their rows
+        day_block_model = MARKETTYPE_TO_DAY_BLOCK_ORM_MAP[market]
+        db_session.execute(
+            sqlalchemy.delete(day_block_model).where(
+                day_block_model.trading_day_start_timestamp < dropped_upper_bound
+            )
+        )
+        rollup_model = MARKETTYPE_TO_ROLLUP_ORM_MAP[market]
+        db_session.execute(
+            sqlalchemy.delete(rollup_model).where(
+                rollup_model.bucket_start_timestamp < dropped_upper_bound
+            )
+        )
+    db_session.commit()
+    if dropped_partitions and market is not None:
+        price_response_cache.invalidate(market, 0, dropped_upper_bound - 1)
+        latest_price_buffer.drop_before(market, dropped_upper_bound)
+    return dropped_partitions
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import sqlalchemy
+
+from src.common import logging_utils
+from src.common.constants import MARKET_TZ, PRICE_COLUMN_TO_FIELD_NAME_MAP
+from src.common.enums import Granularity
+from src.database import Session
+from src.marketdata.models import PRICE_ORM_TO_ROLLUP_ORM_MAP
+
+logger = logging_utils.create_logger(__name__)
+
+
+def _bucket_start_sql(unix_timestamp_sql: str) -> str:
+    """
+    SQL for the unix timestamp of the start of the hour, day or month (in
+    market time) that contains the given unix timestamp
+    """
+    return (
+        f"extract(epoch FROM date_trunc(:granularity, "
+        f"to_timestamp({unix_timestamp_sql}) AT TIME ZONE :market_tz) "
+        f"AT TIME ZONE :market_tz)::bigint"
+    )
+
+
+def _next_bucket_start_sql(unix_timestamp_sql: str) -> str:
+    return (
+        f"extract(epoch FROM (date_trunc(:granularity, "
+        f"to_timestamp({unix_timestamp_sql}) AT TIME ZONE :market_tz) "
+        f"+ ('1 ' || :granularity)::interval) AT TIME ZONE :market_tz)::bigint"
+    )
+
+
+def _build_refresh_statement(
+    price_table_name: str, rollup_table_name: str
+) -> sqlalchemy.TextClause:
+    """
+    Recomputes every bucket of one granularity that overlaps
+    [:start_timestamp, :end_timestamp] from the price table, unpivoting the
+    price columns into one rollup row per zone
+    """
+    zone_values = ", ".join(
+        f"('{zone}', prices.{field_name})"
+        for zone, field_name in PRICE_COLUMN_TO_FIELD_NAME_MAP.items()
+    )
+    return sqlalchemy.text(
+        f"""
+        INSERT INTO {rollup_table_name} (
+            granularity, bucket_start_timestamp, zone, num_intervals,
+            min_price_in_rs_per_mwh, max_price_in_rs_per_mwh,
+            mean_price_in_rs_per_mwh
+        )
+        SELECT
+            :granularity,
+            {_bucket_start_sql("prices.settlement_period_start_timestamp")},
+            zone_prices.zone,
+            count(zone_prices.price),
+            min(zone_prices.price),
+            max(zone_prices.price),
+            avg(zone_prices.price)
+        FROM {price_table_name} AS prices
+        CROSS JOIN LATERAL (VALUES {zone_values}) AS zone_prices (zone, price)
+        WHERE prices.settlement_period_start_timestamp
+                  >= {_bucket_start_sql(":start_timestamp")}
+          AND prices.settlement_period_start_timestamp
+                  < {_next_bucket_start_sql(":end_timestamp")}
+        GROUP BY 2, zone_prices.zone
+        ON CONFLICT (granularity, bucket_start_timestamp, zone) DO UPDATE SET
+            num_intervals = EXCLUDED.num_intervals,
+            min_price_in_rs_per_mwh = EXCLUDED.min_price_in_rs_per_mwh,
+            max_price_in_rs_per_mwh = EXCLUDED.max_price_in_rs_per_mwh,
+            mean_price_in_rs_per_mwh = EXCLUDED.mean_price_in_rs_per_mwh
+        """
+    )
+
+
+def refresh_price_rollups(
+    db_session: Session,
+    db_price_model: sqlalchemy.orm.decl_api.DeclarativeMeta,
+    start_unix_timestamp: int,
+    end_unix_timestamp: int,
+) -> None:
+    """
+    Recomputes the hourly, daily and monthly rollups of the buckets that
+    contain settlement periods between the two timestamps. Runs one set based
+    statement per granularity in the caller's transaction
+    """
+    rollup_model = PRICE_ORM_TO_ROLLUP_ORM_MAP[db_price_model]
+    refresh_stmt = _build_refresh_statement(
+        db_price_model.__tablename__, rollup_model.__tablename__
+    )
+    for granularity in Granularity:
+        db_session.execute(
+            refresh_stmt,
+            {
+                "granularity": granularity.value,
+                "market_tz": MARKET_TZ.zone,
+                "start_timestamp": start_unix_timestamp,
+                "end_timestamp": end_unix_timestamp,
+            },
+        )
+    logger.debug(
+        f"Refreshed {rollup_model.__tablename__} between "
+        f"{start_unix_timestamp} and {end_unix_timestamp}"
+    )
@@ -1,29 +1,139 @@
+import datetime
+import time
+import typing
+import zlib
 from typing import Annotated
 
 import fastapi
-from fastapi import APIRouter, Depends, Query
+import orjson
+from fastapi import APIRouter, Depends, Header, Query
+from fastapi.responses import Response, StreamingResponse
+from sqlalchemy import Row
 from starlette import status as StarletteStatus
 
 from src.common import logging_utils
+from src.common.compression import (
+    is_compressible_media_type,
+    negotiate_content_encoding,
+)
+from src.common.config import COMPRESSION_MIN_SIZE_BYTES, LATEST_PRICE_BUFFER_SIZE
+from src.common.constants import (
+    ALL_PRICE_COLUMNS,
+    MARKET_TZ,
+    PRICE_COLUMN_TO_FIELD_NAME_MAP,
+    PRICE_FIELD_NAME_TO_SPREAD_FIELD_NAME_MAP,
+)
+from src.common.enums import (
+    ExportFormat,
+    Granularity,
+    Markets,
+    ResampleAggregation,
+    ResponseFormat,
+    ResponseShape,
+)
+from src.common.metrics import (
+    PRICE_READ_PHASE_DURATION_SECONDS,
+    PRICE_ROWS_PER_REQUEST,
+    PriceReadTimer,
+)
 from src.common.models import TimeFrame
-from src.common.utils import convert_timestamp_to_indian_datetime
-from src.database import Session  # noqa
-from src.marketdata.crud import get_dam_price_records, get_rtm_price_records
-from src.marketdata.router_utils import _convert_string_to_datetime
-from src.marketdata.schemas import DAMPointInTimePriceData, RTMPointInTimePriceData
+from src.common.utils import (
+    convert_timestamp_to_indian_datetime,
+    convert_timestamps_to_indian_datetimes,
+)
+from src.database import AsyncReadSession, AsyncSession  # noqa
+from src.marketdata.arrow_utils import aiter_price_rows_as_arrow
+from src.marketdata.batch import (
+    MergedPriceQuery,
+    PriceBatchWindow,
+    get_merged_query_time_frame,
+    merge_price_batch_windows,
+    split_merged_price_rows,
+)
+from src.marketdata.cache import PriceCacheKey, price_response_cache
+from src.marketdata.crud import (
+    MARKET_TO_ASYNC_DB_DAY_BLOCK_GETTING_FN_MAP,
+    MARKET_TO_ASYNC_DB_LATEST_REFRESHING_FN_MAP,
+    MARKET_TO_ASYNC_DB_ROLLUP_GETTING_FN_MAP,
+    MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP,
+    MARKET_TO_ASYNC_DB_WATERMARK_GETTING_FN_MAP,
+    async_get_price_spread_summary,
+    async_iter_price_spread_rows,
+)
+from src.marketdata.day_blocks import (
+    DayBlockSegment,
+    get_full_trading_day_starts,
+    get_trading_day_start_timestamp,
+    plan_day_block_segments,
+)
+from src.marketdata.latest import latest_price_buffer
+from src.marketdata.models import (
+    MARKETTYPE_TO_ORM_MAP,
+    get_price_columns,
+    get_price_row_columns,
+    get_price_row_key_columns,
+)
+from src.marketdata.router_utils import (
+    _convert_string_to_datetime,
+    compute_price_etag,
+    convert_datetime_query_params_to_time_frame,
+    convert_resample_query_param_to_seconds,
+    convert_zones_query_param_to_price_field_names,
+    etag_matches_if_none_match,
+    format_last_modified,
+    get_price_cache_control,
+    get_price_response_format,
+)
+from src.marketdata.schema_utils import (
+    MARKET_TIME_STEP_IN_SECONDS,
+    aiter_gzip,
+    aiter_json_array,
+    aiter_price_rows_as_columnar_json,
+    aiter_price_rows_as_csv,
+    aiter_price_rows_as_json_array,
+    aiter_price_rows_as_json_objects,
+    aiter_price_rows_as_ndjson,
+    convert_price_rows_to_json_objects,
+)
+from src.marketdata.schemas import (
+    DAMPointInTimePriceData,
+    PriceAggregate,
+    PriceBatchRequest,
+    RTMPointInTimePriceData,
+    ZonePriceAggregate,
+)
+from src.marketdata.stream import (
+    aiter_price_events,
+    parse_price_event_id,
+    price_stream_broker,
+)
 
 logger = logging_utils.create_logger(__name__)
 
 # Create a FastAPI app
 router = APIRouter(prefix="/marketdata")
 
+MAX_PAGE_SIZE = 10000
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+CACHE_STATUS_HEADER = "X-Cache"
 
-def get_db_session():
-    db_session = Session()
+EXPORT_FORMAT_TO_MEDIA_TYPE_MAP = {
+    ExportFormat.CSV: "text/csv",
+    ExportFormat.NDJSON: "application/x-ndjson",
+}
+EXPORT_FORMAT_TO_SERIALIZING_FN_MAP = {
+    ExportFormat.CSV: aiter_price_rows_as_csv,
+    ExportFormat.NDJSON: aiter_price_rows_as_ndjson,
+}
+
+
+async def get_db_session():
+    # the endpoints only read, so they are served by the read replicas
+    db_session = AsyncReadSession()
     try:
         yield db_session
     finally:
-        db_session.close()
+        await db_session.close()
 
 
 StartTimeQueryParameter = Annotated[
@@ -40,7 +150,104 @@ EndTimeQueryParameter = Annotated[
         description="end datetime in ISO format(Ex: 2021-01-01 00:00:00)",
     ),
 ]
-DbDepends = Annotated[Session, Depends(get_db_session)]
+ZonesQueryParameter = Annotated[
+    list[str] | None,
+    Query(
+        alias="zones",
+        description="Zones to return prices for, one of "
+        f"{', '.join(ALL_PRICE_COLUMNS)} (Ex: zones=N1,MCP). Defaults to all",
+    ),
+]
+CursorQueryParameter = Annotated[
+    int | None,
+    Query(
+        alias="cursor",
+        description=f"Cursor of the page to return, taken from the "
+        f"{NEXT_CURSOR_HEADER} header of the previous page",
+    ),
+]
+PageSizeQueryParameter = Annotated[
+    int | None,
+    Query(
+        alias="limit",
+        ge=1,
+        le=MAX_PAGE_SIZE,
+        description="Maximum number of records in the page. "
+        "Without it the whole time frame is streamed",
+    ),
+]
+ResponseShapeQueryParameter = Annotated[
+    ResponseShape,
+    Query(
+        alias="format",
+        description="rows returns one object per settlement period, columnar "
+        "a single object with one array per zone",
+    ),
+]
+ResampleQueryParameter = Annotated[
+    str | None,
+    Query(
+        alias="resample",
+        description="Interval to aggregate the settlement periods into, "
+        "aligned to the trading days (Ex: 1h, 4h or 1d)",
+    ),
+]
+AggregationQueryParameter = Annotated[
+    ResampleAggregation,
+    Query(
+        alias="aggregation",
+        description="How the prices of a resampled interval are combined",
+    ),
+]
+IfNoneMatchHeader = Annotated[
+    str | None,
+    Header(
+        alias="If-None-Match",
+        description="ETag of a previous response, answered with a 304 "
+        "when the records have not changed since",
+    ),
+]
+AcceptHeader = Annotated[
+    str | None,
+    Header(
+        alias="Accept",
+        description="application/json (default), "
+        f"{ResponseFormat.ARROW.value} or {ResponseFormat.PARQUET.value}",
+    ),
+]
+GzipQueryParameter = Annotated[
+    bool,
+    Query(
+        alias="gzip",
+        description="Whether to download the export as a gzip file",
+    ),
+]
+AcceptEncodingHeader = Annotated[
+    str | None,
+    Header(
+        alias="Accept-Encoding",
+        description="Compressions the client accepts (Ex: zstd, br, gzip)",
+    ),
+]
+SinceQueryParameter = Annotated[
+    int | None,
+    Query(
+        alias="since",
+        description="Unix timestamp of the last received settlement period, "
+        "the stream resumes with the ones after it",
+    ),
+]
+LastEventIdHeader = Annotated[
+    str | None,
+    Header(
+        alias="Last-Event-ID",
+        description="Id of the last received event, sent by EventSource "
+        "clients when they reconnect. The stream resumes with the settlement "
+        "period of the event, so the other sessions of the period are sent "
+        "again. Takes precedence over since",
+    ),
+]
+DbDepends = Annotated[AsyncSession, Depends(get_db_session)]
 
 
 def parse_timeframe(
@@ -58,49 +265,797 @@ def parse_timeframe(
         )
 
 
-@router.get("/dam")
-def read_dam_price_records(
+def parse_zones(zones: ZonesQueryParameter = None) -> list[str] | None:
+    if zones is None:
+        return None
+    try:
+        return convert_zones_query_param_to_price_field_names(zones)
+    except ValueError as e:
+        logger.error(f"Error while converting zones query params: {e}")
+        raise fastapi.HTTPException(
+            status_code=StarletteStatus.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+PriceFieldNamesDepends = Annotated[list[str] | None, Depends(parse_zones)]
+
+
+def parse_resample(resample: ResampleQueryParameter = None) -> int | None:
+    if resample is None:
+        return None
+    try:
+        return convert_resample_query_param_to_seconds(resample)
+    except ValueError as e:
+        logger.error(f"Error while converting resample query param: {e}")
+        raise fastapi.HTTPException(
+            status_code=StarletteStatus.HTTP_400_BAD_REQUEST,
+            detail=str(e),
+        )
+
+
+ResampleSecondsDepends = Annotated[int | None, Depends(parse_resample)]
+
+
+StreamedItem = typing.TypeVar("StreamedItem")
+
+
+async def _iter_and_close_session(
+    streamed_items: typing.AsyncIterator[StreamedItem],
+    db_session: AsyncSession,
+    description: str,
+) -> typing.AsyncIterator[StreamedItem]:
+    """
+    The response is streamed after the dependencies are torn down, so the
+    streamed rows own the session from then on and close it when done
+    """
+    try:
+        async for streamed_item in streamed_items:
+            yield streamed_item
+    except Exception as e:
+        logger.error(f"Error while streaming {description}: {e}")
+        raise
+    finally:
+        await db_session.close()
+
+
+async def _iter_day_block_json_objects(
+    market: Markets,
+    db_session: AsyncSession,
+    segments: list[DayBlockSegment],
+    field_names: list[str],
+) -> typing.AsyncIterator[bytes]:
+    """
+    Yields the stored day blocks as they are and serializes the rows of the
+    segments in between, which are queried from the price table
+    """
+    iterating_fn = MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP[market]
+    for segment in segments:
+        if segment.compressed_json is not None:
+            yield zlib.decompress(segment.compressed_json)
+            continue
+        segment_time_frame = TimeFrame(
+            start_datetime=convert_timestamp_to_indian_datetime(
+                segment.start_timestamp
+            ),
+            end_datetime=convert_timestamp_to_indian_datetime(segment.end_timestamp),
+        )
+        async for json_objects in aiter_price_rows_as_json_objects(
+            iterating_fn(db_session, segment_time_frame), field_names
+        ):
+            yield json_objects
+
+
+async def _aiter_list(price_rows: list[Row]) -> typing.AsyncIterator[Row]:
+    for price_row in price_rows:
+        yield price_row
+
+
+async def _cache_streamed_body(
+    body_chunks: typing.AsyncIterator[bytes],
+    cache_key: PriceCacheKey,
+    headers: dict[str, str],
+    generation: int,
+) -> typing.AsyncIterator[bytes]:
+    """
+    Passes the body chunks through and caches the whole body once it has been
+    streamed, unless it grows past the size limit of the cache entries
+    """
+    cached_chunks: list[bytes] | None = []
+    body_size = 0
+    async for chunk in body_chunks:
+        if cached_chunks is not None:
+            body_size += len(chunk)
+            if body_size > price_response_cache.max_entry_bytes:
+                cached_chunks = None
+            else:
+                cached_chunks.append(chunk)
+        yield chunk
+    if cached_chunks is not None:
+        price_response_cache.put(
+            cache_key, b"".join(cached_chunks), headers, generation
+        )
+
+
+async def _stream_price_records(
+    market: Markets,
+    db_session: AsyncSession,
+    time_frame: TimeFrame,
+    price_field_names: list[str] | None,
+    cursor: int | None,
+    limit: int | None,
+    if_none_match: str | None = None,
+    accept: str | None = None,
+    response_shape: ResponseShape = ResponseShape.ROWS,
+    accept_encoding: str | None = None,
+    resample_seconds: int | None = None,
+    aggregation: ResampleAggregation = ResampleAggregation.MEAN,
+) -> Response:
+    """
+    Streams the price records as a json array, or as an Arrow IPC stream or a
+    parquet file when the Accept header asks for them. A columnar shape
+    returns the json records as one array per zone. Without a limit the
+    whole time frame is streamed from a server side cursor. With a limit a
+    single page is returned and, when more records are left, the X-Next-Cursor
+    header holds the cursor of the next page. The rows are serialized straight
+    from the Core result tuples, without ORM instances or pydantic models.
+    Responses are served from and stored in the price response cache. The ETag comes
+    from the watermark of the trading days in the time frame, so a matching
+    If-None-Match is answered with a 304 before anything is serialized.
+    With resample_seconds the settlement periods are aggregated into
+    intervals in the database and only the prices of every interval are
+    returned, the cursor being the start of the last returned interval
+    """
+    response_format = get_price_response_format(accept)
+    cache_key = price_response_cache.make_key(
+        market,
+        time_frame,
+        price_field_names,
+        cursor,
+        limit,
+        response_format,
+        response_shape,
+        resample_seconds,
+        aggregation,
+    )
+    cached_response = price_response_cache.get(cache_key)
+    if cached_response is not None:
+        if etag_matches_if_none_match(if_none_match, cached_response.headers["ETag"]):
+            return Response(
+                status_code=StarletteStatus.HTTP_304_NOT_MODIFIED,
+                headers=cached_response.headers,
+            )
+        body = cached_response.body
+        headers = {**cached_response.headers, CACHE_STATUS_HEADER: "HIT"}
+        content_encoding = negotiate_content_encoding(accept_encoding)
+        if (
+            content_encoding is not None
+            and is_compressible_media_type(response_format.value)
+            and len(body) >= COMPRESSION_MIN_SIZE_BYTES
+        ):
+            # hot responses are compressed once per encoding, not per request
+            body = price_response_cache.get_compressed_body(
+                cache_key, cached_response, content_encoding
+            )
+            headers["Content-Encoding"] = content_encoding.value
+        return Response(
+            content=body,
+            media_type=response_format.value,
+            headers=headers,
+        )
+    generation = price_response_cache.get_generation(market)
+
+    start_timestamp = int(time_frame.start_datetime.timestamp())
+    end_timestamp = int(time_frame.end_datetime.timestamp())
+    try:
+        watermark = await MARKET_TO_ASYNC_DB_WATERMARK_GETTING_FN_MAP[market](
+            db_session,
+            get_trading_day_start_timestamp(start_timestamp),
+            get_trading_day_start_timestamp(end_timestamp),
+        )
+    except Exception as e:
+        logger.error(f"Error while fetching {market.name} price watermark: {e}")
+        raise fastapi.HTTPException(
+            status_code=StarletteStatus.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching {market.name} price records",
+        )
+    headers = {
+        "ETag": compute_price_etag(cache_key, watermark),
+        "Cache-Control": get_price_cache_control(time_frame),
+        "Vary": "Accept, Accept-Encoding",
+    }
+    if watermark.last_modified is not None:
+        headers["Last-Modified"] = format_last_modified(watermark.last_modified)
+    if etag_matches_if_none_match(if_none_match, headers["ETag"]):
+        return Response(
+            status_code=StarletteStatus.HTTP_304_NOT_MODIFIED, headers=headers
+        )
+
+    iterating_fn = MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP[market]
+    if resample_seconds is None:
+        field_names = [
+            column.name
+            for column in get_price_row_columns(
+                MARKETTYPE_TO_ORM_MAP[market], price_field_names
+            )
+        ]
+    else:
+        field_names = ["settlement_period_start_timestamp"] + [
+            column.name
+            for column in get_price_columns(
+                MARKETTYPE_TO_ORM_MAP[market], price_field_names
+            )
+        ]
+    full_day_starts = get_full_trading_day_starts(start_timestamp, end_timestamp)
+    read_timer = PriceReadTimer(market)
+    try:
+        if (
+            full_day_starts
+            and response_format == ResponseFormat.JSON
+            and response_shape == ResponseShape.ROWS
+            and price_field_names is None
+            and cursor is None
+            and limit is None
+            and resample_seconds is None
+        ):
+            # whole range requests are assembled from the stored day blocks
+            with read_timer.time_query():
+                compressed_json_by_day = (
+                    await MARKET_TO_ASYNC_DB_DAY_BLOCK_GETTING_FN_MAP[market](
+                        db_session, full_day_starts[0], full_day_starts[-1]
+                    )
+                )
+        else:
+            compressed_json_by_day = {}
+
+        if compressed_json_by_day:
+            body = aiter_json_array(
+                _iter_and_close_session(
+                    _iter_day_block_json_objects(
+                        market,
+                        db_session,
+                        plan_day_block_segments(
+                            start_timestamp, end_timestamp, compressed_json_by_day
+                        ),
+                        field_names,
+                    ),
+                    db_session,
+                    f"{market.name} price records",
+                )
+            )
+        else:
+            if limit is None:
+                price_rows = read_timer.aiter_rows(
+                    _iter_and_close_session(
+                        iterating_fn(
+                            db_session,
+                            time_frame,
+                            price_field_names,
+                            cursor,
+                            resample_seconds=resample_seconds,
+                            aggregation=aggregation,
+                        ),
+                        db_session,
+                        f"{market.name} price records",
+                    )
+                )
+            else:
+                page = [
+                    price_row
+                    async for price_row in read_timer.aiter_rows(
+                        iterating_fn(
+                            db_session,
+                            time_frame,
+                            price_field_names,
+                            cursor,
+                            limit + 1,
+                            resample_seconds,
+                            aggregation,
+                        )
+                    )
+                ]
+                if len(page) > limit:
+                    page = page[:limit]
+                    headers[NEXT_CURSOR_HEADER] = str(page[-1][0])
+                price_rows = _aiter_list(page)
+            if response_format != ResponseFormat.JSON:
+                body = aiter_price_rows_as_arrow(
+                    price_rows, field_names, response_format
+                )
+            elif response_shape == ResponseShape.COLUMNAR:
+                body = aiter_price_rows_as_columnar_json(
+                    price_rows,
+                    field_names,
+                    step_seconds=resample_seconds or MARKET_TIME_STEP_IN_SECONDS,
+                )
+            else:
+                body = aiter_price_rows_as_json_array(price_rows, field_names)
+    except Exception as e:
+        logger.error(f"Error while fetching {market.name} price records: {e}")
+        raise fastapi.HTTPException(
+            status_code=StarletteStatus.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error while fetching {market.name} price records",
+        )
+    return StreamingResponse(
+        _cache_streamed_body(
+            read_timer.aiter_body(body),
+            cache_key,
+            dict(headers),
+            generation,
+        ),
+        media_type=response_format.value,
+        headers={**headers, CACHE_STATUS_HEADER: "MISS"},
+    )
+
+
+@router.get("/dam", response_model=list[DAMPointInTimePriceData])
+async def read_dam_price_records(
+    time_frame: Annotated[TimeFrame, Depends(parse_timeframe)],
+    price_field_names: PriceFieldNamesDepends,
+    resample_seconds: ResampleSecondsDepends,
+    db_session: DbDepends,
+    cursor: CursorQueryParameter = None,
+    limit: PageSizeQueryParameter = None,
+    response_shape: ResponseShapeQueryParameter = ResponseShape.ROWS,
+    aggregation: AggregationQueryParameter = ResampleAggregation.MEAN,
+    if_none_match: IfNoneMatchHeader = None,
+    accept: AcceptHeader = None,
+    accept_encoding: AcceptEncodingHeader = None,
+) -> Response:
+    return await _stream_price_records(
+        Markets.DAM,
+        db_session,
+        time_frame,
+        price_field_names,
+        cursor,
+        limit,
+        if_none_match,
+        accept,
+        response_shape,
+        accept_encoding,
+        resample_seconds,
+        aggregation,
+    )
+
+
+@router.get("/rtm", response_model=list[RTMPointInTimePriceData])
+async def read_rtm_price_records(
+    time_frame: Annotated[TimeFrame, Depends(parse_timeframe)],
+    price_field_names: PriceFieldNamesDepends,
+    resample_seconds: ResampleSecondsDepends,
+    db_session: DbDepends,
+    cursor: CursorQueryParameter = None,
+    limit: PageSizeQueryParameter = None,
+    response_shape: ResponseShapeQueryParameter = ResponseShape.ROWS,
+    aggregation: AggregationQueryParameter = ResampleAggregation.MEAN,
+    if_none_match: IfNoneMatchHeader = None,
+    accept: AcceptHeader = None,
+    accept_encoding: AcceptEncodingHeader = None,
+) -> Response:
+    return await _stream_price_records(
+        Markets.RTM,
+        db_session,
+        time_frame,
+        price_field_names,
+        cursor,
+        limit,
+        if_none_match,
+        accept,
+        response_shape,
+        accept_encoding,
+        resample_seconds,
+        aggregation,
+    )
+
+
+@router.get("/{market}/aggregate")
+async def read_price_aggregates(
+    market: Markets,
+    granularity: Granularity,
     time_frame: Annotated[TimeFrame, Depends(parse_timeframe)],
+    price_field_names: PriceFieldNamesDepends,
     db_session: DbDepends,
-) -> list[DAMPointInTimePriceData]:
+) -> list[PriceAggregate]:
+    """
+    Returns the precomputed min/max/mean prices per zone of every hour, day
+    or month starting in the time frame
+    """
+    zones = (
+        None
+        if price_field_names is None
+        else [
+            zone
+            for zone, field_name in PRICE_COLUMN_TO_FIELD_NAME_MAP.items()
+            if field_name in price_field_names
+        ]
+    )
     try:
-        price_records = get_dam_price_records(db_session, time_frame)
-        return [
-            DAMPointInTimePriceData(
-                settlement_period_start_datetime=convert_timestamp_to_indian_datetime(
-                    price_record.settlement_period_start_timestamp
-                ),
-                **price_record.__dict__,
+        with PRICE_READ_PHASE_DURATION_SECONDS.time(market.value, "query"):
+            rollups = await MARKET_TO_ASYNC_DB_ROLLUP_GETTING_FN_MAP[market](
+                db_session, time_frame, granularity, zones
+            )
+        orm_to_pydantic_start_time = time.perf_counter()
+        zone_aggregates_by_bucket: dict[int, dict[str, ZonePriceAggregate]] = {}
+        for rollup in rollups:
+            zone_aggregates_by_bucket.setdefault(rollup.bucket_start_timestamp, {})[
+                rollup.zone
+            ] = ZonePriceAggregate(
+                num_intervals=rollup.num_intervals,
+                min_price_in_rs_per_mwh=rollup.min_price_in_rs_per_mwh,
+                max_price_in_rs_per_mwh=rollup.max_price_in_rs_per_mwh,
+                mean_price_in_rs_per_mwh=rollup.mean_price_in_rs_per_mwh,
+            )
+        bucket_start_datetimes = convert_timestamps_to_indian_datetimes(
+            zone_aggregates_by_bucket
+        )
+        price_aggregates = [
+            PriceAggregate(
+                bucket_start_datetime=bucket_start_datetime,
+                granularity=granularity.value,
+                zones=zone_aggregates,
+            )
+            for bucket_start_datetime, zone_aggregates in zip(
+                bucket_start_datetimes, zone_aggregates_by_bucket.values()
             )
-            for price_record in price_records
         ]
+        PRICE_READ_PHASE_DURATION_SECONDS.observe(
+            time.perf_counter() - orm_to_pydantic_start_time,
+            market.value,
+            "orm_to_pydantic",
+        )
+        PRICE_ROWS_PER_REQUEST.observe(len(rollups), market.value)
+        return price_aggregates
     except Exception as e:
-        logger.error(f"Error while fetching DAM price records: {e}")
+        logger.error(f"Error while fetching {market.name} price aggregates: {e}")
         raise fastapi.HTTPException(
             status_code=StarletteStatus.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error while fetching DAM price records",
+            detail=f"Error while fetching {market.name} price aggregates",
         )
 
 
-@router.get("/rtm")
-def read_rtm_price_records(
+@router.get("/{market}/export.{export_format}")
+async def export_price_records(
+    market: Markets,
+    export_format: ExportFormat,
     time_frame: Annotated[TimeFrame, Depends(parse_timeframe)],
+    price_field_names: PriceFieldNamesDepends,
     db_session: DbDepends,
-) -> list[RTMPointInTimePriceData]:
-    try:
-        price_records = get_rtm_price_records(db_session, time_frame)
-        return [
-            RTMPointInTimePriceData(
-                settlement_period_start_datetime=convert_timestamp_to_indian_datetime(
-                    price_record.settlement_period_start_timestamp
+    gzip_compressed: GzipQueryParameter = False,
+) -> StreamingResponse:
+    """
+    Streams the price records in the time frame as a csv or newline delimited
+    json file. The rows come from a server side cursor and are serialized
+    chunk by chunk, so the memory use does not grow with the time frame.
+    Exports bypass the price response cache
+    """
+    field_names = [
+        column.name
+        for column in get_price_row_columns(
+            MARKETTYPE_TO_ORM_MAP[market], price_field_names
+        )
+    ]
+    read_timer = PriceReadTimer(market)
+    body = read_timer.aiter_body(
+        EXPORT_FORMAT_TO_SERIALIZING_FN_MAP[export_format](
+            read_timer.aiter_rows(
+                _iter_and_close_session(
+                    MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP[market](
+                        db_session, time_frame, price_field_names
+                    ),
+                    db_session,
+                    f"{market.name} price records",
+                )
+            ),
+            field_names,
+        )
+    )
+    file_name = f"{market.value}_prices.{export_format.value}"
+    media_type = EXPORT_FORMAT_TO_MEDIA_TYPE_MAP[export_format]
+    if gzip_compressed:
+        body = aiter_gzip(body)
+        file_name += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+    )
+
+
+@router.get("/{market}/stream")
+async def stream_price_records(
+    market: Markets,
+    price_field_names: PriceFieldNamesDepends,
+    since: SinceQueryParameter = None,
+    last_event_id: LastEventIdHeader = None,
+) -> StreamingResponse:
+    """
+    Pushes the settlement periods of the market as server-sent events as soon
+    as they are written, by this or any other process. With since (or
+    Last-Event-ID) the stored settlement periods after it are sent first
+    """
+    if not price_stream_broker.is_running:
+        raise fastapi.HTTPException(
+            status_code=StarletteStatus.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"{market.name} price stream is not available",
+        )
+    db_price_model = MARKETTYPE_TO_ORM_MAP[market]
+    all_field_names = [column.name for column in get_price_row_columns(db_price_model)]
+    field_names = [
+        column.name
+        for column in get_price_row_columns(db_price_model, price_field_names)
+    ]
+    key_column_indexes = [
+        all_field_names.index(column.name)
+        for column in get_price_row_key_columns(db_price_model)
+    ]
+    after_key = None
+    after_timestamp = since
+    if last_event_id is not None:
+        try:
+            after_key = parse_price_event_id(last_event_id, len(key_column_indexes))
+        except ValueError as e:
+            logger.error(f"Error while parsing the Last-Event-ID header: {e}")
+            raise fastapi.HTTPException(
+                status_code=StarletteStatus.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid Last-Event-ID: {last_event_id}",
+            )
+        # the other rows of the settlement period may not have been received
+        after_timestamp = after_key[0] - 1
+    backfilled_price_rows = None
+    if after_timestamp is not None:
+        # the primary has every committed write, a replica may lag behind the
+        # notifications. DAM prices are published a day ahead
+        db_session = AsyncSession()
+        backfilled_price_rows = _iter_and_close_session(
+            MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP[market](
+                db_session,
+                TimeFrame(
+                    start_datetime=convert_timestamp_to_indian_datetime(
+                        after_timestamp
+                    ),
+                    end_datetime=datetime.datetime.now(MARKET_TZ)
+                    + datetime.timedelta(days=2),
                 ),
-                **price_record.__dict__,
+                after_timestamp=after_timestamp,
+            ),
+            db_session,
+            f"{market.name} price records",
+        )
+    return StreamingResponse(
+        aiter_price_events(
+            price_stream_broker,
+            market,
+            backfilled_price_rows,
+            field_names,
+            [all_field_names.index(field_name) for field_name in field_names],
+            key_column_indexes,
+            after_key,
+        ),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def refresh_latest_prices() -> None:
+    """
+    Reloads the latest price buffer of every market from the read replicas.
+    Run at startup and periodically, so writes made by other processes (Ex:
+    the scrapers) reach the buffer
+    """
+    async with AsyncReadSession() as db_session:
+        for market in Markets:
+            await MARKET_TO_ASYNC_DB_LATEST_REFRESHING_FN_MAP[market](db_session)
+
+
+@router.get("/{market}/latest")
+def read_latest_price_records(
+    market: Markets,
+    n: Annotated[
+        int,
+        Query(
+            ge=1,
+            le=LATEST_PRICE_BUFFER_SIZE,
+            description="Number of most recent settlement periods to return",
+        ),
+    ] = 1,
+) -> Response:
+    """
+    Returns the last n published settlement periods of the market from the
+    in-memory latest price buffer, without querying the database
+    """
+    json_array = latest_price_buffer.get_latest_json_array(market, n)
+    if json_array is None:
+        raise fastapi.HTTPException(
+            status_code=StarletteStatus.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Latest {market.name} prices are not loaded yet",
+        )
+    return Response(content=json_array, media_type="application/json")
+
+
+def _convert_price_batch_request_to_windows(
+    batch_request: PriceBatchRequest,
+) -> list[PriceBatchWindow]:
+    windows = []
+    for query in batch_request.queries:
+        try:
+            time_frame = convert_datetime_query_params_to_time_frame(
+                query.start_datetime, query.end_datetime
+            )
+            price_field_names = (
+                None
+                if query.zones is None
+                else convert_zones_query_param_to_price_field_names(query.zones)
+            )
+        except ValueError as e:
+            logger.error(f"Error while converting batch query {query.id}: {e}")
+            raise fastapi.HTTPException(
+                status_code=StarletteStatus.HTTP_400_BAD_REQUEST,
+                detail=f"Invalid query {query.id}: {e}",
+            )
+        windows.append(
+            PriceBatchWindow(
+                query_id=query.id,
+                market=query.market,
+                start_timestamp=int(time_frame.start_datetime.timestamp()),
+                end_timestamp=int(time_frame.end_datetime.timestamp()),
+                price_field_names=(
+                    None if price_field_names is None else tuple(price_field_names)
+                ),
+            )
+        )
+    return windows
+
+
+async def _iter_price_batch_json(
+    db_session: AsyncSession, merged_queries: list[MergedPriceQuery]
+) -> typing.AsyncIterator[bytes]:
+    """
+    Runs the merged queries one after the other on the session and yields
+    the records of every window as a member of a json object keyed by query
+    id, as soon as the rows of its merged query are fetched
+    """
+    separator = b"{"
+    for merged_query in merged_queries:
+        field_names = [
+            column.name
+            for column in get_price_row_columns(
+                MARKETTYPE_TO_ORM_MAP[merged_query.market],
+                merged_query.price_field_names,
             )
-            for price_record in price_records
         ]
+        price_rows = [
+            price_row
+            async for price_row in MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP[
+                merged_query.market
+            ](
+                db_session,
+                get_merged_query_time_frame(merged_query),
+                merged_query.price_field_names,
+            )
+        ]
+        for window, window_price_rows, window_field_names in split_merged_price_rows(
+            merged_query, price_rows, field_names
+        ):
+            yield (
+                separator
+                + orjson.dumps(window.query_id)
+                + b":["
+                + convert_price_rows_to_json_objects(
+                    window_price_rows, window_field_names
+                )
+                + b"]"
+            )
+            separator = b","
+    yield b"{}" if separator == b"{" else b"}"
+
+
+@router.post("/batch")
+async def read_price_records_batch(
+    batch_request: PriceBatchRequest,
+    db_session: DbDepends,
+) -> StreamingResponse:
+    """
+    Answers several price record queries, of both markets, with a single
+    session. The queries on the same market whose windows overlap or touch
+    are merged into one range query. Returns a json object with the records
+    of every query keyed by its id
+    """
+    merged_queries = merge_price_batch_windows(
+        _convert_price_batch_request_to_windows(batch_request)
+    )
+    return StreamingResponse(
+        _iter_and_close_session(
+            _iter_price_batch_json(db_session, merged_queries),
+            db_session,
+            "batch price records",
+        ),
+        media_type="application/json",
+    )
+
+
+async def _iter_price_spread_json(
+    summary_json: bytes, spread_json_array: typing.AsyncIterator[bytes]
+) -> typing.AsyncIterator[bytes]:
+    yield b'{"summary":' + summary_json + b',"spreads":'
+    async for chunk in spread_json_array:
+        yield chunk
+    yield b"}"
+
+
+@router.get("/spread")
+async def read_price_spreads(
+    time_frame: Annotated[TimeFrame, Depends(parse_timeframe)],
+    price_field_names: PriceFieldNamesDepends,
+    resample_seconds: ResampleSecondsDepends,
+    db_session: DbDepends,
+    aggregation: AggregationQueryParameter = ResampleAggregation.MEAN,
+    summary_only: Annotated[
+        bool,
+        Query(
+            alias="summary_only",
+            description="Whether to return only the summary, without the spreads",
+        ),
+    ] = False,
+) -> Response:
+    """
+    Compares the DAM and RTM prices of the settlement periods in the time
+    frame that have prices in both markets. Returns a json object with the
+    per zone summary of the RTM minus DAM spreads (count, count of positive
+    spreads, mean and largest absolute spread) and the spreads of every
+    settlement period, or of every interval when resampled. The markets are
+    joined and the spreads computed in the database
+    """
+    spread_field_names = ["settlement_period_start_timestamp"] + [
+        PRICE_FIELD_NAME_TO_SPREAD_FIELD_NAME_MAP[column.name]
+        for column in get_price_columns(
+            MARKETTYPE_TO_ORM_MAP[Markets.DAM], price_field_names
+        )
+    ]
+    try:
+        summary = await async_get_price_spread_summary(
+            db_session, time_frame, price_field_names
+        )
     except Exception as e:
-        logger.error(f"Error while fetching RTM price records: {e}")
+        logger.error(f"Error while fetching price spread summary: {e}")
         raise fastapi.HTTPException(
             status_code=StarletteStatus.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Error while fetching RTM price records",
+            detail="Error while fetching price spreads",
         )
+    summary_json = orjson.dumps(
+        {zone: zone_summary.model_dump() for zone, zone_summary in summary.items()}
+    )
+    if summary_only:
+        return Response(
+            content=b'{"summary":' + summary_json + b"}",
+            media_type="application/json",
+        )
+    return StreamingResponse(
+        _iter_price_spread_json(
+            summary_json,
+            aiter_price_rows_as_json_array(
+                _iter_and_close_session(
+                    async_iter_price_spread_rows(
+                        db_session,
+                        time_frame,
+                        price_field_names,
+                        resample_seconds,
+                        aggregation,
+                    ),
+                    db_session,
+                    "price spreads",
+                ),
+                spread_field_names,
+            ),
+        ),
+        media_type="application/json",
+    )
+
+
+@router.get("/cache/stats")
+def read_price_cache_stats() -> dict[str, int]:
+    """
+    Returns the size and the hit, miss, eviction, expiration and
+    invalidation counters of the price response cache
+    """
+    return price_response_cache.get_stats()
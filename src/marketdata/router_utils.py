@@ -1,7 +1,19 @@
 import datetime
+import email.utils
+import hashlib
+import re
 
-from src.common.constants import MARKET_TZ
+from src.common.config import HISTORICAL_PRICE_MAX_AGE_SECONDS
+from src.common.constants import (
+    ALL_PRICE_COLUMNS,
+    MARKET_TIME_DELTA,
+    MARKET_TZ,
+    PRICE_COLUMN_TO_FIELD_NAME_MAP,
+)
+from src.common.enums import ResponseFormat
 from src.common.models import TimeFrame
+from src.common.utils import parse_quality_values
+from src.marketdata.day_blocks import PriceWatermark, get_trading_day_start_timestamp
 
 
 def _convert_string_to_datetime(datetime_string: str) -> datetime.datetime:
@@ -16,3 +28,117 @@ def convert_datetime_query_params_to_time_frame(
     start_datetime = _convert_string_to_datetime(start_datetime_str)
     end_datetime = _convert_string_to_datetime(end_datetime_str)
     return TimeFrame(start_datetime=start_datetime, end_datetime=end_datetime)
+
+
+def convert_zones_query_param_to_price_field_names(
+    zones: list[str],
+) -> list[str]:
+    """
+    Converts the requested zones (Ex: ["N1", "MCP"] or ["n1,mcp"]) to the
+    names of their price fields. Raises a ValueError for unknown zones
+    """
+    requested_zones = [
+        zone.strip().upper() for zones_str in zones for zone in zones_str.split(",")
+    ]
+    unknown_zones = [zone for zone in requested_zones if zone not in ALL_PRICE_COLUMNS]
+    if unknown_zones:
+        raise ValueError(f"Unknown zones: {unknown_zones}")
+    return [
+        PRICE_COLUMN_TO_FIELD_NAME_MAP[zone]
+        for zone in ALL_PRICE_COLUMNS
+        if zone in requested_zones
+    ]
+
+
+RESAMPLE_UNIT_TO_SECONDS_MAP = {"m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+
+
+def convert_resample_query_param_to_seconds(resample: str) -> int:
+    """
+    Converts a resample interval (Ex: 30m, 4h or 1d) to seconds. The
+    interval must be a whole number of settlement periods that divides a day
+    or a whole number of days, so the buckets line up with the trading days.
+    Raises a ValueError otherwise
+    """
+    match = re.fullmatch(r"(\d+)([mhd])", resample.strip().lower())
+    if match is None:
+        raise ValueError(f"Invalid resample interval: {resample}")
+    resample_seconds = int(match[1]) * RESAMPLE_UNIT_TO_SECONDS_MAP[match[2]]
+    settlement_period_seconds = int(MARKET_TIME_DELTA.total_seconds())
+    day_seconds = RESAMPLE_UNIT_TO_SECONDS_MAP["d"]
+    if (
+        resample_seconds == 0
+        or resample_seconds % settlement_period_seconds
+        or (day_seconds % resample_seconds and resample_seconds % day_seconds)
+    ):
+        raise ValueError(
+            f"Resample interval {resample} must be a multiple of "
+            f"{settlement_period_seconds // 60}m that divides a day or a whole "
+            "number of days"
+        )
+    return resample_seconds
+
+
+def compute_price_etag(request_key: tuple, watermark: PriceWatermark) -> str:
+    """
+    Weak ETag of a price response, derived from what was requested and the
+    watermark of the trading days in the time frame
+    """
+    etag_source = repr((tuple(request_key), tuple(watermark))).encode()
+    return f'W/"{hashlib.sha256(etag_source).hexdigest()[:32]}"'
+
+
+def format_last_modified(last_modified: datetime.datetime) -> str:
+    return email.utils.format_datetime(
+        last_modified.astimezone(datetime.timezone.utc), usegmt=True
+    )
+
+
+def etag_matches_if_none_match(if_none_match: str | None, etag: str) -> bool:
+    """
+    Weak comparison of the ETag with the If-None-Match header, which can list
+    several ETags or be *
+    """
+    if if_none_match is None:
+        return False
+    requested_etags = [
+        requested_etag.strip().removeprefix("W/")
+        for requested_etag in if_none_match.split(",")
+    ]
+    return "*" in requested_etags or etag.removeprefix("W/") in requested_etags
+
+
+def get_price_cache_control(
+    time_frame: TimeFrame, now: datetime.datetime | None = None
+) -> str:
+    """
+    Windows that end before the current trading day are not expected to
+    change and may be cached for long, the others must be revalidated
+    """
+    now = now or datetime.datetime.now(MARKET_TZ)
+    current_trading_day_start_timestamp = get_trading_day_start_timestamp(
+        int(now.timestamp())
+    )
+    if time_frame.end_datetime.timestamp() < current_trading_day_start_timestamp:
+        return f"public, max-age={HISTORICAL_PRICE_MAX_AGE_SECONDS}"
+    return "no-cache"
+
+
+def get_price_response_format(accept: str | None) -> ResponseFormat:
+    """
+    Picks the response format from the Accept header by quality, falling
+    back to json when none of the listed media types is supported
+    """
+    if accept is None:
+        return ResponseFormat.JSON
+    accepted_media_types = [
+        (-quality, position, media_type)
+        for position, (media_type, quality) in enumerate(parse_quality_values(accept))
+    ]
+    supported_media_types = {
+        response_format.value: response_format for response_format in ResponseFormat
+    }
+    for negative_quality, _, media_type in sorted(accepted_media_types):
+        if negative_quality < 0 and media_type in supported_media_types:
+            return supported_media_types[media_type]
+    return ResponseFormat.JSON
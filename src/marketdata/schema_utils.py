@@ -1,7 +1,19 @@
 from __future__ import annotations
 
+import csv
+import io
+import itertools
+import typing
+import zlib
+
+import orjson
 import pandas as pd
 
+from src.common.constants import (
+    MARKET_TIME_STEP_IN_MINUTES,
+    PRICE_COLUMN_TO_FIELD_NAME_MAP,
+)
+from src.common.utils import convert_timestamps_to_indian_datetimes
 from src.marketdata.schemas import BasePointInTimePriceData
 
 
@@ -23,3 +35,268 @@ def convert_list_of_price_data_to_dataframe(
     price_data_df = pd.DataFrame.from_dict(price_data_dict, orient="index")
     price_data_df.sort_index(inplace=True)
     return price_data_df
+
+
+def iter_price_data_as_json_array(
+    price_data: typing.Iterable[BasePointInTimePriceData],
+    rows_per_chunk: int = 1000,
+) -> typing.Iterator[bytes]:
+    """
+    Serializes the price data to a json array incrementally, yielding
+    one chunk of bytes per rows_per_chunk rows. Fields that were never
+    set on the models (Ex: unrequested zones) are left out
+    """
+    price_data_iter = iter(price_data)
+    separator = b"["
+    while chunk := list(itertools.islice(price_data_iter, rows_per_chunk)):
+        yield separator + b",".join(
+            price_data_obj.model_dump_json(exclude_unset=True).encode()
+            for price_data_obj in chunk
+        )
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def _iter_price_row_dicts(
+    price_rows: typing.Sequence[typing.Sequence], field_names: list[str]
+) -> typing.Iterator[dict]:
+    """
+    Maps the rows to dicts keyed by field name, the first column of every
+    row being the settlement period start timestamp
+    """
+    value_field_names = field_names[1:]
+    settlement_period_start_datetimes = convert_timestamps_to_indian_datetimes(
+        price_row[0] for price_row in price_rows
+    )
+    for settlement_period_start_datetime, price_row in zip(
+        settlement_period_start_datetimes, price_rows
+    ):
+        yield {
+            "settlement_period_start_datetime": settlement_period_start_datetime,
+            **dict(zip(value_field_names, price_row[1:])),
+        }
+
+
+def convert_price_rows_to_json_objects(
+    price_rows: typing.Sequence[typing.Sequence], field_names: list[str]
+) -> bytes:
+    """
+    Serializes the rows to comma separated json objects, the first column of
+    every row being the settlement period start timestamp
+    """
+    return orjson.dumps(list(_iter_price_row_dicts(price_rows, field_names)))[1:-1]
+
+
+def convert_price_rows_to_ndjson(
+    price_rows: typing.Sequence[typing.Sequence], field_names: list[str]
+) -> bytes:
+    """
+    Serializes the rows to newline delimited json, one object per line
+    """
+    return b"".join(
+        orjson.dumps(price_row_dict, option=orjson.OPT_APPEND_NEWLINE)
+        for price_row_dict in _iter_price_row_dicts(price_rows, field_names)
+    )
+
+
+FIELD_NAME_TO_PRICE_COLUMN_MAP = {
+    field_name: price_column
+    for price_column, field_name in PRICE_COLUMN_TO_FIELD_NAME_MAP.items()
+}
+MARKET_TIME_STEP_IN_SECONDS = MARKET_TIME_STEP_IN_MINUTES * 60
+
+
+def convert_price_columns_to_columnar_json(
+    price_columns: typing.Sequence[typing.Sequence],
+    field_names: list[str],
+    step_seconds: int = MARKET_TIME_STEP_IN_SECONDS,
+) -> bytes:
+    """
+    Serializes the columns of the price rows to a single json object with
+    one array per zone (Ex: "MCP") and per other column (Ex: "session_id").
+    The settlement periods are given by start + i * step_seconds, unless the
+    series has gaps, in which case timestamps holds the unix timestamp of
+    every settlement period
+    """
+    timestamps = price_columns[0]
+    is_gap_free = all(
+        next_timestamp - timestamp == step_seconds
+        for timestamp, next_timestamp in zip(timestamps, timestamps[1:])
+    )
+    return orjson.dumps(
+        {
+            "start": timestamps[0] if timestamps else None,
+            "step_seconds": step_seconds,
+            "timestamps": None if is_gap_free else timestamps,
+            "columns": {
+                FIELD_NAME_TO_PRICE_COLUMN_MAP.get(field_name, field_name): values
+                for field_name, values in zip(field_names[1:], price_columns[1:])
+            },
+        }
+    )
+
+
+def convert_price_rows_to_columnar_json(
+    price_rows: typing.Sequence[typing.Sequence],
+    field_names: list[str],
+    step_seconds: int = MARKET_TIME_STEP_IN_SECONDS,
+) -> bytes:
+    price_columns = [list(values) for values in zip(*price_rows)] or [
+        [] for _ in field_names
+    ]
+    return convert_price_columns_to_columnar_json(
+        price_columns, field_names, step_seconds
+    )
+
+
+def get_price_csv_header(field_names: list[str]) -> bytes:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(["settlement_period_start_datetime", *field_names[1:]])
+    return buffer.getvalue().encode()
+
+
+def convert_price_rows_to_csv(
+    price_rows: typing.Sequence[typing.Sequence], field_names: list[str]
+) -> bytes:
+    """
+    Serializes the rows to csv lines in the column order of field_names, with
+    the settlement period start as an ISO datetime and nulls as empty values
+    """
+    buffer = io.StringIO()
+    settlement_period_start_datetimes = convert_timestamps_to_indian_datetimes(
+        price_row[0] for price_row in price_rows
+    )
+    csv.writer(buffer).writerows(
+        (settlement_period_start_datetime.isoformat(), *price_row[1:])
+        for settlement_period_start_datetime, price_row in zip(
+            settlement_period_start_datetimes, price_rows
+        )
+    )
+    return buffer.getvalue().encode()
+
+
+def iter_price_rows_as_json_array(
+    price_rows: typing.Iterable[typing.Sequence],
+    field_names: list[str],
+    rows_per_chunk: int = 1000,
+) -> typing.Iterator[bytes]:
+    """
+    Serializes plain price row tuples straight to a json array with the same
+    objects as iter_price_data_as_json_array, without building pydantic models
+    """
+    price_rows_iter = iter(price_rows)
+    separator = b"["
+    while chunk := list(itertools.islice(price_rows_iter, rows_per_chunk)):
+        yield separator + convert_price_rows_to_json_objects(chunk, field_names)
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+async def _aiter_chunks(
+    price_rows: typing.AsyncIterable[typing.Sequence], rows_per_chunk: int
+) -> typing.AsyncIterator[list[typing.Sequence]]:
+    chunk = []
+    async for price_row in price_rows:
+        chunk.append(price_row)
+        if len(chunk) == rows_per_chunk:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+async def aiter_price_rows_as_json_objects(
+    price_rows: typing.AsyncIterable[typing.Sequence],
+    field_names: list[str],
+    rows_per_chunk: int = 1000,
+) -> typing.AsyncIterator[bytes]:
+    """
+    Serializes the rows streamed from an async session to runs of comma
+    separated json objects, rows_per_chunk rows at a time
+    """
+    async for chunk in _aiter_chunks(price_rows, rows_per_chunk):
+        yield convert_price_rows_to_json_objects(chunk, field_names)
+
+
+async def aiter_json_array(
+    json_object_runs: typing.AsyncIterable[bytes],
+) -> typing.AsyncIterator[bytes]:
+    """
+    Joins runs of comma separated json objects into a json array
+    """
+    separator = b"["
+    async for json_object_run in json_object_runs:
+        if json_object_run:
+            yield separator + json_object_run
+            separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def aiter_price_rows_as_json_array(
+    price_rows: typing.AsyncIterable[typing.Sequence],
+    field_names: list[str],
+    rows_per_chunk: int = 1000,
+) -> typing.AsyncIterator[bytes]:
+    """
+    Async counterpart of iter_price_rows_as_json_array, for rows streamed
+    from an async session
+    """
+    return aiter_json_array(
+        aiter_price_rows_as_json_objects(price_rows, field_names, rows_per_chunk)
+    )
+
+
+async def aiter_price_rows_as_columnar_json(
+    price_rows: typing.AsyncIterable[typing.Sequence],
+    field_names: list[str],
+    rows_per_chunk: int = 1000,
+    step_seconds: int = MARKET_TIME_STEP_IN_SECONDS,
+) -> typing.AsyncIterator[bytes]:
+    """
+    Collects the rows into columns chunk by chunk and yields the columnar
+    json object once all of them are fetched
+    """
+    price_columns: list[list] = [[] for _ in field_names]
+    async for chunk in _aiter_chunks(price_rows, rows_per_chunk):
+        for price_column, values in zip(price_columns, zip(*chunk)):
+            price_column.extend(values)
+    yield convert_price_columns_to_columnar_json(
+        price_columns, field_names, step_seconds
+    )
+
+
+async def aiter_price_rows_as_ndjson(
+    price_rows: typing.AsyncIterable[typing.Sequence],
+    field_names: list[str],
+    rows_per_chunk: int = 1000,
+) -> typing.AsyncIterator[bytes]:
+    async for chunk in _aiter_chunks(price_rows, rows_per_chunk):
+        yield convert_price_rows_to_ndjson(chunk, field_names)
+
+
+async def aiter_price_rows_as_csv(
+    price_rows: typing.AsyncIterable[typing.Sequence],
+    field_names: list[str],
+    rows_per_chunk: int = 1000,
+) -> typing.AsyncIterator[bytes]:
+    """
+    Serializes the rows to csv, yielding the header line before the first
+    row is fetched
+    """
+    yield get_price_csv_header(field_names)
+    async for chunk in _aiter_chunks(price_rows, rows_per_chunk):
+        yield convert_price_rows_to_csv(chunk, field_names)
+
+
+async def aiter_gzip(
+    chunks: typing.AsyncIterable[bytes], compresslevel: int = 6
+) -> typing.AsyncIterator[bytes]:
+    """
+    Compresses the chunks into a gzip stream. Every chunk is sync flushed, so
+    the client can decompress what it has received without waiting for the
+    end of the stream
+    """
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    async for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
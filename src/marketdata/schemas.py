@@ -3,7 +3,7 @@ from __future__ import annotations
 import abc
 import datetime
 
-from pydantic import BaseModel, ConfigDict, field_serializer
+from pydantic import BaseModel, ConfigDict, Field, field_serializer, field_validator
 
 from src.common.enums import Markets
 
@@ -57,6 +57,86 @@ class RTMPointInTimePriceData(BasePointInTimePriceData):
     session_id: str | None = None
 
 
+class ZonePriceAggregate(BaseModel):
+    """
+    Price statistics of a single zone over an hour, day or month.
+    Every settlement period has the same length, so the mean
+    is also the time weighted average price
+    """
+
+    model_config = ConfigDict(frozen=True)
+    num_intervals: int
+    min_price_in_rs_per_mwh: float | None = None
+    max_price_in_rs_per_mwh: float | None = None
+    mean_price_in_rs_per_mwh: float | None = None
+
+
+class PriceAggregate(BaseModel):
+    """
+    A class that describes the price statistics of all the requested
+    zones for the bucket starting at bucket_start_datetime
+    """
+
+    model_config = ConfigDict(frozen=True)
+    bucket_start_datetime: datetime.datetime
+    granularity: str
+    zones: dict[str, ZonePriceAggregate]
+
+    @field_serializer("bucket_start_datetime")
+    def serialize_bucket_start_datetime(self, value):
+        return value.isoformat()
+
+
+class ZonePriceSpreadSummary(BaseModel):
+    """
+    Statistics of the RTM minus DAM price spread of a single zone over the
+    settlement periods that have prices in both markets
+    """
+
+    model_config = ConfigDict(frozen=True)
+    num_intervals: int
+    num_positive_intervals: int
+    mean_spread_in_rs_per_mwh: float | None = None
+    max_abs_spread_in_rs_per_mwh: float | None = None
+
+
+MAX_PRICE_BATCH_QUERIES = 100
+
+
+class PriceBatchQuery(BaseModel):
+    """
+    One query of a batch request. The datetimes use the format of the
+    start_datetime and end_datetime query parameters and zones defaults to
+    all of them
+    """
+
+    model_config = ConfigDict(frozen=True)
+    id: str
+    market: Markets
+    start_datetime: str = Field(examples=["2022-01-01 00:00:00"])
+    end_datetime: str = Field(examples=["2022-01-01 23:45:00"])
+    zones: list[str] | None = None
+
+
+class PriceBatchRequest(BaseModel):
+    """
+    Price record queries that are answered together, keyed by their id
+    """
+
+    model_config = ConfigDict(frozen=True)
+    queries: list[PriceBatchQuery] = Field(
+        min_length=1, max_length=MAX_PRICE_BATCH_QUERIES
+    )
+
+    @field_validator("queries")
+    @classmethod
+    def validate_unique_query_ids(cls, queries):
+        query_ids = [query.id for query in queries]
+        if len(set(query_ids)) != len(query_ids):
+            raise ValueError("query ids should be unique")
+        return queries
+
+
 MARKETTYPE_TO_PRICE_PYD_MODEL_MAP = {
     Markets.DAM: DAMPointInTimePriceData,
     Markets.RTM: RTMPointInTimePriceData,
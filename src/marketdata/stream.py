@@ -0,0 +1,385 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import typing
+
+import sqlalchemy
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.common import logging_utils
+from src.common.config import (
+    PRICE_STREAM_KEEPALIVE_SECONDS,
+    PRICE_STREAM_MAX_QUEUED_BATCHES,
+    PRICE_STREAM_RECONNECT_MAX_SECONDS,
+)
+from src.common.enums import Markets
+from src.common.models import TimeFrame
+from src.common.utils import convert_timestamp_to_indian_datetime
+from src.database import AsyncSession, async_engine
+from src.marketdata.cache import price_response_cache
+from src.marketdata.crud import (
+    MARKET_TO_ASYNC_DB_LATEST_REFRESHING_FN_MAP,
+    MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP,
+    PRICE_WRITE_CHANNEL,
+)
+from src.marketdata.latest import latest_price_buffer
+from src.marketdata.schema_utils import convert_price_rows_to_json_objects
+
+logger = logging_utils.create_logger(__name__)
+
+
+class PriceWriteNotification(typing.NamedTuple):
+    market: Markets
+    start_timestamp: int
+    end_timestamp: int
+
+
+def parse_price_write_notification(payload: str) -> PriceWriteNotification:
+    market_value, start_timestamp, end_timestamp = payload.split(":")
+    return PriceWriteNotification(
+        Markets(market_value), int(start_timestamp), int(end_timestamp)
+    )
+
+
+class PriceSubscription:
+    """
+    Queue of the batches of price rows published for one stream. A
+    subscriber that falls behind by more than max_queued_batches is marked
+    as overflowed and stops receiving batches
+    """
+
+    def __init__(self, market: Markets, max_queued_batches: int):
+        self.market = market
+        self.queue: asyncio.Queue[list[sqlalchemy.Row]] = asyncio.Queue(
+            maxsize=max_queued_batches
+        )
+        self.overflowed = False
+
+
+class PriceStreamBroker:
+    """
+    Fans the price rows written by any process out to the stream
+    subscribers. The writes announce themselves on PRICE_WRITE_CHANNEL, the
+    broker listens on a dedicated connection to the primary, invalidates the
+    cached responses and the latest prices of every written range and
+    fetches it once for all the subscribers of the market. A dropped or
+    failed connection is retried with exponential backoff
+    """
+
+    def __init__(
+        self,
+        session_factory: typing.Callable[[], typing.Any] = AsyncSession,
+        max_queued_batches: int = PRICE_STREAM_MAX_QUEUED_BATCHES,
+        health_check_seconds: float = PRICE_STREAM_KEEPALIVE_SECONDS,
+        reconnect_min_seconds: float = 1,
+        reconnect_max_seconds: float = PRICE_STREAM_RECONNECT_MAX_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.max_queued_batches = max_queued_batches
+        self.health_check_seconds = health_check_seconds
+        self.reconnect_min_seconds = reconnect_min_seconds
+        self.reconnect_max_seconds = reconnect_max_seconds
+        self._subscriptions: dict[Markets, set[PriceSubscription]] = {
+            market: set() for market in Markets
+        }
+        self._listen_connection: AsyncConnection | None = None
+        self._connection_lost: asyncio.Event | None = None
+        self._listen_task: asyncio.Task | None = None
+        # notifications are fetched and published one at a time, in order
+        self._publish_lock = asyncio.Lock()
+        self._publish_tasks: set[asyncio.Task] = set()
+
+    @property
+    def is_running(self) -> bool:
+        return self._listen_connection is not None
+
+    async def start(self, engine: AsyncEngine = async_engine) -> None:
+        """
+        Connects and keeps the connection up in the background, a failed
+        first connection is retried like a dropped one
+        """
+        if self._listen_task is not None:
+            return
+        self._connection_lost = asyncio.Event()
+        await self._connect(engine)
+        self._listen_task = asyncio.get_running_loop().create_task(
+            self._keep_listening(engine)
+        )
+
+    async def stop(self) -> None:
+        if self._listen_task is not None:
+            self._listen_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listen_task
+            self._listen_task = None
+        for publish_task in list(self._publish_tasks):
+            publish_task.cancel()
+        await self._close_listen_connection()
+
+    async def _connect(self, engine: AsyncEngine) -> bool:
+        self._connection_lost.clear()
+        try:
+            listen_connection = await engine.connect()
+        except Exception as e:
+            logger.error(f"Error while connecting to listen for price writes: {e}")
+            return False
+        try:
+            raw_connection = await listen_connection.get_raw_connection()
+            driver_connection = raw_connection.driver_connection
+            driver_connection.add_termination_listener(self._on_termination)
+            await driver_connection.add_listener(
+                PRICE_WRITE_CHANNEL, self._on_notification
+            )
+        except Exception as e:
+            logger.error(f"Error while listening on {PRICE_WRITE_CHANNEL}: {e}")
+            with contextlib.suppress(Exception):
+                await listen_connection.close()
+            return False
+        self._listen_connection = listen_connection
+        logger.info(f"Listening for price writes on {PRICE_WRITE_CHANNEL}")
+        return True
+
+    async def _keep_listening(self, engine: AsyncEngine) -> None:
+        reconnect_seconds = self.reconnect_min_seconds
+        while True:
+            if self._listen_connection is None:
+                await asyncio.sleep(reconnect_seconds)
+                reconnect_seconds = min(
+                    reconnect_seconds * 2, self.reconnect_max_seconds
+                )
+                if await self._connect(engine):
+                    # the writes made while disconnected were not notified
+                    for market in Markets:
+                        price_response_cache.invalidate_market(market)
+                continue
+            reconnect_seconds = self.reconnect_min_seconds
+            if await self._is_connection_alive():
+                continue
+            logger.error(
+                f"Lost the connection listening on {PRICE_WRITE_CHANNEL}, "
+                "reconnecting"
+            )
+            await self._close_listen_connection()
+            self._end_subscriptions()
+
+    async def _is_connection_alive(self) -> bool:
+        """
+        Waits up to health_check_seconds for the connection to terminate,
+        then pings it to catch connections dropped without notice
+        """
+        try:
+            await asyncio.wait_for(
+                self._connection_lost.wait(), self.health_check_seconds
+            )
+            return False
+        except asyncio.TimeoutError:
+            pass
+        try:
+            raw_connection = await self._listen_connection.get_raw_connection()
+            await asyncio.wait_for(
+                raw_connection.driver_connection.execute("SELECT 1"),
+                self.health_check_seconds,
+            )
+        except Exception:
+            return False
+        return True
+
+    async def _close_listen_connection(self) -> None:
+        if self._listen_connection is None:
+            return
+        listen_connection, self._listen_connection = self._listen_connection, None
+        try:
+            await listen_connection.close()
+        except Exception as e:
+            logger.debug(f"Error while closing the listen connection: {e}")
+
+    def _end_subscriptions(self) -> None:
+        """
+        Ends the streams, whose clients reconnect and resume from the database
+        with their Last-Event-ID instead of missing the writes made while the
+        broker was disconnected
+        """
+        for market_subscriptions in self._subscriptions.values():
+            for subscription in list(market_subscriptions):
+                subscription.overflowed = True
+                with contextlib.suppress(asyncio.QueueFull):
+                    subscription.queue.put_nowait([])
+            market_subscriptions.clear()
+
+    def subscribe(self, market: Markets) -> PriceSubscription:
+        subscription = PriceSubscription(market, self.max_queued_batches)
+        self._subscriptions[market].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: PriceSubscription) -> None:
+        self._subscriptions[subscription.market].discard(subscription)
+
+    def publish(self, market: Markets, price_rows: list[sqlalchemy.Row]) -> None:
+        for subscription in list(self._subscriptions[market]):
+            try:
+                subscription.queue.put_nowait(price_rows)
+            except asyncio.QueueFull:
+                subscription.overflowed = True
+                self.unsubscribe(subscription)
+
+    def _on_termination(self, connection) -> None:
+        if self._connection_lost is not None:
+            self._connection_lost.set()
+
+    def _on_notification(self, connection, pid, channel, payload: str) -> None:
+        try:
+            notification = parse_price_write_notification(payload)
+        except ValueError:
+            logger.error(f"Invalid price write notification: {payload}")
+            return
+        # writes of other processes (Ex: the scrapers) only reach this process
+        # through the notification
+        price_response_cache.invalidate(
+            notification.market,
+            notification.start_timestamp,
+            notification.end_timestamp,
+        )
+        refresh_latest_prices = latest_price_buffer.is_stale_after_write(
+            notification.market, notification.end_timestamp
+        )
+        if not refresh_latest_prices and not self._subscriptions[notification.market]:
+            return
+        publish_task = asyncio.get_running_loop().create_task(
+            self._fetch_and_publish(notification, refresh_latest_prices)
+        )
+        self._publish_tasks.add(publish_task)
+        publish_task.add_done_callback(self._publish_tasks.discard)
+
+    async def _fetch_and_publish(
+        self, notification: PriceWriteNotification, refresh_latest_prices: bool
+    ) -> None:
+        async with self._publish_lock:
+            try:
+                async with self.session_factory() as db_session:
+                    if refresh_latest_prices:
+                        await MARKET_TO_ASYNC_DB_LATEST_REFRESHING_FN_MAP[
+                            notification.market
+                        ](db_session)
+                    if not self._subscriptions[notification.market]:
+                        return
+                    price_rows = [
+                        price_row
+                        async for price_row in MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP[
+                            notification.market
+                        ](
+                            db_session,
+                            TimeFrame(
+                                start_datetime=convert_timestamp_to_indian_datetime(
+                                    notification.start_timestamp
+                                ),
+                                end_datetime=convert_timestamp_to_indian_datetime(
+                                    notification.end_timestamp
+                                ),
+                            ),
+                        )
+                    ]
+            except Exception as e:
+                logger.error(
+                    f"Error while fetching written {notification.market.name} "
+                    f"price records: {e}"
+                )
+                return
+            self.publish(notification.market, price_rows)
+
+
+def format_price_event_id(price_row_key: typing.Sequence) -> bytes:
+    return b":".join(
+        b"" if key_value is None else str(key_value).encode()
+        for key_value in price_row_key
+    )
+
+
+def parse_price_event_id(event_id: str, num_key_columns: int) -> tuple:
+    """
+    Key of the price row of an event id, Ex: (900, "S1") for "900:S1". An
+    empty value is a NULL key column
+    """
+    timestamp, *other_key_values = event_id.split(":", num_key_columns - 1)
+    if len(other_key_values) != num_key_columns - 1:
+        raise ValueError(f"Invalid price event id: {event_id}")
+    return (int(timestamp), *[key_value or None for key_value in other_key_values])
+
+
+def format_price_event(
+    price_row: typing.Sequence,
+    field_names: list[str],
+    column_indexes: list[int],
+    key_column_indexes: typing.Sequence[int] = (0,),
+) -> bytes:
+    """
+    Server-sent event of a price row, with the key of the row (the settlement
+    period start timestamp and, for RTM, the session id) as event id so
+    clients can resume after it
+    """
+    json_object = convert_price_rows_to_json_objects(
+        [[price_row[column_index] for column_index in column_indexes]], field_names
+    )
+    event_id = format_price_event_id(
+        [price_row[column_index] for column_index in key_column_indexes]
+    )
+    return b"id: %s\nevent: price\ndata: %s\n\n" % (event_id, json_object)
+
+
+async def aiter_price_events(
+    broker: PriceStreamBroker,
+    market: Markets,
+    backfilled_price_rows: typing.AsyncIterable[typing.Sequence] | None,
+    field_names: list[str],
+    column_indexes: list[int],
+    key_column_indexes: typing.Sequence[int] = (0,),
+    after_key: tuple | None = None,
+    keepalive_seconds: float = PRICE_STREAM_KEEPALIVE_SECONDS,
+) -> typing.AsyncIterator[bytes]:
+    """
+    Server-sent events of the backfilled rows, but the one keyed after_key,
+    followed by the rows published to the market. The broker publishes every
+    row of the written ranges, so a published row is only sent when no row
+    with its key was sent yet or its values changed: new sessions of a sent
+    settlement period and gap-fills of older ones are sent, unchanged rows
+    are not. Rows received before a reconnection are sent again when a
+    write re-reads them. Ends when the subscriber overflows, so the client
+    reconnects and resumes from the database with its Last-Event-ID
+    """
+    # subscribed before the backfill so no write falls in between
+    subscription = broker.subscribe(market)
+    sent_price_rows: dict[tuple, tuple] = {}
+    try:
+        if backfilled_price_rows is not None:
+            async for price_row in backfilled_price_rows:
+                price_row_key = tuple(
+                    price_row[column_index] for column_index in key_column_indexes
+                )
+                if price_row_key == after_key:
+                    continue
+                yield format_price_event(
+                    price_row, field_names, column_indexes, key_column_indexes
+                )
+                sent_price_rows[price_row_key] = tuple(price_row)
+        while not subscription.overflowed:
+            try:
+                price_rows = await asyncio.wait_for(
+                    subscription.queue.get(), keepalive_seconds
+                )
+            except asyncio.TimeoutError:
+                yield b": keepalive\n\n"
+                continue
+            for price_row in price_rows:
+                price_row_key = tuple(
+                    price_row[column_index] for column_index in key_column_indexes
+                )
+                if sent_price_rows.get(price_row_key) != tuple(price_row):
+                    yield format_price_event(
+                        price_row, field_names, column_indexes, key_column_indexes
+                    )
+                    sent_price_rows[price_row_key] = tuple(price_row)
+    finally:
+        broker.unsubscribe(subscription)
+
+
+price_stream_broker = PriceStreamBroker()
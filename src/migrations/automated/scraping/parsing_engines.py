@@ -7,6 +7,7 @@ import bs4
 
 from src.common import logging_utils
 from src.common.constants import MARKET_TZ, NUM_TIME_STEPS_IN_HOUR
+from src.common.metrics import SCRAPER_PHASE_DURATION_SECONDS
 from src.marketdata.schemas import (
     BasePointInTimePriceData,
     DAMPointInTimePriceData,
@@ -170,17 +171,20 @@ class BaseHtmlParsingEngine(abc.ABC):
     def parse_doc_to_price_data(
         cls, html_content: str
     ) -> list[BasePointInTimePriceData]:
-        page_soup = bs4.BeautifulSoup(html_content, "html.parser")
-        price_table: bs4.element.Tag = cls._get_price_table_from_page(page_soup)
-        trading_day_beginning_datetime = (
-            cls._get_trading_day_start_datetime_from_price_table(
+        with SCRAPER_PHASE_DURATION_SECONDS.time(cls.__name__, "soup"):
+            page_soup = bs4.BeautifulSoup(html_content, "html.parser")
+        with SCRAPER_PHASE_DURATION_SECONDS.time(cls.__name__, "price_table"):
+            price_table: bs4.element.Tag = cls._get_price_table_from_page(page_soup)
+        with SCRAPER_PHASE_DURATION_SECONDS.time(cls.__name__, "rows"):
+            trading_day_beginning_datetime = (
+                cls._get_trading_day_start_datetime_from_price_table(
+                    price_table,
+                )
+            )
+            price_data = cls._parse_all_rows_from_price_table(
                 price_table,
+                trading_day_beginning_datetime,
             )
-        )
-        price_data = cls._parse_all_rows_from_price_table(
-            price_table,
-            trading_day_beginning_datetime,
-        )
         return price_data
 
 
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
 import datetime
+import json
 import logging
+import time
 
 from selenium.webdriver.common.by import By
 from selenium.webdriver.remote.webdriver import WebDriver as RemoteWebDriver
@@ -9,6 +11,8 @@ from selenium.webdriver.remote.webelement import WebElement
 from selenium.webdriver.support.wait import WebDriverWait
 
 from src.common import logging_utils
+from src.common.config import SCRAPER_METRICS_TEXTFILE_PATH
+from src.common.metrics import SCRAPER_PHASE_DURATION_SECONDS, write_textfile
 from src.common.models import TimeFrame
 from src.marketdata.schemas import BasePointInTimePriceData
 from src.migrations.automated.scraping.parsing_engines import BaseHtmlParsingEngine
@@ -160,6 +164,9 @@ class PriceDataDownloaderBot:
         4. Download the data_archived for the new dates
         """
         price_data = []
+        phase_counts_and_sums_before = (
+            SCRAPER_PHASE_DURATION_SECONDS.get_counts_and_sums()
+        )
         try:
             delivery_period_dropdown = (
                 self._extract_delivery_period_dropdown_from_driver()
@@ -168,7 +175,9 @@ class PriceDataDownloaderBot:
                 delivery_period_dropdown,
             )
 
+            engine_name = type(self._parsing_engine).__name__
             while download_window.start_datetime <= download_window.end_datetime:
+                render_start_time = time.perf_counter()
                 self._render_page_with_new_dates(
                     download_window.start_datetime,
                     download_window.start_datetime
@@ -178,6 +187,9 @@ class PriceDataDownloaderBot:
                 )
                 try:
                     self._wait_for_table_to_load()
+                    SCRAPER_PHASE_DURATION_SECONDS.observe(
+                        time.perf_counter() - render_start_time, engine_name, "render"
+                    )
                 except TimeoutError:
                     logger.error(
                         "Timeout error occurred while waiting for the "
@@ -204,4 +216,36 @@ class PriceDataDownloaderBot:
             )
         finally:
             self._driver.close()
+            self._report_phase_timings(phase_counts_and_sums_before)
         return price_data
+
+    @staticmethod
+    def _report_phase_timings(
+        phase_counts_and_sums_before: dict[tuple, tuple[int, float]]
+    ) -> None:
+        """
+        Logs the render and parsing phase timings of the run as a single
+        structured line and, when SCRAPER_METRICS_TEXTFILE_PATH is set,
+        writes the phase histograms for the node exporter textfile collector,
+        since the scraper process serves no /metrics endpoint
+        """
+        phase_timings = {}
+        phase_counts_and_sums = SCRAPER_PHASE_DURATION_SECONDS.get_counts_and_sums()
+        for label_values, (count, seconds) in phase_counts_and_sums.items():
+            count_before, seconds_before = phase_counts_and_sums_before.get(
+                label_values, (0, 0.0)
+            )
+            if count > count_before:
+                engine_name, phase = label_values
+                phase_timings[f"{engine_name}.{phase}"] = {
+                    "count": count - count_before,
+                    "seconds": round(seconds - seconds_before, 6),
+                }
+        logger.info(f"Scraper phase timings: {json.dumps(phase_timings)}")
+        if SCRAPER_METRICS_TEXTFILE_PATH:
+            try:
+                write_textfile(
+                    SCRAPER_METRICS_TEXTFILE_PATH, [SCRAPER_PHASE_DURATION_SECONDS]
+                )
+            except OSError as e:
+                logger.error(f"Error while writing the scraper metrics: {e}")
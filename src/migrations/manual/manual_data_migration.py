@@ -1,14 +1,20 @@
 import datetime
+import itertools
 import json
+import time
+import typing
 
 import click
 from dateutil import parser
 
 from src.common import logging_utils
 from src.common.constants import MARKET_TZ
-from src.common.enums import Markets
+from src.common.enums import ConflictResolution, Markets
 from src.database import Session
-from src.marketdata.crud import MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP
+from src.marketdata.crud import (
+    MARKET_TO_DB_COPYING_FN_MAP,
+    MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP,
+)
 from src.marketdata.schemas import (
     MARKETTYPE_TO_PRICE_PYD_MODEL_MAP,
     BasePointInTimePriceData,
@@ -16,13 +22,114 @@ from src.marketdata.schemas import (
 
 session = Session()
 
+DEFAULT_CHUNK_ROWS = 10000
+JSON_ARRAY_SEPARATORS = " \t\n\r,"
+JSON_READ_BLOCK_CHARS = 1024 * 1024
+MAX_JSON_ESCAPE_CHARS = len("\\u0000")
+
 logger = logging_utils.create_logger(__name__)
 
 
-def _load_price_data_from_json(json_path: str) -> list[dict]:
+def _find_escape_free_end(raw_json_string: str) -> int:
+    """
+    Position the undecoded characters of a json string can be cut at without
+    splitting an escape sequence, which can only start at the last backslash
+    """
+    backslash_position = raw_json_string.rfind(
+        "\\", max(0, len(raw_json_string) - MAX_JSON_ESCAPE_CHARS + 1)
+    )
+    if backslash_position == -1:
+        return len(raw_json_string)
+    run_start = backslash_position
+    while run_start > 0 and raw_json_string[run_start - 1] == "\\":
+        run_start -= 1
+    if (backslash_position - run_start) % 2 == 1:
+        # an even run of backslashes is made of escaped backslashes
+        return len(raw_json_string)
+    escape_chars = (
+        MAX_JSON_ESCAPE_CHARS
+        if raw_json_string.startswith("u", backslash_position + 1)
+        else 2
+    )
+    if len(raw_json_string) - backslash_position < escape_chars:
+        return backslash_position
+    return len(raw_json_string)
+
+
+def _iter_json_string_blocks(
+    json_file: typing.TextIO, block_chars: int
+) -> typing.Iterator[str]:
+    """
+    Yields the decoded characters of the json string held by the file, a
+    block at a time. Every block is cut before an escape sequence it only
+    holds part of, which is decoded with the next block
+    """
+    raw_block = ""
+    while not raw_block:
+        next_raw_block = json_file.read(block_chars)
+        if not next_raw_block:
+            raise ValueError("The price json is empty")
+        raw_block = next_raw_block.lstrip()
+    if not raw_block.startswith('"'):
+        raise ValueError("The price json does not hold a json encoded string")
+    raw_block = raw_block[1:]
+    while True:
+        next_raw_block = json_file.read(block_chars)
+        # whitespace after the closing quote does not make it a later block
+        while next_raw_block.isspace():
+            following_raw_block = json_file.read(block_chars)
+            if not following_raw_block:
+                next_raw_block = ""
+            next_raw_block += following_raw_block
+        if not next_raw_block:
+            # the last block holds the closing quote
+            yield json.loads(f'"{raw_block.rstrip()}')
+            return
+        end = _find_escape_free_end(raw_block)
+        yield json.loads(f'"{raw_block[:end]}"')
+        raw_block = raw_block[end:] + next_raw_block
+
+
+def _iter_price_data_from_json(
+    json_path: str, block_chars: int = JSON_READ_BLOCK_CHARS
+) -> typing.Iterator[dict]:
+    """
+    Yields the rows of the price json one by one. The dumps store the
+    rows as a json encoded string, which is read and decoded block_chars at
+    a time, and the rows are decoded from the decoded characters as soon as
+    they are complete. Neither the file nor the rows are held in memory as
+    a whole
+    """
+    decoder = json.JSONDecoder()
+    rows_json = ""
+    is_array_started = False
     with open(json_path, "r") as f:
-        json_string = json.load(f)
-    return json.loads(json_string)
+        for rows_json_block in _iter_json_string_blocks(f, block_chars):
+            rows_json += rows_json_block
+            position = 0
+            if not is_array_started:
+                position = rows_json.find("[") + 1
+                if position == 0:
+                    continue
+                is_array_started = True
+            while True:
+                while (
+                    position < len(rows_json)
+                    and rows_json[position] in JSON_ARRAY_SEPARATORS
+                ):
+                    position += 1
+                if position == len(rows_json):
+                    break
+                if rows_json[position] == "]":
+                    return
+                try:
+                    row, position = decoder.raw_decode(rows_json, position)
+                except json.JSONDecodeError:
+                    # the row continues in the next block
+                    break
+                yield row
+            rows_json = rows_json[position:]
+    raise ValueError(f"The price json ends inside its rows: {rows_json[:100]}")
 
 
 def _convert_to_market_tz(datetime_string: str) -> datetime.datetime:
@@ -32,7 +139,7 @@ def _convert_to_market_tz(datetime_string: str) -> datetime.datetime:
 
 
 def _convert_dict_to_pyd(
-    json_data: list[dict], price_enum: Markets
+    json_data: typing.Iterable[dict], price_enum: Markets
 ) -> list[BasePointInTimePriceData]:
     pit_pyd = []
     for row in json_data:
@@ -46,6 +153,63 @@ def _convert_dict_to_pyd(
     return pit_pyd  # type: ignore
 
 
+def _iter_pyd_chunks(
+    json_path: str, price_enum: Markets, chunk_rows: int
+) -> typing.Iterator[list[BasePointInTimePriceData]]:
+    price_pit_rows = _iter_price_data_from_json(json_path)
+    while True:
+        pit_pyd_chunk = _convert_dict_to_pyd(
+            itertools.islice(price_pit_rows, chunk_rows), price_enum
+        )
+        if not pit_pyd_chunk:
+            return
+        yield pit_pyd_chunk
+
+
+def _load_with_orm(
+    pit_pyd_chunks: typing.Iterable[list[BasePointInTimePriceData]],
+    price_enum: Markets,
+) -> int:
+    multi_row_inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(price_enum)
+    if multi_row_inserting_fn is None:
+        raise ValueError(f"Invalid price type: {price_enum.name}")
+    num_rows = 0
+    for pit_pyd_chunk in pit_pyd_chunks:
+        _ = multi_row_inserting_fn(session, pit_pyd_chunk)
+        num_rows += len(pit_pyd_chunk)
+    return num_rows
+
+
+def _load_with_copy(
+    pit_pyd_chunks: typing.Iterable[list[BasePointInTimePriceData]],
+    price_enum: Markets,
+) -> int:
+    copying_fn = MARKET_TO_DB_COPYING_FN_MAP.get(price_enum)
+    if copying_fn is None:
+        raise ValueError(f"Invalid price type: {price_enum.name}")
+    num_rows = 0
+
+    def _count_rows(
+        chunks: typing.Iterable[list[BasePointInTimePriceData]],
+    ) -> typing.Iterator[list[BasePointInTimePriceData]]:
+        nonlocal num_rows
+        for chunk in chunks:
+            num_rows += len(chunk)
+            yield chunk
+
+    _ = copying_fn(session, _count_rows(pit_pyd_chunks), ConflictResolution.IGNORE)
+    return num_rows
+
+
+LOADER_TO_LOADING_FN_MAP: dict[
+    str,
+    typing.Callable[[typing.Iterable[list[BasePointInTimePriceData]], Markets], int],
+] = {
+    "orm": _load_with_orm,
+    "copy": _load_with_copy,
+}
+
+
 def _if_path_matches_price_type(json_path: str, price_type: str) -> bool:
     if ("rtm" in json_path or "RTM" in json_path) and price_type == Markets.DAM.name:
         return click.confirm(
@@ -65,16 +229,39 @@ def _if_path_matches_price_type(json_path: str, price_type: str) -> bool:
 @click.command()
 @click.option("--json_path", type=str)
 @click.option("--price_type", type=click.Choice(["DAM", "RTM"], case_sensitive=False))
-def export_json_price_data_into_db(json_path: str, price_type: str) -> None:
+@click.option(
+    "--loader",
+    type=click.Choice(list(LOADER_TO_LOADING_FN_MAP), case_sensitive=False),
+    default="orm",
+    help="orm inserts through the ORM, copy streams rows with COPY FROM STDIN",
+)
+@click.option(
+    "--chunk_rows",
+    "--chunk-rows",
+    "chunk_rows",
+    type=click.IntRange(min=1),
+    default=DEFAULT_CHUNK_ROWS,
+    help=(
+        "Number of rows validated and sent to the database at a time, the json "
+        "is read incrementally so the memory used does not grow with its size"
+    ),
+)
+def export_json_price_data_into_db(
+    json_path: str, price_type: str, loader: str, chunk_rows: int
+) -> None:
     if _if_path_matches_price_type(json_path, price_type):
-        price_pit_rows = _load_price_data_from_json(json_path)
         price_enum = Markets[price_type]
-        pit_pyd_models = _convert_dict_to_pyd(price_pit_rows, price_enum)
-        multi_row_inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(price_enum)
-        if multi_row_inserting_fn is None:
-            raise ValueError(f"Invalid price type: {price_type}")
+        pit_pyd_chunks = _iter_pyd_chunks(json_path, price_enum, chunk_rows)
+        loading_fn = LOADER_TO_LOADING_FN_MAP[loader.lower()]
         try:
-            _ = multi_row_inserting_fn(session, pit_pyd_models)
+            start_time = time.perf_counter()
+            num_rows = loading_fn(pit_pyd_chunks, price_enum)
+            elapsed_seconds = time.perf_counter() - start_time
+            rows_per_second = num_rows / elapsed_seconds if elapsed_seconds else 0.0
+            click.echo(
+                f"Loaded {num_rows} {price_type} rows in {elapsed_seconds:.2f}s "
+                f"({rows_per_second:.0f} rows/sec)"
+            )
         except Exception as e:
             logger.exception(f"Error occurred while exporting data into db. Error: {e}")
         finally:
@@ -3,8 +3,10 @@ import os.path
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.pool import NullPool
 from sqlalchemy_utils import create_database, database_exists, drop_database
 from starlette.config import environ
 
@@ -18,7 +20,10 @@ environ["DB_NAME"] = "test_iex_db"  # noqa
 environ["ALEMBIC_REVISION_PATH"] = os.path.join(os.getcwd(), "alembic")  # noqa
 environ["ALEMBIC_INI_PATH"] = os.path.join(os.getcwd(), "alembic.ini")  # noqa
 
+from src.database import ASYNC_SQLALCHEMY_DATABASE_URI  # noqa
 from src.database import SQLALCHEMY_DATABASE_URI  # noqa
+from src.marketdata.cache import price_response_cache  # noqa
+from src.marketdata.latest import latest_price_buffer  # noqa
 from src.marketdata.router import get_db_session  # noqa
 
 
@@ -29,6 +34,16 @@ def engine():
     return engine
 
 
+@pytest.fixture(scope="session")
+def async_engine():
+    # the test client runs every request on a fresh event loop, so async
+    # connections must not be pooled across requests
+    async_engine = create_async_engine(
+        ASYNC_SQLALCHEMY_DATABASE_URI, poolclass=NullPool
+    )
+    return async_engine
+
+
 @pytest.fixture(scope="session", autouse=True)
 def create_database_and_apply_migrations(engine):
     if database_exists(engine.url):
@@ -71,6 +86,28 @@ def session(engine):
     connection.close()
 
 
+@pytest.fixture(scope="function")
+def committed_session(engine):
+    """
+    Session whose commits are visible to the API, which reads through its own
+    async connections. The price, rollup and day block tables are emptied
+    afterwards
+    """
+    session = sessionmaker(bind=engine)()
+
+    yield session
+
+    session.close()
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "TRUNCATE dam_prices, rtm_prices, "
+                "dam_price_rollups, rtm_price_rollups, "
+                "dam_price_day_blocks, rtm_price_day_blocks RESTART IDENTITY"
+            )
+        )
+
+
 @pytest.fixture
 def mock_datetime():
     return MARKET_TZ.localize(datetime.datetime(2022, 1, 1))
@@ -111,8 +148,18 @@ def test_app():
 
 
 @pytest.fixture(scope="function")
-def client(test_app, session):
-    test_app.dependency_overrides[get_db_session] = lambda: session
+def client(test_app, async_engine):
+    AsyncSession = async_sessionmaker(bind=async_engine)
+
+    async def get_test_db_session():
+        async with AsyncSession() as db_session:
+            yield db_session
+
+    test_app.dependency_overrides[get_db_session] = get_test_db_session
+    # the tables are emptied between tests without going through the crud
+    # functions, so the cached responses would outlive their rows
+    price_response_cache.clear()
+    latest_price_buffer.clear()
     test_client = TestClient(test_app)
     yield test_client
     test_app.dependency_overrides.clear()
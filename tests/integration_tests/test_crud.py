@@ -1,14 +1,32 @@
+import asyncio
 import datetime
 
 import pytest
+import sqlalchemy
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy_utils import create_database, database_exists, drop_database
+from starlette.config import environ
 
-from src.common.enums import Markets
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from src.common.constants import MARKET_TZ
+from src.common.enums import ConflictResolution, Markets
 from src.common.models import TimeFrame
 from src.marketdata.crud import (
+    MARKET_TO_ASYNC_DB_GETTING_FN_MAP,
     MARKET_TO_DB_GETTING_FN_MAP,
     MARKET_TO_DB_INSERTING_FN_MAP,
+    MARKET_TO_DB_UPSERTING_FN_MAP,
 )
-from src.marketdata.models import MARKETTYPE_TO_ORM_MAP
+from src.marketdata.day_blocks import refresh_price_day_blocks
+from src.marketdata.models import (
+    MARKETTYPE_TO_DAY_BLOCK_ORM_MAP,
+    MARKETTYPE_TO_ORM_MAP,
+    RTMPointInTimePriceDataDb,
+    RTMPriceDayBlockDb,
+)
+from src.marketdata.partitions import ensure_monthly_partitions
 
 
 @pytest.mark.parametrize(
@@ -53,3 +71,222 @@ def test_getting_records(session, pyd_price_model, price_type):
     for db_model in db_models:
         assert isinstance(db_model, MARKETTYPE_TO_ORM_MAP.get(market_type_enum))
         # check by querying the migrations
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_getting_records_async(
+    committed_session, async_engine, pyd_price_model, price_type
+):
+    market_type_enum = Markets[price_type]
+
+    # insert the record
+    row_inserting_fn = MARKET_TO_DB_INSERTING_FN_MAP.get(market_type_enum)
+    db_model = row_inserting_fn(committed_session, pyd_price_model)
+
+    async_row_getting_fn = MARKET_TO_ASYNC_DB_GETTING_FN_MAP.get(market_type_enum)
+    time_frame = TimeFrame(
+        start_datetime=datetime.datetime(2000, 1, 1),
+        end_datetime=datetime.datetime(2050, 1, 1),
+    )
+
+    async def get_records():
+        async with async_sessionmaker(bind=async_engine)() as async_session:
+            return await async_row_getting_fn(
+                async_session, time_frame, ["n1_price_in_rs_per_mwh"]
+            )
+
+    db_models = asyncio.run(get_records())
+
+    assert len(db_models) == 1
+    assert isinstance(db_models[0], MARKETTYPE_TO_ORM_MAP.get(market_type_enum))
+    assert db_models[0].settlement_period_start_timestamp == (
+        db_model.settlement_period_start_timestamp
+    )
+    assert db_models[0].n1_price_in_rs_per_mwh == db_model.n1_price_in_rs_per_mwh
+
+
+@pytest.fixture
+def pyd_price_models(pyd_price_model):
+    return [
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    pyd_price_model.settlement_period_start_datetime
+                    + datetime.timedelta(minutes=15 * step)
+                )
+            }
+        )
+        for step in range(5)
+    ]
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_upserting_records_is_idempotent(session, pyd_price_models, price_type):
+    market_type_enum = Markets[price_type]
+    upserting_fn = MARKET_TO_DB_UPSERTING_FN_MAP.get(market_type_enum)
+    db_price_model = MARKETTYPE_TO_ORM_MAP.get(market_type_enum)
+
+    first_write = upserting_fn(session, pyd_price_models, ConflictResolution.UPDATE)
+    second_write = upserting_fn(session, pyd_price_models, ConflictResolution.UPDATE)
+
+    assert len(first_write) == len(pyd_price_models)
+    assert {record.id for record in first_write} == {
+        record.id for record in second_write
+    }
+    assert session.query(db_price_model).count() == len(pyd_price_models)
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_refreshing_day_blocks_in_batches(session, pyd_price_model, price_type):
+    market_type_enum = Markets[price_type]
+    upserting_fn = MARKET_TO_DB_UPSERTING_FN_MAP.get(market_type_enum)
+    db_price_model = MARKETTYPE_TO_ORM_MAP.get(market_type_enum)
+    day_block_model = MARKETTYPE_TO_DAY_BLOCK_ORM_MAP.get(market_type_enum)
+    pyd_price_models = [
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    pyd_price_model.settlement_period_start_datetime
+                    + datetime.timedelta(days=day, minutes=15 * step)
+                )
+            }
+        )
+        for day in range(5)
+        for step in range(day + 1)
+    ]
+    upserting_fn(session, pyd_price_models, ConflictResolution.UPDATE)
+    start_timestamp = int(pyd_price_model.settlement_period_start_datetime.timestamp())
+
+    refresh_price_day_blocks(
+        session,
+        db_price_model,
+        start_timestamp,
+        start_timestamp + 4 * 24 * 60 * 60,
+        days_per_insert=2,
+    )
+
+    day_blocks = session.query(day_block_model).order_by(
+        day_block_model.trading_day_start_timestamp
+    )
+    assert [day_block.num_records for day_block in day_blocks] == [1, 2, 3, 4, 5]
+
+
+def test_day_block_migration_backfills_stored_days(engine, monkeypatch):
+    # the migrations run on a scratch database left before the day blocks
+    scratch_engine = sqlalchemy.create_engine(
+        engine.url.set(database="test_iex_db_day_blocks")
+    )
+    if database_exists(scratch_engine.url):
+        drop_database(scratch_engine.url)
+    create_database(scratch_engine.url)
+    monkeypatch.setenv("DB_NAME", scratch_engine.url.database)
+    alembic_config = AlembicConfig(environ.get("ALEMBIC_INI_PATH"))
+    ScratchSession = sessionmaker(bind=scratch_engine)
+    start_timestamp = int(MARKET_TZ.localize(datetime.datetime(2022, 1, 1)).timestamp())
+    try:
+        command.upgrade(alembic_config, "6508ea2e2a63")
+        with ScratchSession() as scratch_session:
+            ensure_monthly_partitions(scratch_session, "rtm_prices", [start_timestamp])
+            for settlement_period_start_timestamp, session_id in [
+                (start_timestamp, None),
+                (start_timestamp, "S2"),
+                (start_timestamp + 24 * 60 * 60, None),
+            ]:
+                scratch_session.execute(
+                    sqlalchemy.insert(RTMPointInTimePriceDataDb).values(
+                        settlement_period_start_timestamp=(
+                            settlement_period_start_timestamp
+                        ),
+                        mcp_price_in_rs_per_mwh=1.5,
+                        session_id=session_id,
+                    )
+                )
+            scratch_session.commit()
+
+        command.upgrade(alembic_config, "head")
+
+        def get_day_blocks(scratch_session) -> list[tuple]:
+            return [
+                (
+                    day_block.trading_day_start_timestamp,
+                    day_block.num_records,
+                    day_block.compressed_json,
+                )
+                for day_block in scratch_session.query(RTMPriceDayBlockDb).order_by(
+                    RTMPriceDayBlockDb.trading_day_start_timestamp
+                )
+            ]
+
+        with ScratchSession() as scratch_session:
+            backfilled_day_blocks = get_day_blocks(scratch_session)
+            # the backfilled blocks are the ones the writes would have built
+            refresh_price_day_blocks(
+                scratch_session,
+                RTMPointInTimePriceDataDb,
+                start_timestamp,
+                start_timestamp + 24 * 60 * 60,
+            )
+            assert get_day_blocks(scratch_session) == backfilled_day_blocks
+            scratch_session.rollback()
+        assert [day_block[:2] for day_block in backfilled_day_blocks] == [
+            (start_timestamp, 2),
+            (start_timestamp + 24 * 60 * 60, 1),
+        ]
+    finally:
+        scratch_engine.dispose()
+        drop_database(scratch_engine.url)
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_upserting_records_conflict_resolution(session, pyd_price_model, price_type):
+    market_type_enum = Markets[price_type]
+    upserting_fn = MARKET_TO_DB_UPSERTING_FN_MAP.get(market_type_enum)
+    db_price_model = MARKETTYPE_TO_ORM_MAP.get(market_type_enum)
+    updated_pyd_price_model = pyd_price_model.model_copy(
+        update={"mcp_price_in_rs_per_mwh": 20.0}
+    )
+
+    _ = upserting_fn(session, [pyd_price_model], ConflictResolution.UPDATE)
+    ignored = upserting_fn(
+        session, [updated_pyd_price_model], ConflictResolution.IGNORE
+    )
+    assert ignored == []
+    assert session.query(db_price_model).one().mcp_price_in_rs_per_mwh == 10.0
+
+    updated = upserting_fn(
+        session, [updated_pyd_price_model], ConflictResolution.UPDATE
+    )
+    assert len(updated) == 1
+    assert session.query(db_price_model).one().mcp_price_in_rs_per_mwh == 20.0
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_inserting_existing_record_returns_it(session, pyd_price_model, price_type):
+    market_type_enum = Markets[price_type]
+    row_inserting_fn = MARKET_TO_DB_INSERTING_FN_MAP.get(market_type_enum)
+
+    first_record = row_inserting_fn(session, pyd_price_model)
+    second_record = row_inserting_fn(session, pyd_price_model)
+
+    assert first_record.id == second_record.id
+    assert session.query(MARKETTYPE_TO_ORM_MAP.get(market_type_enum)).count() == 1
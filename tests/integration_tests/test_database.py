@@ -0,0 +1,141 @@
+import asyncio
+import datetime
+import itertools
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy_utils import create_database, database_exists, drop_database
+from starlette.config import environ
+
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from src.common.enums import Markets
+from src.common.metrics import DB_POOL_CHECKOUT_WAIT_SECONDS
+from src.common.models import TimeFrame
+from src.database import (
+    ReadReplicaRoutingSession,
+    TimedAsyncAdaptedQueuePool,
+    TimedQueuePool,
+    get_engine_pool_kwargs,
+)
+from src.marketdata.crud import (
+    MARKET_TO_DB_GETTING_FN_MAP,
+    MARKET_TO_DB_INSERTING_FN_MAP,
+)
+
+
+@pytest.fixture(scope="module")
+def replica_engine(engine):
+    # a second local database stands in for the read replica
+    replica_engine = create_engine(engine.url.set(database="test_iex_db_replica"))
+    if database_exists(replica_engine.url):
+        drop_database(replica_engine.url)
+    create_database(replica_engine.url)
+    # alembic/env.py builds the database url from the environment
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setenv("DB_NAME", replica_engine.url.database)
+        command.upgrade(AlembicConfig(environ.get("ALEMBIC_INI_PATH")), "head")
+
+    yield replica_engine
+
+    replica_engine.dispose()
+    drop_database(replica_engine.url)
+
+
+@pytest.fixture(scope="function")
+def routing_session(engine, replica_engine):
+    RoutingSession = sessionmaker(
+        class_=ReadReplicaRoutingSession,
+        primary_bind=engine,
+        replica_binds=itertools.cycle([replica_engine]),
+    )
+    routing_session = RoutingSession()
+
+    yield routing_session
+
+    routing_session.close()
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "TRUNCATE dam_prices, rtm_prices, "
+                "dam_price_rollups, rtm_price_rollups, "
+                "dam_price_day_blocks, rtm_price_day_blocks RESTART IDENTITY"
+            )
+        )
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_routing_session_writes_to_primary_and_reads_from_replica(
+    engine, replica_engine, routing_session, pyd_price_model, price_type
+):
+    market_type_enum = Markets[price_type]
+    row_inserting_fn = MARKET_TO_DB_INSERTING_FN_MAP.get(market_type_enum)
+    row_getting_fn = MARKET_TO_DB_GETTING_FN_MAP.get(market_type_enum)
+    time_frame = TimeFrame(
+        start_datetime=datetime.datetime(2000, 1, 1),
+        end_datetime=datetime.datetime(2050, 1, 1),
+    )
+
+    _ = row_inserting_fn(routing_session, pyd_price_model)
+
+    with sessionmaker(bind=engine)() as primary_session:
+        assert len(row_getting_fn(primary_session, time_frame)) == 1
+    # the replica has not received the write
+    assert row_getting_fn(routing_session, time_frame) == []
+
+
+def test_routing_session_picks_replicas_round_robin(engine, replica_engine):
+    RoutingSession = sessionmaker(
+        class_=ReadReplicaRoutingSession,
+        primary_bind=engine,
+        replica_binds=itertools.cycle([engine, replica_engine]),
+    )
+    replica_binds = [RoutingSession().replica_bind for _ in range(4)]
+
+    assert replica_binds == [engine, replica_engine, engine, replica_engine]
+
+
+def test_engine_pool_kwargs_from_environment(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_MAX_OVERFLOW", "0")
+    monkeypatch.setenv("DB_POOL_RECYCLE", "1800")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "true")
+
+    assert get_engine_pool_kwargs() == {
+        "pool_size": 20,
+        "max_overflow": 0,
+        "pool_recycle": 1800,
+        "pool_pre_ping": True,
+    }
+
+
+def test_timed_pools_record_checkout_wait(engine, async_engine):
+    DB_POOL_CHECKOUT_WAIT_SECONDS.clear()
+    timed_engine = create_engine(engine.url, poolclass=TimedQueuePool)
+    timed_async_engine = create_async_engine(
+        async_engine.url, poolclass=TimedAsyncAdaptedQueuePool
+    )
+
+    async def select_one_async() -> int:
+        async with timed_async_engine.connect() as connection:
+            select_one = (await connection.execute(text("SELECT 1"))).scalar()
+        await timed_async_engine.dispose()
+        return select_one
+
+    with timed_engine.connect() as connection:
+        assert connection.execute(text("SELECT 1")).scalar() == 1
+    assert asyncio.run(select_one_async()) == 1
+    timed_engine.dispose()
+
+    collected_lines = DB_POOL_CHECKOUT_WAIT_SECONDS.collect()
+    for pool_label in ("sync", "async"):
+        assert (
+            f'db_pool_checkout_wait_seconds_count{{pool="{pool_label}"}} 1'
+            in collected_lines
+        )
@@ -1,11 +1,17 @@
+import json
+
 import pytest
 from click.testing import CliRunner
 
 from src.common.enums import Markets
 from src.marketdata.models import MARKETTYPE_TO_ORM_MAP
-from src.migrations.manual.manual_data_migration import export_json_price_data_into_db
+from src.migrations.manual.manual_data_migration import (
+    _iter_price_data_from_json,
+    export_json_price_data_into_db,
+)
 
 
+@pytest.mark.parametrize("loader", ["orm", "copy"])
 @pytest.mark.parametrize(
     "json_path, price_type",
     [
@@ -13,15 +19,60 @@ from src.migrations.manual.manual_data_migration import export_json_price_data_i
         ("./tests/integration_tests/json_data/rtm_prices.json", "RTM"),
     ],
 )
-def test_export_json_price_data_into_db(monkeypatch, session, json_path, price_type):
+def test_export_json_price_data_into_db(
+    monkeypatch, session, json_path, price_type, loader
+):
     monkeypatch.setattr("src.migrations.manual.manual_data_migration.session", session)
     runner = CliRunner()
-    _ = runner.invoke(
+    result = runner.invoke(
         export_json_price_data_into_db,
-        ["--json_path", json_path, "--price_type", price_type],
+        [
+            "--json_path",
+            json_path,
+            "--price_type",
+            price_type,
+            "--loader",
+            loader,
+            "--chunk-rows",
+            "1",
+        ],
     )
+    assert "rows/sec" in result.output
     market_type_enum = Markets[price_type]
 
     # check that the record was inserted into the migrations
     orm_instance = session.query(MARKETTYPE_TO_ORM_MAP.get(market_type_enum)).first()
     assert isinstance(orm_instance, MARKETTYPE_TO_ORM_MAP.get(market_type_enum))
+
+
+@pytest.mark.parametrize(
+    "json_path, price_type",
+    [
+        ("./tests/integration_tests/json_data/dam_prices.json", "DAM"),
+        ("./tests/integration_tests/json_data/rtm_prices.json", "RTM"),
+    ],
+)
+def test_copy_loader_is_idempotent(monkeypatch, session, json_path, price_type):
+    monkeypatch.setattr("src.migrations.manual.manual_data_migration.session", session)
+    runner = CliRunner()
+    for _ in range(2):
+        _ = runner.invoke(
+            export_json_price_data_into_db,
+            ["--json_path", json_path, "--price_type", price_type, "--loader", "copy"],
+        )
+    market_type_enum = Markets[price_type]
+
+    assert session.query(MARKETTYPE_TO_ORM_MAP.get(market_type_enum)).count() == 1
+
+
+@pytest.mark.parametrize("block_chars", [1, 7, 1024])
+def test_iter_price_data_from_json_in_blocks(tmp_path, block_chars):
+    rows = [
+        {"settlement_period_start_datetime": "2021-01-01T00:00:00+05:30", "n": 1.0},
+        {"note": 'escaped "quotes", \\ and \u20b9', "n": [2, 3]},
+    ]
+    json_path = tmp_path / "prices.json"
+    # the inner dump keeps the ₹ for the outer one to escape
+    json_path.write_text(json.dumps(json.dumps(rows, ensure_ascii=False)))
+
+    assert list(_iter_price_data_from_json(str(json_path), block_chars)) == rows
@@ -1,14 +1,45 @@
+import asyncio
+import csv
+import datetime
+import gzip
+import io
+import json
+import zlib
+
+import pyarrow as pa
+import pyarrow.parquet as pq
 import pytest
+import sqlalchemy
+import zstandard
+from sqlalchemy.ext.asyncio import async_sessionmaker
 
-from src.common.enums import Markets
-from src.marketdata.crud import MARKET_TO_DB_INSERTING_FN_MAP
+from src.common.compression import compression_stats
+from src.common.constants import PRICE_COLUMN_TO_FIELD_NAME_MAP
+from src.common.enums import Markets, ResponseFormat
+from src.common.metrics import metrics_registry
+from src.common.models import TimeFrame
+from src.marketdata.cache import price_response_cache
+from src.marketdata.crud import (
+    MARKET_TO_ASYNC_DB_LATEST_REFRESHING_FN_MAP,
+    MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP,
+    MARKET_TO_DB_INSERTING_FN_MAP,
+    MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP,
+)
+from src.marketdata.models import (
+    MARKETTYPE_TO_DAY_BLOCK_ORM_MAP,
+    MARKETTYPE_TO_ORM_MAP,
+    get_price_row_columns,
+    get_price_row_key_columns,
+)
+from src.marketdata.schemas import DAMPointInTimePriceData, RTMPointInTimePriceData
+from src.marketdata.stream import PriceStreamBroker, aiter_price_events
 
 
 @pytest.fixture
-def insert_row(session, pyd_price_model, price_type):
+def insert_row(committed_session, pyd_price_model, price_type):
     market_type_enum = Markets[price_type]
     row_inserting_fn = MARKET_TO_DB_INSERTING_FN_MAP.get(market_type_enum)
-    _ = row_inserting_fn(session, pyd_price_model)
+    _ = row_inserting_fn(committed_session, pyd_price_model)
 
 
 @pytest.mark.parametrize(
@@ -44,3 +75,1112 @@ def test_read_price_records_invalid_requests(
         f"start_datetime={mock_datetime_str}&end_datetime={mock_datetime_str}"
     )
     assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_price_records_selected_zones(
+    mock_datetime, client, session, pyd_price_model, price_type, insert_row
+):
+    mock_datetime_str = mock_datetime.strftime("%Y-%m-%d %H:%M:%S")
+    response = client.get(
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime={mock_datetime_str}&end_datetime={mock_datetime_str}"
+        f"&zones=n1,MCP"
+    )
+    assert response.status_code == 200
+    expected_keys = {
+        "settlement_period_start_datetime",
+        "n1_price_in_rs_per_mwh",
+        "mcp_price_in_rs_per_mwh",
+    }
+    if price_type == "RTM":
+        expected_keys.add("session_id")
+    actual_response = response.json()[0]
+    assert set(actual_response) == expected_keys
+    assert actual_response["n1_price_in_rs_per_mwh"] == (
+        pyd_price_model.n1_price_in_rs_per_mwh
+    )
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_price_records_unknown_zones(
+    mock_datetime, client, session, pyd_price_model, price_type, insert_row
+):
+    mock_datetime_str = mock_datetime.strftime("%Y-%m-%d %H:%M:%S")
+    response = client.get(
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime={mock_datetime_str}&end_datetime={mock_datetime_str}"
+        f"&zones=N1&zones=X9"
+    )
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_price_aggregates(
+    mock_datetime, client, session, pyd_price_model, price_type, insert_row
+):
+    mock_datetime_str = mock_datetime.strftime("%Y-%m-%d %H:%M:%S")
+    response = client.get(
+        f"/marketdata/{price_type.lower()}/aggregate?granularity=day"
+        f"&start_datetime={mock_datetime_str}&end_datetime={mock_datetime_str}"
+        f"&zones=N1,MCP"
+    )
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "bucket_start_datetime": mock_datetime.isoformat(),
+            "granularity": "day",
+            "zones": {
+                zone: {
+                    "num_intervals": 1,
+                    "min_price_in_rs_per_mwh": 10.0,
+                    "max_price_in_rs_per_mwh": 10.0,
+                    "mean_price_in_rs_per_mwh": 10.0,
+                }
+                for zone in ["MCP", "N1"]
+            },
+        }
+    ]
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_metrics(
+    mock_datetime, client, session, pyd_price_model, price_type, insert_row
+):
+    metrics_registry.clear()
+    mock_datetime_str = mock_datetime.strftime("%Y-%m-%d %H:%M:%S")
+    market = price_type.lower()
+    response = client.get(
+        f"/marketdata/{market}?"
+        f"start_datetime={mock_datetime_str}&end_datetime={mock_datetime_str}"
+    )
+    assert response.status_code == 200
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    rendered_metrics = response.text
+    assert (
+        f'http_request_duration_seconds_count{{method="GET",'
+        f'route="/marketdata/{market}",market="{market}",status_code="200"}} 1'
+    ) in rendered_metrics
+    for phase in ("query", "serialization"):
+        assert (
+            f'price_read_phase_duration_seconds_count{{market="{market}",'
+            f'phase="{phase}"}} 1'
+        ) in rendered_metrics
+    assert f'price_rows_per_request_sum{{market="{market}"}} 1.0' in rendered_metrics
+    assert "price_response_cache_misses_total 1" in rendered_metrics
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_price_records_pages(
+    mock_datetime, client, committed_session, pyd_price_model, price_type
+):
+    pyd_price_models = [
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    mock_datetime + datetime.timedelta(minutes=15 * step)
+                )
+            }
+        )
+        for step in range(5)
+    ]
+    multiple_inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(
+        Markets[price_type]
+    )
+    _ = multiple_inserting_fn(committed_session, pyd_price_models)
+    url = (
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime={mock_datetime.strftime('%Y-%m-%d %H:%M:%S')}"
+        f"&end_datetime=2022-01-02 00:00:00&limit=2"
+    )
+
+    pages = []
+    response = client.get(url)
+    pages.append(response.json())
+    while "X-Next-Cursor" in response.headers:
+        response = client.get(f"{url}&cursor={response.headers['X-Next-Cursor']}")
+        pages.append(response.json())
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [row for page in pages for row in page] == [
+        pyd_model.model_dump() for pyd_model in pyd_price_models
+    ]
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_price_records_cached_until_written(
+    mock_datetime, client, committed_session, pyd_price_model, price_type, insert_row
+):
+    url = (
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime={mock_datetime.strftime('%Y-%m-%d %H:%M:%S')}"
+        f"&end_datetime=2022-01-02 00:00:00"
+    )
+    first_response = client.get(url)
+    second_response = client.get(url)
+
+    assert first_response.headers["X-Cache"] == "MISS"
+    assert second_response.headers["X-Cache"] == "HIT"
+    assert second_response.content == first_response.content
+
+    # writing a settlement period inside the time frame invalidates the entry
+    new_pyd_price_model = pyd_price_model.model_copy(
+        update={
+            "settlement_period_start_datetime": (
+                mock_datetime + datetime.timedelta(minutes=15)
+            )
+        }
+    )
+    multiple_inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(
+        Markets[price_type]
+    )
+    _ = multiple_inserting_fn(committed_session, [new_pyd_price_model])
+    third_response = client.get(url)
+
+    assert third_response.headers["X-Cache"] == "MISS"
+    assert len(third_response.json()) == 2
+    assert client.get("/marketdata/cache/stats").json() == {
+        "entries": 1,
+        "max_entries": 256,
+        "bytes": len(third_response.content),
+        "hits": 1,
+        "misses": 2,
+        "evictions": 0,
+        "expirations": 0,
+        "invalidations": 1,
+    }
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_price_records_from_day_blocks(
+    mock_datetime, client, committed_session, pyd_price_model, price_type
+):
+    # a full trading day with partial days on both sides
+    day_start_datetime = mock_datetime + datetime.timedelta(days=1)
+    pyd_price_models = [
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    day_start_datetime + datetime.timedelta(minutes=15 * step)
+                ),
+                "n1_price_in_rs_per_mwh": float(step),
+            }
+        )
+        for step in range(-2, 98)
+    ]
+    multiple_inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(
+        Markets[price_type]
+    )
+    _ = multiple_inserting_fn(committed_session, pyd_price_models)
+    url = (
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime=2022-01-01 23:30:00&end_datetime=2022-01-03 00:15:00"
+    )
+    # requesting every zone explicitly skips the day blocks
+    all_zones = "A1,A2,E1,E2,N1,N2,N3,S1,S2,S3,W1,W2,W3,MCP"
+
+    response = client.get(url)
+    live_response = client.get(f"{url}&zones={all_zones}")
+
+    assert response.status_code == 200
+    assert response.content == live_response.content
+    assert response.json() == [pyd_model.model_dump() for pyd_model in pyd_price_models]
+
+    # the full day is read from its block
+    day_block_model = MARKETTYPE_TO_DAY_BLOCK_ORM_MAP[Markets[price_type]]
+    committed_session.query(day_block_model).filter_by(
+        trading_day_start_timestamp=int(day_start_datetime.timestamp())
+    ).update({"compressed_json": zlib.compress(b'{"from_day_block":true}')})
+    committed_session.commit()
+    price_response_cache.clear()
+
+    assert [row for row in client.get(url).json() if "from_day_block" in row] == [
+        {"from_day_block": True}
+    ]
+    assert len(client.get(url).json()) == 2 + 1 + 2
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_price_records_conditional_requests(
+    mock_datetime, client, committed_session, pyd_price_model, price_type, insert_row
+):
+    url = (
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime={mock_datetime.strftime('%Y-%m-%d %H:%M:%S')}"
+        f"&end_datetime=2022-01-02 00:00:00"
+    )
+    response = client.get(url)
+    etag = response.headers["ETag"]
+
+    assert response.status_code == 200
+    assert "Last-Modified" in response.headers
+    # the window ended before the current trading day
+    assert response.headers["Cache-Control"] == "public, max-age=86400"
+
+    # answered from the price response cache and from the watermark
+    for _ in range(2):
+        not_modified_response = client.get(url, headers={"If-None-Match": etag})
+        assert not_modified_response.status_code == 304
+        assert not_modified_response.content == b""
+        assert not_modified_response.headers["ETag"] == etag
+        price_response_cache.clear()
+
+    new_pyd_price_model = pyd_price_model.model_copy(
+        update={
+            "settlement_period_start_datetime": (
+                mock_datetime + datetime.timedelta(minutes=15)
+            )
+        }
+    )
+    multiple_inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(
+        Markets[price_type]
+    )
+    _ = multiple_inserting_fn(committed_session, [new_pyd_price_model])
+    modified_response = client.get(url, headers={"If-None-Match": etag})
+
+    assert modified_response.status_code == 200
+    assert modified_response.headers["ETag"] != etag
+    assert len(modified_response.json()) == 2
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+@pytest.mark.parametrize(
+    "response_format", [ResponseFormat.ARROW, ResponseFormat.PARQUET]
+)
+def test_read_price_records_columnar_formats(
+    mock_datetime,
+    client,
+    committed_session,
+    pyd_price_model,
+    price_type,
+    insert_row,
+    response_format,
+):
+    mock_datetime_str = mock_datetime.strftime("%Y-%m-%d %H:%M:%S")
+    url = (
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime={mock_datetime_str}&end_datetime={mock_datetime_str}"
+    )
+    response = client.get(url, headers={"Accept": response_format.value})
+
+    assert response.status_code == 200
+    assert response.headers["Content-Type"] == response_format.value
+    assert response.headers["Vary"] == "Accept, Accept-Encoding"
+    if response_format == ResponseFormat.PARQUET:
+        table = pq.read_table(io.BytesIO(response.content))
+    else:
+        table = pa.ipc.open_stream(response.content).read_all()
+    # parquet has no second timestamps, they are written as milliseconds
+    assert table.schema.field("settlement_period_start_datetime").type.tz == (
+        "Asia/Kolkata"
+    )
+    assert table.to_pylist() == [
+        {
+            **pyd_price_model.model_dump(),
+            "settlement_period_start_datetime": (
+                pyd_price_model.settlement_period_start_datetime
+            ),
+        }
+    ]
+
+    # the json response of the same request is cached separately
+    assert client.get(url).json() == [pyd_price_model.model_dump()]
+    cached_response = client.get(url, headers={"Accept": response_format.value})
+    assert cached_response.headers["X-Cache"] == "HIT"
+    assert cached_response.headers["Content-Type"] == response_format.value
+    assert cached_response.content == response.content
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+@pytest.mark.parametrize("gzip_compressed", [False, True])
+def test_export_price_records(
+    mock_datetime,
+    client,
+    committed_session,
+    pyd_price_model,
+    price_type,
+    insert_row,
+    gzip_compressed,
+):
+    query = (
+        f"start_datetime={mock_datetime.strftime('%Y-%m-%d %H:%M:%S')}"
+        f"&end_datetime=2022-01-02 00:00:00&zones=N1,MCP"
+        f"&gzip={str(gzip_compressed).lower()}"
+    )
+    expected_row = pyd_price_model.model_dump(
+        include={
+            "settlement_period_start_datetime",
+            "n1_price_in_rs_per_mwh",
+            "mcp_price_in_rs_per_mwh",
+            "session_id",
+        }
+    )
+
+    csv_response = client.get(f"/marketdata/{price_type.lower()}/export.csv?{query}")
+    ndjson_response = client.get(
+        f"/marketdata/{price_type.lower()}/export.ndjson?{query}"
+    )
+
+    csv_content, ndjson_content = csv_response.content, ndjson_response.content
+    if gzip_compressed:
+        assert csv_response.headers["Content-Type"] == "application/gzip"
+        assert csv_response.headers["Content-Disposition"] == (
+            f'attachment; filename="{price_type.lower()}_prices.csv.gz"'
+        )
+        csv_content = gzip.decompress(csv_content)
+        ndjson_content = gzip.decompress(ndjson_content)
+    else:
+        assert csv_response.headers["Content-Type"].startswith("text/csv")
+        assert ndjson_response.headers["Content-Type"] == "application/x-ndjson"
+    csv_rows = list(csv.DictReader(io.StringIO(csv_content.decode())))
+    assert csv_rows == [
+        {
+            field_name: "" if value is None else str(value)
+            for field_name, value in expected_row.items()
+        }
+    ]
+    assert [json.loads(line) for line in ndjson_content.splitlines()] == [expected_row]
+
+
+def test_export_price_records_unknown_format(client):
+    response = client.get(
+        "/marketdata/dam/export.xml?"
+        "start_datetime=2022-01-01 00:00:00&end_datetime=2022-01-02 00:00:00"
+    )
+    assert response.status_code == 422
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_price_records_columnar(
+    mock_datetime, client, committed_session, pyd_price_model, price_type, insert_row
+):
+    url = (
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime={mock_datetime.strftime('%Y-%m-%d %H:%M:%S')}"
+        f"&end_datetime=2022-01-02 00:00:00&zones=N1,MCP&format=columnar"
+    )
+    start_timestamp = int(mock_datetime.timestamp())
+    multiple_inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(
+        Markets[price_type]
+    )
+    _ = multiple_inserting_fn(
+        committed_session,
+        [
+            pyd_price_model.model_copy(
+                update={
+                    "settlement_period_start_datetime": (
+                        mock_datetime + datetime.timedelta(minutes=15)
+                    ),
+                    "mcp_price_in_rs_per_mwh": 20.0,
+                }
+            )
+        ],
+    )
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    columnar_records = response.json()
+    assert columnar_records.pop("columns") == {
+        "N1": [10.0, 10.0],
+        "MCP": [10.0, 20.0],
+        **({"session_id": [None, None]} if price_type == "RTM" else {}),
+    }
+    assert columnar_records == {
+        "start": start_timestamp,
+        "step_seconds": 900,
+        "timestamps": None,
+    }
+
+    # a gap in the series brings the explicit timestamps back
+    _ = multiple_inserting_fn(
+        committed_session,
+        [
+            pyd_price_model.model_copy(
+                update={
+                    "settlement_period_start_datetime": (
+                        mock_datetime + datetime.timedelta(hours=1)
+                    )
+                }
+            )
+        ],
+    )
+
+    assert client.get(url).json()["timestamps"] == [
+        start_timestamp,
+        start_timestamp + 900,
+        start_timestamp + 3600,
+    ]
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_price_records_compressed(
+    mock_datetime, client, committed_session, pyd_price_model, price_type
+):
+    url = (
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime={mock_datetime.strftime('%Y-%m-%d %H:%M:%S')}"
+        f"&end_datetime=2022-01-02 00:00:00"
+    )
+    multiple_inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(
+        Markets[price_type]
+    )
+    _ = multiple_inserting_fn(
+        committed_session,
+        [
+            pyd_price_model.model_copy(
+                update={
+                    "settlement_period_start_datetime": (
+                        mock_datetime + step * datetime.timedelta(minutes=15)
+                    )
+                }
+            )
+            for step in range(10)
+        ],
+    )
+    compression_stats.clear()
+
+    def get_zstd_records():
+        # httpx does not decode zstd, so the bodies arrive as sent
+        response = client.get(url, headers={"Accept-Encoding": "zstd"})
+        assert response.headers["Content-Encoding"] == "zstd"
+        assert response.headers["Vary"] == "Accept, Accept-Encoding"
+        records = json.loads(
+            zstandard.ZstdDecompressor().decompressobj().decompress(response.content)
+        )
+        return response.headers["X-Cache"], records
+
+    assert get_zstd_records()[0] == "MISS"
+    streamed_stats = compression_stats.get_stats()["zstd"]
+    assert streamed_stats["responses"] == 1
+    for _ in range(2):
+        cache_status, records = get_zstd_records()
+        assert cache_status == "HIT"
+        assert len(records) == 10
+
+    # the cached body was compressed on the first hit only
+    cached_stats = client.get("/compression/stats").json()["zstd"]
+    assert cached_stats["responses"] == 2
+    assert cached_stats["bytes_saved"] > streamed_stats["bytes_saved"] > 0
+    identity_response = client.get(url, headers={"Accept-Encoding": "identity"})
+    assert "Content-Encoding" not in identity_response.headers
+    assert len(identity_response.json()) == 10
+
+
+@pytest.mark.parametrize("pyd_price_model", ["DAM"], indirect=True)
+def test_read_price_records_batch(
+    mock_datetime, client, async_engine, committed_session, pyd_price_model
+):
+    dam_pyd_price_models = [
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    mock_datetime + step * datetime.timedelta(minutes=15)
+                )
+            }
+        )
+        for step in range(8)
+    ]
+    _ = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP[Markets.DAM](
+        committed_session, dam_pyd_price_models
+    )
+
+    def format_datetime(step):
+        return (mock_datetime + step * datetime.timedelta(minutes=15)).strftime(
+            "%Y-%m-%d %H:%M:%S"
+        )
+
+    batch_request = {
+        "queries": [
+            {
+                "id": "first_hour",
+                "market": "dam",
+                "start_datetime": format_datetime(0),
+                "end_datetime": format_datetime(3),
+                "zones": ["MCP"],
+            },
+            {
+                "id": "overlapping",
+                "market": "dam",
+                "start_datetime": format_datetime(2),
+                "end_datetime": format_datetime(7),
+                "zones": ["N1"],
+            },
+            {
+                "id": "rtm",
+                "market": "rtm",
+                "start_datetime": format_datetime(0),
+                "end_datetime": format_datetime(7),
+            },
+        ]
+    }
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sqlalchemy.event.listen(
+        async_engine.sync_engine, "before_cursor_execute", record_statement
+    )
+    try:
+        response = client.post("/marketdata/batch", json=batch_request)
+    finally:
+        sqlalchemy.event.remove(
+            async_engine.sync_engine, "before_cursor_execute", record_statement
+        )
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "first_hour": [
+            pyd_model.model_dump(
+                include={"settlement_period_start_datetime", "mcp_price_in_rs_per_mwh"}
+            )
+            for pyd_model in dam_pyd_price_models[:4]
+        ],
+        "overlapping": [
+            pyd_model.model_dump(
+                include={"settlement_period_start_datetime", "n1_price_in_rs_per_mwh"}
+            )
+            for pyd_model in dam_pyd_price_models[2:]
+        ],
+        "rtm": [],
+    }
+    # one query per market, the two dam windows were merged
+    assert len([s for s in statements if s.lstrip().startswith("SELECT")]) == 2
+
+
+@pytest.mark.parametrize(
+    "queries, expected_status_code",
+    [
+        ([], 422),
+        (
+            [
+                {
+                    "id": "a",
+                    "market": "dam",
+                    "start_datetime": "2022-01-01 00:00:00",
+                    "end_datetime": "2022-01-01 01:00:00",
+                }
+            ]
+            * 2,
+            422,
+        ),
+        (
+            [
+                {
+                    "id": "a",
+                    "market": "dam",
+                    "start_datetime": "2022-01-01T00:00:00",
+                    "end_datetime": "2022-01-01 01:00:00",
+                }
+            ],
+            400,
+        ),
+        (
+            [
+                {
+                    "id": "a",
+                    "market": "dam",
+                    "start_datetime": "2022-01-01 00:00:00",
+                    "end_datetime": "2022-01-01 01:00:00",
+                    "zones": ["X9"],
+                }
+            ],
+            400,
+        ),
+    ],
+)
+def test_read_price_records_batch_invalid_requests(
+    client, queries, expected_status_code
+):
+    response = client.post("/marketdata/batch", json={"queries": queries})
+    assert response.status_code == expected_status_code
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_read_latest_price_records(
+    mock_datetime,
+    client,
+    async_engine,
+    committed_session,
+    pyd_price_model,
+    price_type,
+    insert_row,
+):
+    url = f"/marketdata/{price_type.lower()}/latest"
+    market = Markets[price_type]
+
+    assert client.get(url).status_code == 503
+
+    async def seed_latest_prices():
+        async with async_sessionmaker(bind=async_engine)() as db_session:
+            await MARKET_TO_ASYNC_DB_LATEST_REFRESHING_FN_MAP[market](db_session)
+
+    asyncio.run(seed_latest_prices())
+
+    assert client.get(url).json() == [pyd_price_model.model_dump()]
+
+    # the crud writes keep the seeded buffer up to date
+    newer_pyd_price_models = [
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    mock_datetime + step * datetime.timedelta(minutes=15)
+                )
+            }
+        )
+        for step in range(1, 4)
+    ]
+    _ = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP[market](
+        committed_session, newer_pyd_price_models
+    )
+    statements = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    sqlalchemy.event.listen(
+        async_engine.sync_engine, "before_cursor_execute", record_statement
+    )
+    try:
+        latest_response = client.get(url, params={"n": 2})
+    finally:
+        sqlalchemy.event.remove(
+            async_engine.sync_engine, "before_cursor_execute", record_statement
+        )
+
+    assert latest_response.json() == [
+        pyd_model.model_dump() for pyd_model in newer_pyd_price_models[-2:]
+    ]
+    assert statements == []
+    assert client.get(url, params={"n": 0}).status_code == 422
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_stream_price_records(
+    mock_datetime,
+    async_engine,
+    committed_session,
+    pyd_price_model,
+    price_type,
+    insert_row,
+):
+    market = Markets[price_type]
+    field_names = [
+        column.name
+        for column in get_price_row_columns(
+            MARKETTYPE_TO_ORM_MAP[market], ["mcp_price_in_rs_per_mwh"]
+        )
+    ]
+    all_field_names = [
+        column.name for column in get_price_row_columns(MARKETTYPE_TO_ORM_MAP[market])
+    ]
+    newer_pyd_price_models = [
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    mock_datetime + step * datetime.timedelta(minutes=15)
+                )
+            }
+        )
+        for step in range(1, 3)
+    ]
+    AsyncSession = async_sessionmaker(bind=async_engine)
+
+    async def read_price_events() -> list[bytes]:
+        broker = PriceStreamBroker(session_factory=AsyncSession)
+        await broker.start(async_engine)
+        db_session = AsyncSession()
+        after_timestamp = int(mock_datetime.timestamp()) - 900
+        price_events = aiter_price_events(
+            broker,
+            market,
+            MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP[market](
+                db_session,
+                TimeFrame(
+                    start_datetime=mock_datetime - datetime.timedelta(days=1),
+                    end_datetime=mock_datetime + datetime.timedelta(days=1),
+                ),
+                after_timestamp=after_timestamp,
+            ),
+            field_names,
+            [all_field_names.index(field_name) for field_name in field_names],
+        )
+        try:
+            received = [await price_events.__anext__()]
+            # the write of another process reaches the stream through NOTIFY
+            await asyncio.to_thread(
+                MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP[market],
+                committed_session,
+                newer_pyd_price_models,
+            )
+            for _ in newer_pyd_price_models:
+                received.append(
+                    await asyncio.wait_for(price_events.__anext__(), timeout=10)
+                )
+        finally:
+            await price_events.aclose()
+            await db_session.close()
+            await broker.stop()
+        return received
+
+    received = asyncio.run(read_price_events())
+
+    json_objects = [
+        json.loads(price_event.split(b"\n")[2].removeprefix(b"data: "))
+        for price_event in received
+    ]
+    assert json_objects == [
+        {
+            "settlement_period_start_datetime": pyd_model.model_dump()[
+                "settlement_period_start_datetime"
+            ],
+            "mcp_price_in_rs_per_mwh": pyd_model.mcp_price_in_rs_per_mwh,
+            "session_id": pyd_model.session_id,
+        }
+        for pyd_model in [pyd_price_model, *newer_pyd_price_models]
+    ]
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_stream_price_records_of_other_sessions_and_gap_fills(
+    mock_datetime,
+    async_engine,
+    committed_session,
+    pyd_price_model,
+    price_type,
+    insert_row,
+):
+    market = Markets[price_type]
+    db_price_model = MARKETTYPE_TO_ORM_MAP[market]
+    all_field_names = [column.name for column in get_price_row_columns(db_price_model)]
+    key_column_indexes = [
+        all_field_names.index(column.name)
+        for column in get_price_row_key_columns(db_price_model)
+    ]
+    written_pyd_price_models = [
+        # a newer period, the gap-fill of the period before it and another
+        # session of the already sent period
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": mock_datetime + period_delta,
+                "session_id": session_id,
+            }
+        )
+        for period_delta, session_id in [
+            (datetime.timedelta(minutes=30), None),
+            (datetime.timedelta(minutes=15), None),
+            (datetime.timedelta(), "S2"),
+        ]
+    ]
+    AsyncSession = async_sessionmaker(bind=async_engine)
+
+    async def read_price_events() -> list[bytes]:
+        broker = PriceStreamBroker(session_factory=AsyncSession)
+        await broker.start(async_engine)
+        db_session = AsyncSession()
+        price_events = aiter_price_events(
+            broker,
+            market,
+            MARKET_TO_ASYNC_DB_ROW_ITERATING_FN_MAP[market](
+                db_session,
+                TimeFrame(
+                    start_datetime=mock_datetime - datetime.timedelta(days=1),
+                    end_datetime=mock_datetime + datetime.timedelta(days=1),
+                ),
+            ),
+            all_field_names,
+            list(range(len(all_field_names))),
+            key_column_indexes,
+        )
+        try:
+            received = [await price_events.__anext__()]
+            for written_pyd_price_model in written_pyd_price_models:
+                await asyncio.to_thread(
+                    MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP[market],
+                    committed_session,
+                    [written_pyd_price_model],
+                )
+                received.append(
+                    await asyncio.wait_for(price_events.__anext__(), timeout=10)
+                )
+        finally:
+            await price_events.aclose()
+            await db_session.close()
+            await broker.stop()
+        return received
+
+    received = asyncio.run(read_price_events())
+
+    timestamp = int(mock_datetime.timestamp())
+    assert [price_event.split(b"\n")[0] for price_event in received] == [
+        b"id: %d:" % timestamp,
+        b"id: %d:" % (timestamp + 1800),
+        b"id: %d:" % (timestamp + 900),
+        b"id: %d:S2" % timestamp,
+    ]
+
+
+def test_stream_price_records_unavailable(client):
+    assert client.get("/marketdata/rtm/stream").status_code == 503
+    assert (
+        client.get("/marketdata/rtm/stream", params={"zones": "X9"}).status_code == 400
+    )
+
+
+def test_price_stream_broker_reconnects(async_engine):
+    async def terminate_and_reconnect() -> bool:
+        broker = PriceStreamBroker(
+            health_check_seconds=0.05, reconnect_min_seconds=0.01
+        )
+        await broker.start(async_engine)
+        subscription = broker.subscribe(Markets.RTM)
+        try:
+            raw_connection = await broker._listen_connection.get_raw_connection()
+            listen_pid = raw_connection.driver_connection.get_server_pid()
+            async with async_engine.connect() as connection:
+                await connection.execute(
+                    sqlalchemy.text("SELECT pg_terminate_backend(:pid)"),
+                    {"pid": listen_pid},
+                )
+            # the streams end so their clients resume from the database
+            await asyncio.wait_for(subscription.queue.get(), timeout=10)
+            assert subscription.overflowed
+            for _ in range(1000):
+                if broker.is_running:
+                    break
+                await asyncio.sleep(0.01)
+            return broker.is_running
+        finally:
+            await broker.stop()
+
+    assert asyncio.run(terminate_and_reconnect())
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+@pytest.mark.parametrize(
+    "resample, aggregation, expected_prices",
+    [
+        ("1h", "mean", [1.5, 5.5]),
+        ("1h", "min", [0.0, 4.0]),
+        ("1h", "max", [3.0, 7.0]),
+        ("1h", "first", [0.0, 4.0]),
+        ("1h", "last", [3.0, 7.0]),
+        ("4h", "mean", [3.5]),
+        ("1d", "max", [7.0]),
+    ],
+)
+def test_read_price_records_resampled(
+    mock_datetime,
+    client,
+    committed_session,
+    pyd_price_model,
+    price_type,
+    resample,
+    aggregation,
+    expected_prices,
+):
+    pyd_price_models = [
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    mock_datetime + datetime.timedelta(minutes=15 * step)
+                ),
+                "mcp_price_in_rs_per_mwh": float(step),
+            }
+        )
+        for step in range(8)
+    ]
+    _ = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP[Markets[price_type]](
+        committed_session, pyd_price_models
+    )
+    url = (
+        f"/marketdata/{price_type.lower()}?"
+        f"start_datetime={mock_datetime.strftime('%Y-%m-%d %H:%M:%S')}"
+        f"&end_datetime=2022-01-02 00:00:00&zones=MCP"
+        f"&resample={resample}&aggregation={aggregation}"
+    )
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.json() == [
+        {
+            "settlement_period_start_datetime": (
+                mock_datetime + datetime.timedelta(hours=hour)
+            ).isoformat(),
+            "mcp_price_in_rs_per_mwh": expected_price,
+        }
+        for hour, expected_price in enumerate(expected_prices)
+    ]
+
+    # the resampled intervals are paged like the settlement periods
+    pages = []
+    response = client.get(f"{url}&limit=1")
+    pages.append(response.json())
+    while "X-Next-Cursor" in response.headers:
+        response = client.get(
+            f"{url}&limit=1&cursor={response.headers['X-Next-Cursor']}"
+        )
+        pages.append(response.json())
+
+    assert [len(page) for page in pages] == [1] * len(expected_prices)
+    assert [
+        row["mcp_price_in_rs_per_mwh"] for page in pages for row in page
+    ] == expected_prices
+
+
+@pytest.mark.parametrize("resample", ["7m", "5h", "0d", "1w"])
+def test_read_price_records_invalid_resample(client, resample):
+    response = client.get(
+        "/marketdata/rtm?start_datetime=2022-01-01 00:00:00"
+        f"&end_datetime=2022-01-02 00:00:00&resample={resample}"
+    )
+
+    assert response.status_code == 400
+
+
+def test_read_price_spreads(mock_datetime, client, committed_session):
+    def make_pyd_price_models(pyd_class, mcp_prices):
+        return [
+            pyd_class(
+                settlement_period_start_datetime=(
+                    mock_datetime + datetime.timedelta(minutes=15 * step)
+                ),
+                **{
+                    **dict.fromkeys(PRICE_COLUMN_TO_FIELD_NAME_MAP.values(), 10.0),
+                    "mcp_price_in_rs_per_mwh": mcp_price,
+                },
+            )
+            for step, mcp_price in mcp_prices
+        ]
+
+    _ = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP[Markets.DAM](
+        committed_session,
+        make_pyd_price_models(
+            DAMPointInTimePriceData, [(0, 10.0), (1, 10.0), (2, 10.0), (3, 10.0)]
+        ),
+    )
+    # the last settlement period has no DAM price and is left out
+    _ = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP[Markets.RTM](
+        committed_session,
+        make_pyd_price_models(
+            RTMPointInTimePriceData, [(0, 8.0), (1, 12.0), (2, 15.0), (4, 20.0)]
+        ),
+    )
+    url = (
+        f"/marketdata/spread?"
+        f"start_datetime={mock_datetime.strftime('%Y-%m-%d %H:%M:%S')}"
+        f"&end_datetime=2022-01-02 00:00:00&zones=N1,MCP"
+    )
+    expected_summary = {
+        "N1": {
+            "num_intervals": 3,
+            "num_positive_intervals": 0,
+            "mean_spread_in_rs_per_mwh": 0.0,
+            "max_abs_spread_in_rs_per_mwh": 0.0,
+        },
+        "MCP": {
+            "num_intervals": 3,
+            "num_positive_intervals": 2,
+            "mean_spread_in_rs_per_mwh": pytest.approx(5 / 3),
+            "max_abs_spread_in_rs_per_mwh": 5.0,
+        },
+    }
+
+    response = client.get(url)
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "summary": expected_summary,
+        "spreads": [
+            {
+                "settlement_period_start_datetime": (
+                    mock_datetime + datetime.timedelta(minutes=15 * step)
+                ).isoformat(),
+                "n1_spread_in_rs_per_mwh": 0.0,
+                "mcp_spread_in_rs_per_mwh": mcp_spread,
+            }
+            for step, mcp_spread in enumerate([-2.0, 2.0, 5.0])
+        ],
+    }
+
+    resampled_response = client.get(f"{url}&resample=1h&aggregation=max")
+
+    assert resampled_response.json()["spreads"] == [
+        {
+            "settlement_period_start_datetime": mock_datetime.isoformat(),
+            "n1_spread_in_rs_per_mwh": 0.0,
+            "mcp_spread_in_rs_per_mwh": 5.0,
+        }
+    ]
+    assert client.get(f"{url}&summary_only=true").json() == {
+        "summary": expected_summary
+    }
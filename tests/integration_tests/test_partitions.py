@@ -0,0 +1,178 @@
+import datetime
+
+import orjson
+import pytest
+import sqlalchemy
+from sqlalchemy_utils import create_database, database_exists, drop_database
+from starlette.config import environ
+
+from alembic import command
+from alembic.config import Config as AlembicConfig
+from src.common.constants import MARKET_TZ
+from src.common.enums import Markets
+from src.common.models import TimeFrame
+from src.marketdata.cache import price_response_cache
+from src.marketdata.crud import MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP
+from src.marketdata.latest import latest_price_buffer
+from src.marketdata.models import (
+    MARKETTYPE_TO_DAY_BLOCK_ORM_MAP,
+    MARKETTYPE_TO_ORM_MAP,
+    MARKETTYPE_TO_ROLLUP_ORM_MAP,
+    get_price_row_columns,
+)
+from src.marketdata.partitions import (
+    drop_monthly_partitions_before,
+    get_existing_partitions,
+)
+
+
+@pytest.fixture
+def mock_datetime():
+    # the last settlement period of January in market time
+    return MARKET_TZ.localize(datetime.datetime(2022, 1, 31, 23, 45))
+
+
+@pytest.fixture
+def pyd_price_models(pyd_price_model):
+    return [
+        pyd_price_model,
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    pyd_price_model.settlement_period_start_datetime
+                    + datetime.timedelta(minutes=15)
+                )
+            }
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_inserting_records_creates_monthly_partitions(
+    session, pyd_price_models, price_type
+):
+    market_type_enum = Markets[price_type]
+    table_name = MARKETTYPE_TO_ORM_MAP.get(market_type_enum).__tablename__
+    inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(market_type_enum)
+
+    _ = inserting_fn(session, pyd_price_models)
+
+    assert get_existing_partitions(session, table_name) == {
+        f"{table_name}_y2022m01",
+        f"{table_name}_y2022m02",
+    }
+
+
+@pytest.fixture
+def cleared_price_caches():
+    # the response cache and the latest price buffer are module level, so
+    # what a test puts in them must not reach the tests that run after it
+    price_response_cache.clear()
+    latest_price_buffer.clear()
+    yield
+    price_response_cache.clear()
+    latest_price_buffer.clear()
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+@pytest.mark.usefixtures("cleared_price_caches")
+def test_dropping_partitions_before_cutoff(session, pyd_price_models, price_type):
+    market_type_enum = Markets[price_type]
+    db_price_model = MARKETTYPE_TO_ORM_MAP.get(market_type_enum)
+    table_name = db_price_model.__tablename__
+    inserting_fn = MARKET_TO_DB_MULTIPLE_INSERTING_FN_MAP.get(market_type_enum)
+    _ = inserting_fn(session, pyd_price_models)
+    price_row_columns = get_price_row_columns(db_price_model)
+    latest_price_buffer.replace(
+        market_type_enum,
+        session.execute(sqlalchemy.select(*price_row_columns)).all(),
+        [column.name for column in price_row_columns],
+    )
+    cache_keys = [
+        price_response_cache.make_key(
+            market_type_enum,
+            TimeFrame(
+                start_datetime=pyd_price_model.settlement_period_start_datetime,
+                end_datetime=pyd_price_model.settlement_period_start_datetime,
+            ),
+        )
+        for pyd_price_model in pyd_price_models
+    ]
+    for cache_key in cache_keys:
+        price_response_cache.put(
+            cache_key, b"[]", {}, price_response_cache.get_generation(market_type_enum)
+        )
+
+    dropped_partitions = drop_monthly_partitions_before(
+        session, table_name, MARKET_TZ.localize(datetime.datetime(2022, 2, 15))
+    )
+
+    assert dropped_partitions == [f"{table_name}_y2022m01"]
+    remaining_records = session.query(db_price_model).all()
+    assert len(remaining_records) == 1
+    assert remaining_records[0].settlement_period_start_timestamp == int(
+        pyd_price_models[1].settlement_period_start_datetime.timestamp()
+    )
+    # the day block of the dropped day goes with it
+    remaining_day_blocks = session.query(
+        MARKETTYPE_TO_DAY_BLOCK_ORM_MAP.get(market_type_enum)
+    ).all()
+    assert [
+        day_block.trading_day_start_timestamp for day_block in remaining_day_blocks
+    ] == [int(pyd_price_models[1].settlement_period_start_datetime.timestamp())]
+    # so do its rollups, the cached responses and the buffered latest prices
+    rollup_model = MARKETTYPE_TO_ROLLUP_ORM_MAP.get(market_type_enum)
+    assert {
+        rollup.bucket_start_timestamp for rollup in session.query(rollup_model).all()
+    } == {int(pyd_price_models[1].settlement_period_start_datetime.timestamp())}
+    assert price_response_cache.get(cache_keys[0]) is None
+    assert price_response_cache.get(cache_keys[1]) is not None
+    assert [
+        price_object["settlement_period_start_datetime"]
+        for price_object in orjson.loads(
+            latest_price_buffer.get_latest_json_array(market_type_enum, n=2)
+        )
+    ] == [pyd_price_models[1].settlement_period_start_datetime.isoformat()]
+
+
+def test_partitioning_stops_on_rows_without_timestamp(engine, monkeypatch):
+    # the migrations run on a scratch database left before the partitioning
+    scratch_engine = sqlalchemy.create_engine(
+        engine.url.set(database="test_iex_db_partitioning")
+    )
+    if database_exists(scratch_engine.url):
+        drop_database(scratch_engine.url)
+    create_database(scratch_engine.url)
+    monkeypatch.setenv("DB_NAME", scratch_engine.url.database)
+    alembic_config = AlembicConfig(environ.get("ALEMBIC_INI_PATH"))
+    try:
+        command.upgrade(alembic_config, "9cca8df0ae5c")
+        with scratch_engine.begin() as connection:
+            connection.execute(
+                sqlalchemy.text(
+                    "INSERT INTO dam_prices (mcp_price_in_rs_per_mwh) VALUES (1.0)"
+                )
+            )
+
+        with pytest.raises(RuntimeError, match="dam_prices has 1 rows without"):
+            command.upgrade(alembic_config, "0cb8710f5460")
+
+        # the failed upgrade left the table and its row alone
+        with scratch_engine.connect() as connection:
+            assert (
+                connection.execute(
+                    sqlalchemy.text("SELECT count(*) FROM dam_prices")
+                ).scalar_one()
+                == 1
+            )
+    finally:
+        scratch_engine.dispose()
+        drop_database(scratch_engine.url)
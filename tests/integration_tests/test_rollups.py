@@ -0,0 +1,81 @@
+import datetime
+
+import pytest
+
+from src.common.enums import ConflictResolution, Granularity, Markets
+from src.marketdata.crud import MARKET_TO_DB_UPSERTING_FN_MAP
+from src.marketdata.models import MARKETTYPE_TO_ROLLUP_ORM_MAP
+
+
+@pytest.fixture
+def pyd_price_models(pyd_price_model):
+    # five settlement periods spanning two hours with increasing prices
+    return [
+        pyd_price_model.model_copy(
+            update={
+                "settlement_period_start_datetime": (
+                    pyd_price_model.settlement_period_start_datetime
+                    + datetime.timedelta(minutes=15 * step)
+                ),
+                "mcp_price_in_rs_per_mwh": 10.0 * (step + 1),
+            }
+        )
+        for step in range(5)
+    ]
+
+
+def _get_rollup(session, price_type, granularity, zone):
+    rollup_model = MARKETTYPE_TO_ROLLUP_ORM_MAP.get(Markets[price_type])
+    return (
+        session.query(rollup_model)
+        .filter_by(granularity=granularity.value, zone=zone)
+        .order_by(rollup_model.bucket_start_timestamp)
+        .all()
+    )
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_writing_records_refreshes_rollups(
+    session, mock_datetime, pyd_price_models, price_type
+):
+    upserting_fn = MARKET_TO_DB_UPSERTING_FN_MAP.get(Markets[price_type])
+    _ = upserting_fn(session, pyd_price_models, ConflictResolution.UPDATE)
+
+    hourly_rollups = _get_rollup(session, price_type, Granularity.HOUR, "MCP")
+    assert [rollup.num_intervals for rollup in hourly_rollups] == [4, 1]
+    assert hourly_rollups[0].bucket_start_timestamp == mock_datetime.timestamp()
+    assert hourly_rollups[0].min_price_in_rs_per_mwh == 10.0
+    assert hourly_rollups[0].max_price_in_rs_per_mwh == 40.0
+    assert hourly_rollups[0].mean_price_in_rs_per_mwh == 25.0
+
+    daily_rollups = _get_rollup(session, price_type, Granularity.DAY, "MCP")
+    assert len(daily_rollups) == 1
+    assert daily_rollups[0].num_intervals == 5
+    assert daily_rollups[0].mean_price_in_rs_per_mwh == 30.0
+
+    monthly_rollups = _get_rollup(session, price_type, Granularity.MONTH, "N1")
+    assert len(monthly_rollups) == 1
+    assert monthly_rollups[0].mean_price_in_rs_per_mwh == 10.0
+
+
+@pytest.mark.parametrize(
+    "pyd_price_model, price_type",
+    [("DAM", "DAM"), ("RTM", "RTM")],
+    indirect=["pyd_price_model"],
+)
+def test_overwriting_records_recomputes_rollups(session, pyd_price_models, price_type):
+    upserting_fn = MARKET_TO_DB_UPSERTING_FN_MAP.get(Markets[price_type])
+    _ = upserting_fn(session, pyd_price_models, ConflictResolution.UPDATE)
+    _ = upserting_fn(
+        session,
+        [pyd_price_models[-1].model_copy(update={"mcp_price_in_rs_per_mwh": 100.0})],
+        ConflictResolution.UPDATE,
+    )
+
+    daily_rollups = _get_rollup(session, price_type, Granularity.DAY, "MCP")
+    assert daily_rollups[0].num_intervals == 5
+    assert daily_rollups[0].max_price_in_rs_per_mwh == 100.0
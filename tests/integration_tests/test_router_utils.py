@@ -1,10 +1,20 @@
-from datetime import datetime
+from datetime import datetime, timezone
 
 import pytest
 
 from src.common.constants import MARKET_TZ
+from src.common.enums import ResponseFormat
 from src.common.models import TimeFrame
-from src.marketdata.router_utils import convert_datetime_query_params_to_time_frame
+from src.marketdata.day_blocks import PriceWatermark
+from src.marketdata.router_utils import (
+    compute_price_etag,
+    convert_datetime_query_params_to_time_frame,
+    convert_resample_query_param_to_seconds,
+    convert_zones_query_param_to_price_field_names,
+    etag_matches_if_none_match,
+    get_price_cache_control,
+    get_price_response_format,
+)
 
 
 @pytest.fixture
@@ -37,3 +47,101 @@ def test_convert_datetime_query_params_to_time_frame_invalid_input(
         convert_datetime_query_params_to_time_frame(
             end_datetime_string, start_datetime_string
         )
+
+
+def test_convert_zones_query_param_to_price_field_names_valid_input():
+    actual_price_field_names = convert_zones_query_param_to_price_field_names(
+        ["mcp,N1", "w3"]
+    )
+    assert actual_price_field_names == [
+        "n1_price_in_rs_per_mwh",
+        "w3_price_in_rs_per_mwh",
+        "mcp_price_in_rs_per_mwh",
+    ]
+
+
+def test_convert_zones_query_param_to_price_field_names_invalid_input():
+    with pytest.raises(ValueError):
+        convert_zones_query_param_to_price_field_names(["N1", "Z1"])
+
+
+@pytest.mark.parametrize(
+    "resample, expected_seconds",
+    [("30m", 1800), ("1H", 3600), ("4h", 14400), ("1d", 86400), ("7d", 604800)],
+)
+def test_convert_resample_query_param_to_seconds(resample, expected_seconds):
+    assert convert_resample_query_param_to_seconds(resample) == expected_seconds
+
+
+@pytest.mark.parametrize("resample", ["10m", "5h", "25h", "0h", "1w", "h"])
+def test_convert_resample_query_param_to_seconds_invalid_input(resample):
+    with pytest.raises(ValueError):
+        convert_resample_query_param_to_seconds(resample)
+
+
+@pytest.mark.parametrize(
+    "if_none_match, expected_match",
+    [
+        (None, False),
+        ('W/"abc"', True),
+        ('"abc"', True),
+        ('W/"def", W/"abc"', True),
+        ("*", True),
+        ('W/"def"', False),
+    ],
+)
+def test_etag_matches_if_none_match(if_none_match, expected_match):
+    assert etag_matches_if_none_match(if_none_match, 'W/"abc"') == expected_match
+
+
+def test_compute_price_etag_changes_with_watermark():
+    watermark = PriceWatermark(
+        num_day_blocks=1,
+        num_records=96,
+        last_modified=datetime(2022, 1, 2, tzinfo=timezone.utc),
+    )
+    rewritten_watermark = watermark._replace(
+        last_modified=datetime(2022, 1, 3, tzinfo=timezone.utc)
+    )
+
+    assert compute_price_etag(("dam", 0, 1), watermark) == compute_price_etag(
+        ("dam", 0, 1), watermark
+    )
+    assert compute_price_etag(("dam", 0, 1), watermark) != compute_price_etag(
+        ("dam", 0, 1), rewritten_watermark
+    )
+    assert compute_price_etag(("dam", 0, 1), watermark) != compute_price_etag(
+        ("rtm", 0, 1), watermark
+    )
+
+
+def test_get_price_cache_control():
+    now = MARKET_TZ.localize(datetime(2022, 1, 2, 12))
+    historical_time_frame = TimeFrame(
+        start_datetime=MARKET_TZ.localize(datetime(2022, 1, 1)),
+        end_datetime=MARKET_TZ.localize(datetime(2022, 1, 1, 23, 45)),
+    )
+    current_time_frame = TimeFrame(
+        start_datetime=MARKET_TZ.localize(datetime(2022, 1, 1)),
+        end_datetime=MARKET_TZ.localize(datetime(2022, 1, 2)),
+    )
+
+    assert get_price_cache_control(historical_time_frame, now) == (
+        "public, max-age=86400"
+    )
+    assert get_price_cache_control(current_time_frame, now) == "no-cache"
+
+
+@pytest.mark.parametrize(
+    "accept, expected_response_format",
+    [
+        (None, ResponseFormat.JSON),
+        ("*/*", ResponseFormat.JSON),
+        ("application/vnd.apache.arrow.stream", ResponseFormat.ARROW),
+        ("application/x-parquet, application/json;q=0.5", ResponseFormat.PARQUET),
+        ("application/x-parquet;q=0.2, application/json", ResponseFormat.JSON),
+        ("application/x-parquet;q=0, text/html", ResponseFormat.JSON),
+    ],
+)
+def test_get_price_response_format(accept, expected_response_format):
+    assert get_price_response_format(accept) == expected_response_format
@@ -0,0 +1,60 @@
+from src.common.enums import Markets
+from src.marketdata.batch import (
+    MergedPriceQuery,
+    PriceBatchWindow,
+    merge_price_batch_windows,
+    split_merged_price_rows,
+)
+
+MCP_FIELD_NAME = "mcp_price_in_rs_per_mwh"
+N1_FIELD_NAME = "n1_price_in_rs_per_mwh"
+
+
+def test_merge_price_batch_windows():
+    overlapping_windows = [
+        PriceBatchWindow("a", Markets.DAM, 0, 3600, (MCP_FIELD_NAME,)),
+        PriceBatchWindow("b", Markets.DAM, 1800, 7200, (N1_FIELD_NAME,)),
+        # starts right after the settlement period that ends window b
+        PriceBatchWindow("c", Markets.DAM, 8100, 9000, (MCP_FIELD_NAME,)),
+    ]
+    disjoint_window = PriceBatchWindow("d", Markets.DAM, 90000, 93600, None)
+    rtm_window = PriceBatchWindow("e", Markets.RTM, 0, 3600, None)
+
+    assert merge_price_batch_windows(
+        [disjoint_window, rtm_window, *overlapping_windows]
+    ) == [
+        MergedPriceQuery(Markets.RTM, 0, 3600, None, [rtm_window]),
+        MergedPriceQuery(
+            Markets.DAM,
+            0,
+            9000,
+            [MCP_FIELD_NAME, N1_FIELD_NAME],
+            overlapping_windows,
+        ),
+        MergedPriceQuery(Markets.DAM, 90000, 93600, None, [disjoint_window]),
+    ]
+
+
+def test_split_merged_price_rows():
+    windows = [
+        PriceBatchWindow("a", Markets.DAM, 0, 900, (MCP_FIELD_NAME,)),
+        PriceBatchWindow("b", Markets.DAM, 900, 2700, (N1_FIELD_NAME,)),
+    ]
+    merged_query = MergedPriceQuery(
+        Markets.DAM, 0, 2700, [MCP_FIELD_NAME, N1_FIELD_NAME], windows
+    )
+    field_names = ["settlement_period_start_timestamp", N1_FIELD_NAME, MCP_FIELD_NAME]
+    price_rows = [(timestamp, 1.0, 2.0) for timestamp in range(0, 2701, 900)]
+
+    assert list(split_merged_price_rows(merged_query, price_rows, field_names)) == [
+        (
+            windows[0],
+            [(0, 2.0), (900, 2.0)],
+            ["settlement_period_start_timestamp", MCP_FIELD_NAME],
+        ),
+        (
+            windows[1],
+            [(900, 1.0), (1800, 1.0), (2700, 1.0)],
+            ["settlement_period_start_timestamp", N1_FIELD_NAME],
+        ),
+    ]
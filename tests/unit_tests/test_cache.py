@@ -0,0 +1,139 @@
+import datetime
+import random
+
+import pytest
+
+from src.common.constants import MARKET_TZ
+from src.common.enums import ContentEncoding, Markets
+from src.common.models import TimeFrame
+from src.marketdata.cache import PriceResponseCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    return PriceResponseCache(
+        max_entries=2, ttl_seconds=60, max_entry_bytes=100, clock=clock
+    )
+
+
+@pytest.fixture
+def time_frame():
+    return TimeFrame(
+        start_datetime=MARKET_TZ.localize(datetime.datetime(2022, 1, 1)),
+        end_datetime=MARKET_TZ.localize(datetime.datetime(2022, 1, 2)),
+    )
+
+
+def test_make_key_aligns_time_frame_to_settlement_periods(time_frame):
+    unaligned_time_frame = TimeFrame(
+        start_datetime=time_frame.start_datetime - datetime.timedelta(seconds=59),
+        end_datetime=time_frame.end_datetime + datetime.timedelta(minutes=14),
+    )
+
+    assert PriceResponseCache.make_key(
+        Markets.DAM, unaligned_time_frame
+    ) == PriceResponseCache.make_key(Markets.DAM, time_frame)
+
+
+def test_get_and_put(cache, time_frame):
+    key = cache.make_key(Markets.DAM, time_frame)
+
+    assert cache.get(key) is None
+    assert cache.put(key, b"[]", {}, cache.get_generation(Markets.DAM))
+    assert cache.get(key).body == b"[]"
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(cache, time_frame):
+    keys = [cache.make_key(Markets.DAM, time_frame, limit=limit) for limit in [1, 2, 3]]
+    cache.put(keys[0], b"[]", {}, 0)
+    cache.put(keys[1], b"[]", {}, 0)
+    cache.get(keys[0])
+    cache.put(keys[2], b"[]", {}, 0)
+
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[2]) is not None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl(cache, clock, time_frame):
+    key = cache.make_key(Markets.DAM, time_frame)
+    cache.put(key, b"[]", {}, 0)
+    clock.now = 60
+
+    assert cache.get(key) is None
+    assert cache.get_stats()["expirations"] == 1
+
+
+def test_large_bodies_are_not_cached(cache, time_frame):
+    key = cache.make_key(Markets.DAM, time_frame)
+
+    assert not cache.put(key, b"x" * 101, {}, 0)
+    assert cache.get(key) is None
+
+
+def test_invalidate_drops_overlapping_entries_of_the_market(cache, time_frame):
+    dam_key = cache.make_key(Markets.DAM, time_frame)
+    rtm_key = cache.make_key(Markets.RTM, time_frame)
+    cache.put(dam_key, b"[]", {}, 0)
+    cache.put(rtm_key, b"[]", {}, 0)
+
+    # a write after the time frame leaves the entry alone
+    assert cache.invalidate(Markets.DAM, dam_key.end_timestamp + 900, 2**40) == 0
+    assert cache.invalidate(Markets.DAM, 0, dam_key.end_timestamp) == 1
+    assert cache.get(dam_key) is None
+    assert cache.get(rtm_key) is not None
+
+
+def test_put_is_rejected_after_a_write_to_the_market(cache, time_frame):
+    key = cache.make_key(Markets.DAM, time_frame)
+    generation = cache.get_generation(Markets.DAM)
+    cache.invalidate(Markets.DAM, 0, 0)
+
+    assert not cache.put(key, b"[]", {}, generation)
+    assert cache.put(key, b"[]", {}, cache.get_generation(Markets.DAM))
+
+
+def test_compressed_bodies_count_towards_the_size_bound(clock, time_frame):
+    cache = PriceResponseCache(
+        max_entries=2,
+        ttl_seconds=60,
+        max_entry_bytes=2000,
+        max_total_bytes=1200,
+        clock=clock,
+    )
+    keys = [cache.make_key(Markets.DAM, time_frame, limit=limit) for limit in [1, 2]]
+    # random bytes do not compress, so the compressed body is as large
+    bodies = [random.Random(0).randbytes(512), b"[]" * 100]
+    for key, body in zip(keys, bodies):
+        cache.put(key, body, {}, 0)
+    assert cache.total_bytes == 712
+
+    cached_response = cache.get(keys[0])
+    compressed_body = cache.get_compressed_body(
+        keys[0], cached_response, ContentEncoding.GZIP
+    )
+
+    assert cached_response.compressed_bodies == {ContentEncoding.GZIP: compressed_body}
+    assert cache.total_bytes == 512 + len(compressed_body)
+    # the least recently used entry made room for the compressed body
+    assert cache.get(keys[1]) is None
+    assert cache.get_stats()["evictions"] == 1
+
+    cache.invalidate(Markets.DAM, 0, keys[0].end_timestamp)
+    assert cache.total_bytes == 0
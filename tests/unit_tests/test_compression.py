@@ -0,0 +1,85 @@
+import gzip
+
+import brotli
+import pytest
+import zstandard
+
+from src.common.compression import (
+    CONTENT_ENCODING_TO_COMPRESSOR_MAP,
+    compress_body,
+    compress_chunk,
+    compression_stats,
+    is_compressible_media_type,
+    negotiate_content_encoding,
+)
+from src.common.enums import ContentEncoding
+
+CONTENT_ENCODING_TO_DECOMPRESSING_FN_MAP = {
+    ContentEncoding.GZIP: gzip.decompress,
+    ContentEncoding.BROTLI: brotli.decompress,
+    ContentEncoding.ZSTD: lambda data: zstandard.ZstdDecompressor()
+    .decompressobj()
+    .decompress(data),
+}
+
+
+@pytest.fixture(autouse=True)
+def clear_compression_stats():
+    compression_stats.clear()
+    yield
+    compression_stats.clear()
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected_content_encoding",
+    [
+        (None, None),
+        ("identity", None),
+        ("gzip, deflate", ContentEncoding.GZIP),
+        ("gzip, deflate, br, zstd", ContentEncoding.ZSTD),
+        ("gzip, br;q=0.9", ContentEncoding.GZIP),
+        ("zstd;q=0, br", ContentEncoding.BROTLI),
+        ("*", ContentEncoding.ZSTD),
+        ("*;q=0.5, gzip", ContentEncoding.GZIP),
+    ],
+)
+def test_negotiate_content_encoding(accept_encoding, expected_content_encoding):
+    assert negotiate_content_encoding(accept_encoding) == expected_content_encoding
+
+
+def test_is_compressible_media_type():
+    assert is_compressible_media_type("application/json")
+    assert is_compressible_media_type("text/csv; charset=utf-8")
+    assert not is_compressible_media_type("application/gzip")
+    assert not is_compressible_media_type("application/x-parquet")
+
+
+@pytest.mark.parametrize("content_encoding", list(ContentEncoding))
+def test_compress_chunk_streams_decodable_chunks(content_encoding):
+    chunks = [b'[{"mcp": 1.0}', b',{"mcp": 2.0}' * 100, b"]"]
+    compressor = CONTENT_ENCODING_TO_COMPRESSOR_MAP[content_encoding]()
+    compressed_chunks = [
+        compress_chunk(
+            compressor,
+            content_encoding,
+            chunk,
+            is_first_chunk=index == 0,
+            is_last_chunk=index == len(chunks) - 1,
+        )
+        for index, chunk in enumerate(chunks)
+    ]
+    decompressing_fn = CONTENT_ENCODING_TO_DECOMPRESSING_FN_MAP[content_encoding]
+
+    assert all(compressed_chunks)
+    assert decompressing_fn(b"".join(compressed_chunks)) == b"".join(chunks)
+    assert decompressing_fn(compress_body(b"".join(chunks), content_encoding)) == (
+        b"".join(chunks)
+    )
+    stats = compression_stats.get_stats()[content_encoding.value]
+    assert stats["responses"] == 2
+    assert stats["uncompressed_bytes"] == 2 * len(b"".join(chunks))
+    assert stats["bytes_saved"] == (
+        stats["uncompressed_bytes"] - stats["compressed_bytes"]
+    )
+    assert stats["bytes_saved"] > 0
+    assert stats["cpu_seconds"] >= 0
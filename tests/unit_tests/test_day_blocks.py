@@ -0,0 +1,59 @@
+import datetime
+
+from src.common.constants import MARKET_TZ
+from src.marketdata.day_blocks import (
+    SECONDS_IN_DAY,
+    DayBlockSegment,
+    get_full_trading_day_starts,
+    get_trading_day_start_timestamp,
+    plan_day_block_segments,
+)
+
+DAY_START_TIMESTAMP = int(MARKET_TZ.localize(datetime.datetime(2022, 1, 1)).timestamp())
+
+
+def test_get_trading_day_start_timestamp():
+    assert get_trading_day_start_timestamp(DAY_START_TIMESTAMP) == DAY_START_TIMESTAMP
+    assert (
+        get_trading_day_start_timestamp(DAY_START_TIMESTAMP + SECONDS_IN_DAY - 900)
+        == DAY_START_TIMESTAMP
+    )
+
+
+def test_get_full_trading_day_starts():
+    assert get_full_trading_day_starts(
+        DAY_START_TIMESTAMP - 900, DAY_START_TIMESTAMP + 2 * SECONDS_IN_DAY + 900
+    ) == [DAY_START_TIMESTAMP, DAY_START_TIMESTAMP + SECONDS_IN_DAY]
+    # the last settlement period of the day is not in the time frame
+    assert (
+        get_full_trading_day_starts(
+            DAY_START_TIMESTAMP, DAY_START_TIMESTAMP + SECONDS_IN_DAY - 901
+        )
+        == []
+    )
+
+
+def test_plan_day_block_segments():
+    second_day_start_timestamp = DAY_START_TIMESTAMP + SECONDS_IN_DAY
+    third_day_start_timestamp = DAY_START_TIMESTAMP + 2 * SECONDS_IN_DAY
+    start_timestamp = DAY_START_TIMESTAMP - 900
+    end_timestamp = third_day_start_timestamp + SECONDS_IN_DAY + 900
+
+    segments = plan_day_block_segments(
+        start_timestamp,
+        end_timestamp,
+        {DAY_START_TIMESTAMP: b"first", third_day_start_timestamp: b"third"},
+    )
+
+    assert segments == [
+        DayBlockSegment(start_timestamp, DAY_START_TIMESTAMP - 1),
+        DayBlockSegment(DAY_START_TIMESTAMP, second_day_start_timestamp - 1, b"first"),
+        # the day without a block is queried
+        DayBlockSegment(second_day_start_timestamp, third_day_start_timestamp - 1),
+        DayBlockSegment(
+            third_day_start_timestamp,
+            third_day_start_timestamp + SECONDS_IN_DAY - 1,
+            b"third",
+        ),
+        DayBlockSegment(third_day_start_timestamp + SECONDS_IN_DAY, end_timestamp),
+    ]
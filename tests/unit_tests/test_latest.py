@@ -0,0 +1,46 @@
+import json
+
+from src.common.enums import Markets
+from src.marketdata.latest import LatestPriceBuffer
+
+FIELD_NAMES = ["settlement_period_start_timestamp", "mcp_price_in_rs_per_mwh"]
+
+
+def test_latest_price_buffer():
+    latest_price_buffer = LatestPriceBuffer(capacity=3)
+
+    assert latest_price_buffer.get_latest_json_array(Markets.DAM) is None
+    # markets are only kept up to date once seeded
+    assert not latest_price_buffer.is_stale_after_write(Markets.DAM, 0)
+
+    latest_price_buffer.replace(Markets.DAM, [(900, 2.0), (0, 1.0)], FIELD_NAMES)
+
+    assert latest_price_buffer.is_stale_after_write(Markets.DAM, 0)
+    assert json.loads(latest_price_buffer.get_latest_json_array(Markets.DAM)) == [
+        {
+            "settlement_period_start_datetime": "1970-01-01T05:45:00+05:30",
+            "mcp_price_in_rs_per_mwh": 2.0,
+        }
+    ]
+
+    latest_price_buffer.replace(
+        Markets.DAM,
+        [(timestamp, 1.0) for timestamp in range(0, 3600, 900)],
+        FIELD_NAMES,
+    )
+
+    latest_json_objects = json.loads(
+        latest_price_buffer.get_latest_json_array(Markets.DAM, n=5)
+    )
+    assert [
+        json_object["settlement_period_start_datetime"]
+        for json_object in latest_json_objects
+    ] == [
+        "1970-01-01T05:45:00+05:30",
+        "1970-01-01T06:00:00+05:30",
+        "1970-01-01T06:15:00+05:30",
+    ]
+    # the buffer is full, so older writes do not reach it
+    assert not latest_price_buffer.is_stale_after_write(Markets.DAM, 0)
+    assert latest_price_buffer.is_stale_after_write(Markets.DAM, 900)
+    assert latest_price_buffer.get_latest_json_array(Markets.RTM) is None
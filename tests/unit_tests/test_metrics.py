@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from src.common.enums import Markets
+from src.common.metrics import (
+    Histogram,
+    MetricsRegistry,
+    PriceReadTimer,
+    metrics_registry,
+)
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    metrics_registry.clear()
+    yield
+    metrics_registry.clear()
+
+
+def test_histogram_collect():
+    histogram = Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1))
+
+    histogram.observe(0.05, "/dam")
+    histogram.observe(0.1, "/dam")
+    histogram.observe(5, "/dam")
+
+    assert histogram.collect() == [
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{route="/dam",le="0.1"} 2',
+        'latency_seconds_bucket{route="/dam",le="1.0"} 2',
+        'latency_seconds_bucket{route="/dam",le="+Inf"} 3',
+        'latency_seconds_sum{route="/dam"} 5.15',
+        'latency_seconds_count{route="/dam"} 3',
+    ]
+
+
+def test_metrics_registry_render():
+    registry = MetricsRegistry()
+    counter = registry.counter("writes_total", "Writes", ("market",))
+    registry.register_collector(lambda: ["collected 1.0"])
+
+    counter.inc('r"t\\m')
+    counter.inc('r"t\\m', amount=2)
+
+    assert registry.render() == (
+        "# HELP writes_total Writes\n"
+        "# TYPE writes_total counter\n"
+        'writes_total{market="r\\"t\\\\m"} 3.0\n'
+        "collected 1.0\n"
+    )
+
+
+def test_price_read_timer():
+    read_timer = PriceReadTimer(Markets.DAM)
+
+    async def aiter_price_rows():
+        for timestamp in (0, 900, 1800):
+            await asyncio.sleep(0.01)
+            yield (timestamp, 1.0)
+
+    async def aiter_body():
+        async for price_row in read_timer.aiter_rows(aiter_price_rows()):
+            yield str(price_row).encode()
+
+    async def read_body() -> list[bytes]:
+        return [chunk async for chunk in read_timer.aiter_body(aiter_body())]
+
+    assert len(asyncio.run(read_body())) == 3
+    assert read_timer.num_rows == 3
+    assert read_timer.query_seconds >= 0.03
+    rendered_metrics = metrics_registry.render()
+    assert 'price_rows_per_request_sum{market="dam"} 3.0' in rendered_metrics
+    assert (
+        'price_read_phase_duration_seconds_count{market="dam",phase="serialization"} 1'
+        in rendered_metrics
+    )
@@ -1,10 +1,12 @@
 import datetime
+import json
 from unittest import mock
 
 import pytest
 
 from src.common.models import TimeFrame
 from src.marketdata.schemas import DAMPointInTimePriceData, RTMPointInTimePriceData
+from src.migrations.automated.scraping import price_data_bot
 from src.migrations.automated.scraping.parsing_engines import (
     DAMHtmlParsingEngine,
     RTMHtmlParsingEngine,
@@ -49,3 +51,44 @@ def test_web_bot_initialization(
 
 def test_download_data_for_window():
     pass
+
+
+def test_download_data_reports_phase_timings(
+    mock_web_driver, download_window, tmp_path, monkeypatch
+):
+    textfile_path = tmp_path / "scraper.prom"
+    monkeypatch.setattr(
+        price_data_bot, "SCRAPER_METRICS_TEXTFILE_PATH", str(textfile_path)
+    )
+    bot = PriceDataDownloaderBot(
+        web_driver=mock_web_driver,
+        parsing_engine=DAMHtmlParsingEngine(),
+        page_properties=DAMPricePageProperties(),
+    )
+    with open("./tests/data/dam_prices_page.html", "r") as f:
+        mock_web_driver.page_source = f.read()
+    bot._extract_delivery_period_dropdown_from_driver = mock.Mock()
+    bot._select_and_click_range_from_delivery_period_dropdown = mock.Mock()
+    bot._render_page_with_new_dates = mock.Mock()
+    bot._wait_for_table_to_load = mock.Mock()
+    download_window.end_datetime = download_window.start_datetime
+
+    # the logger may have been disabled by the logging config of alembic
+    mock_logger = mock.Mock()
+    monkeypatch.setattr(price_data_bot, "logger", mock_logger)
+
+    price_data = bot.download_data_for_window(download_window)
+
+    assert len(price_data) == 96
+    phase_timings = json.loads(
+        mock_logger.info.call_args.args[0].removeprefix("Scraper phase timings: ")
+    )
+    assert set(phase_timings) == {
+        f"DAMHtmlParsingEngine.{phase}"
+        for phase in ("render", "soup", "price_table", "rows")
+    }
+    assert all(timing["count"] == 1 for timing in phase_timings.values())
+    assert (
+        'scraper_phase_duration_seconds_count{engine="DAMHtmlParsingEngine",'
+        'phase="soup"}' in textfile_path.read_text()
+    )
@@ -0,0 +1,66 @@
+import json
+import threading
+import time
+
+import sqlalchemy
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from src.common.profiling import (
+    PROFILE_ID_HEADER,
+    PROFILE_TOKEN_HEADER,
+    ProfilingMiddleware,
+    StackSampler,
+    record_sql_statement_timings,
+)
+
+
+def test_stack_sampler():
+    stack_sampler = StackSampler(threading.get_ident(), interval_seconds=0.001)
+
+    stack_sampler.start()
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    stack_sampler.stop()
+
+    collapsed_stacks = stack_sampler.to_collapsed_stacks().splitlines()
+    assert collapsed_stacks
+    stack, count = collapsed_stacks[0].rsplit(" ", 1)
+    assert "test_stack_sampler (test_profiling.py:" in stack
+    assert int(count) > 0
+
+
+def test_profiling_middleware(tmp_path):
+    engine = sqlalchemy.create_engine("sqlite://")
+    record_sql_statement_timings(engine)
+    app = FastAPI()
+
+    @app.get("/prices")
+    def read_prices() -> list[int]:
+        with engine.connect() as connection:
+            return [connection.execute(sqlalchemy.text("SELECT 1")).scalar()]
+
+    app.add_middleware(
+        ProfilingMiddleware,
+        token="secret",
+        output_dir=str(tmp_path),
+        sample_interval_seconds=0.001,
+    )
+    client = TestClient(app)
+
+    for headers in ({}, {PROFILE_TOKEN_HEADER: "wrong"}):
+        response = client.get("/prices", headers=headers)
+        assert response.json() == [1]
+        assert PROFILE_ID_HEADER not in response.headers
+    assert not list(tmp_path.iterdir())
+
+    response = client.get("/prices?zones=MCP", headers={PROFILE_TOKEN_HEADER: "secret"})
+    assert response.json() == [1]
+    profile_id = response.headers[PROFILE_ID_HEADER]
+    assert (tmp_path / f"{profile_id}.folded").exists()
+    profile = json.loads((tmp_path / f"{profile_id}.json").read_text())
+    assert profile["path"] == "/prices"
+    assert profile["query_string"] == "zones=MCP"
+    assert profile["status_code"] == 200
+    assert [timing["statement"] for timing in profile["sql_statements"]] == ["SELECT 1"]
@@ -1,10 +1,21 @@
+import asyncio
 import datetime
+import gzip
+import json
 
 import pandas as pd
 import pytest
 
 from src.common.constants import MARKET_TZ
-from src.marketdata.schema_utils import convert_list_of_price_data_to_dataframe
+from src.marketdata.schema_utils import (
+    aiter_gzip,
+    aiter_price_rows_as_csv,
+    aiter_price_rows_as_ndjson,
+    convert_list_of_price_data_to_dataframe,
+    convert_price_rows_to_columnar_json,
+    iter_price_data_as_json_array,
+    iter_price_rows_as_json_array,
+)
 from src.marketdata.schemas import DAMPointInTimePriceData, RTMPointInTimePriceData
 
 
@@ -73,3 +84,114 @@ def test_convert_list_of_price_data_to_dataframe(price_data):
     assert isinstance(df, pd.DataFrame)
     assert isinstance(df.index, pd.DatetimeIndex)
     assert df.shape[0] == 1
+
+
+@pytest.mark.parametrize(
+    "price_data", ["dam_price_data", "rtm_price_data"], indirect=True
+)
+@pytest.mark.parametrize("num_copies", [0, 1, 3])
+def test_iter_price_data_as_json_array(price_data, num_copies):
+    price_data = price_data * num_copies
+    json_chunks = list(iter_price_data_as_json_array(price_data, rows_per_chunk=2))
+
+    assert json.loads(b"".join(json_chunks)) == [
+        price_data_obj.model_dump(exclude_unset=True) for price_data_obj in price_data
+    ]
+
+
+@pytest.mark.parametrize(
+    "price_data", ["dam_price_data", "rtm_price_data"], indirect=True
+)
+@pytest.mark.parametrize("num_copies", [0, 1, 3])
+def test_iter_price_rows_as_json_array(price_data, num_copies):
+    price_data = price_data * num_copies
+    field_names = ["settlement_period_start_timestamp", "n1_price_in_rs_per_mwh"]
+    price_rows = [
+        (
+            int(price_data_obj.settlement_period_start_datetime.timestamp()),
+            price_data_obj.n1_price_in_rs_per_mwh,
+        )
+        for price_data_obj in price_data
+    ]
+    json_chunks = list(
+        iter_price_rows_as_json_array(price_rows, field_names, rows_per_chunk=2)
+    )
+
+    assert json.loads(b"".join(json_chunks)) == [
+        price_data_obj.model_dump(
+            include={"settlement_period_start_datetime", "n1_price_in_rs_per_mwh"}
+        )
+        for price_data_obj in price_data
+    ]
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _collect(chunks):
+    return [chunk async for chunk in chunks]
+
+
+@pytest.mark.parametrize("num_rows", [0, 1, 3])
+def test_aiter_price_rows_as_flat_files(mock_datetime, num_rows):
+    field_names = ["settlement_period_start_timestamp", "n1_price_in_rs_per_mwh"]
+    timestamp = int(mock_datetime.timestamp())
+    price_rows = [
+        (timestamp + step * 900, None if step else 10.5) for step in range(num_rows)
+    ]
+    expected_datetimes = [
+        (mock_datetime + datetime.timedelta(minutes=15 * step)).isoformat()
+        for step in range(num_rows)
+    ]
+
+    csv_chunks = asyncio.run(
+        _collect(aiter_price_rows_as_csv(_aiter(price_rows), field_names, 2))
+    )
+    ndjson_chunks = asyncio.run(
+        _collect(
+            aiter_gzip(aiter_price_rows_as_ndjson(_aiter(price_rows), field_names, 2))
+        )
+    )
+
+    assert (
+        csv_chunks[0] == b"settlement_period_start_datetime,n1_price_in_rs_per_mwh\r\n"
+    )
+    assert b"".join(csv_chunks[1:]).decode().splitlines() == [
+        f"{expected_datetime},{'' if step else 10.5}"
+        for step, expected_datetime in enumerate(expected_datetimes)
+    ]
+    assert [
+        json.loads(line)
+        for line in gzip.decompress(b"".join(ndjson_chunks)).splitlines()
+    ] == [
+        {
+            "settlement_period_start_datetime": expected_datetime,
+            "n1_price_in_rs_per_mwh": None if step else 10.5,
+        }
+        for step, expected_datetime in enumerate(expected_datetimes)
+    ]
+
+
+@pytest.mark.parametrize(
+    "timestamps, expected_timestamps",
+    [([], None), ([0, 900, 1800], None), ([0, 900, 2700], [0, 900, 2700])],
+)
+def test_convert_price_rows_to_columnar_json(timestamps, expected_timestamps):
+    field_names = [
+        "settlement_period_start_timestamp",
+        "mcp_price_in_rs_per_mwh",
+        "session_id",
+    ]
+    price_rows = [(timestamp, 10.5, None) for timestamp in timestamps]
+
+    assert json.loads(convert_price_rows_to_columnar_json(price_rows, field_names)) == {
+        "start": timestamps[0] if timestamps else None,
+        "step_seconds": 900,
+        "timestamps": expected_timestamps,
+        "columns": {
+            "MCP": [10.5] * len(timestamps),
+            "session_id": [None] * len(timestamps),
+        },
+    }
@@ -0,0 +1,144 @@
+import asyncio
+import json
+
+import pytest
+
+from src.common.enums import Markets
+from src.marketdata.cache import price_response_cache
+from src.marketdata.stream import (
+    PriceStreamBroker,
+    PriceWriteNotification,
+    aiter_price_events,
+    format_price_event,
+    parse_price_event_id,
+    parse_price_write_notification,
+)
+
+FIELD_NAMES = ["settlement_period_start_timestamp", "mcp_price_in_rs_per_mwh"]
+
+
+def test_parse_price_write_notification():
+    assert parse_price_write_notification("rtm:0:900") == PriceWriteNotification(
+        Markets.RTM, 0, 900
+    )
+    with pytest.raises(ValueError):
+        parse_price_write_notification("idm:0:900")
+
+
+def test_format_price_event():
+    price_event = format_price_event((900, "session", 2.0), FIELD_NAMES, [0, 2])
+
+    event_id, event_type, data, *_ = price_event.split(b"\n")
+    assert event_id == b"id: 900"
+    assert event_type == b"event: price"
+    assert json.loads(data.removeprefix(b"data: ")) == {
+        "settlement_period_start_datetime": "1970-01-01T05:45:00+05:30",
+        "mcp_price_in_rs_per_mwh": 2.0,
+    }
+    assert price_event.endswith(b"\n\n")
+
+
+def test_price_event_ids():
+    price_event = format_price_event((900, 2.0, None), FIELD_NAMES, [0, 1], [0, 2])
+
+    assert price_event.startswith(b"id: 900:\n")
+    assert parse_price_event_id("900:", 2) == (900, None)
+    assert parse_price_event_id("900:S1:2", 2) == (900, "S1:2")
+    assert parse_price_event_id("900", 1) == (900,)
+    with pytest.raises(ValueError):
+        parse_price_event_id("900", 2)
+
+
+def test_price_stream_broker_publish():
+    broker = PriceStreamBroker(max_queued_batches=1)
+    rtm_subscription = broker.subscribe(Markets.RTM)
+    dam_subscription = broker.subscribe(Markets.DAM)
+
+    broker.publish(Markets.RTM, [(0, 1.0)])
+
+    assert rtm_subscription.queue.get_nowait() == [(0, 1.0)]
+    assert dam_subscription.queue.empty()
+
+    # a subscriber that falls behind is dropped
+    broker.publish(Markets.RTM, [(900, 1.0)])
+    broker.publish(Markets.RTM, [(1800, 1.0)])
+
+    assert rtm_subscription.overflowed
+    broker.publish(Markets.RTM, [(2700, 1.0)])
+    assert rtm_subscription.queue.get_nowait() == [(900, 1.0)]
+    assert not broker.is_running
+
+
+def test_aiter_price_events():
+    broker = PriceStreamBroker()
+
+    async def aiter_backfilled_price_rows():
+        for price_row in [(0, 1.0), (900, 2.0)]:
+            yield price_row
+
+    async def read_price_events() -> list[bytes]:
+        price_events = aiter_price_events(
+            broker,
+            Markets.RTM,
+            aiter_backfilled_price_rows(),
+            FIELD_NAMES,
+            [0, 1],
+            keepalive_seconds=0.01,
+        )
+        received = [await price_events.__anext__() for _ in range(2)]
+        # unchanged rows already sent are not sent again, changed ones are
+        broker.publish(Markets.RTM, [(900, 2.0), (1800, 3.0)])
+        received.append(await price_events.__anext__())
+        broker.publish(Markets.RTM, [(900, 2.5), (1800, 3.0)])
+        received.append(await price_events.__anext__())
+        received.append(await price_events.__anext__())
+        await price_events.aclose()
+        return received
+
+    received = asyncio.run(read_price_events())
+
+    assert [price_event.split(b"\n")[0] for price_event in received[:4]] == [
+        b"id: 0",
+        b"id: 900",
+        b"id: 1800",
+        b"id: 900",
+    ]
+    assert received[4] == b": keepalive\n\n"
+    assert not broker._subscriptions[Markets.RTM]
+
+
+def test_price_stream_broker_invalidates_without_subscribers(monkeypatch):
+    invalidated_ranges = []
+    monkeypatch.setattr(
+        price_response_cache,
+        "invalidate",
+        lambda *invalidated_range: invalidated_ranges.append(invalidated_range),
+    )
+    broker = PriceStreamBroker()
+
+    broker._on_notification(None, 1, "price_writes", "rtm:0:900")
+
+    assert invalidated_ranges == [(Markets.RTM, 0, 900)]
+    assert not broker._publish_tasks
+
+
+def test_price_stream_broker_retries_failed_start():
+    class UnreachableEngine:
+        num_connects = 0
+
+        async def connect(self):
+            self.num_connects += 1
+            raise OSError("connection refused")
+
+    async def start_and_stop_broker() -> int:
+        engine = UnreachableEngine()
+        broker = PriceStreamBroker(
+            reconnect_min_seconds=0.01, reconnect_max_seconds=0.02
+        )
+        await broker.start(engine)
+        assert not broker.is_running
+        await asyncio.sleep(0.1)
+        await broker.stop()
+        return engine.num_connects
+
+    assert asyncio.run(start_and_stop_broker()) > 2
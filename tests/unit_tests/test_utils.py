@@ -0,0 +1,28 @@
+import datetime
+
+import pytz
+
+from src.common.constants import MARKET_TZ
+from src.common.utils import (
+    convert_timestamp_to_indian_datetime,
+    convert_timestamps_to_indian_datetimes,
+)
+
+
+def test_convert_timestamps_to_indian_datetimes():
+    unix_timestamps = [0, 1640975400, 1640976300, 1893436200]
+
+    indian_datetimes = convert_timestamps_to_indian_datetimes(unix_timestamps)
+
+    # the fixed offset matches the pytz time zone of the market
+    assert indian_datetimes == [
+        pytz.utc.localize(datetime.datetime.utcfromtimestamp(timestamp)).astimezone(
+            MARKET_TZ
+        )
+        for timestamp in unix_timestamps
+    ]
+    assert indian_datetimes == [
+        convert_timestamp_to_indian_datetime(timestamp) for timestamp in unix_timestamps
+    ]
+    assert indian_datetimes[1].isoformat() == "2022-01-01T00:00:00+05:30"
+    assert convert_timestamps_to_indian_datetimes([]) == []